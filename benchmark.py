@@ -0,0 +1,73 @@
+import argparse, json, os, platform, sys, tempfile, time
+
+from lib.generator import ChainGenerator
+from lib.parser import Parser
+from lib.supply_chain import SupplyChain
+from lib.solver import PlanningSolver, MatrixPlanningSolver, SolverBackend
+from lib.version import VERSION
+
+def parse_args():
+    parser=argparse.ArgumentParser(description='Times parsing, verification, model building and solving on random chains of growing size.')
+    parser.add_argument('--sizes', default='100,1000,10000', help='comma separated numbers of components (default: 100,1000,10000)')
+    parser.add_argument('--products', type=float, default=0.1, help='the number of products per component (default: 0.1)')
+    parser.add_argument('--depth', type=int, default=4, help='the number of component layers (default: 4)')
+    parser.add_argument('--fan-in', type=int, default=3, help='the largest number of sources of a transition (default: 3)')
+    parser.add_argument('--or-ratio', type=float, default=0.2, help='the probability that a transition is an OR transition (default: 0.2)')
+    parser.add_argument('--stock-ratio', type=float, default=0.3, help='the probability that a component has a stock (default: 0.3)')
+    parser.add_argument('--supplier-ratio', type=float, default=0.5, help='the probability that a bottom component has a supplier (default: 0.5)')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the generator (default: 0)')
+    parser.add_argument('--repeat', type=int, default=1, help='times each stage this many times and keeps the fastest run (default: 1)')
+    parser.add_argument('--builder', choices=['pulp', 'matrix'], default='pulp', help='builds the problem with PuLP or assembles its matrix directly (default: pulp)')
+    parser.add_argument('--time-limit', type=float, help='stops the solver after this many seconds')
+    parser.add_argument('--no-solve', action='store_true', help='skips the solve stage')
+    parser.add_argument('--output', help='writes the results as JSON into this file instead of the standard output')
+    return parser.parse_args()
+
+def timed(func):
+    """returns the result of calling @param func and the time it took in seconds"""
+    start=time.perf_counter()
+    result=func()
+    return result, time.perf_counter()-start
+
+def run_size(args, n_components, model_dir):
+    """runs the stages on a random chain of @param n_components components and
+       returns the record of the run"""
+    n_products=max(1, int(n_components*args.products))
+    gen=ChainGenerator(n_products, n_components, args.depth, args.fan_in, args.or_ratio,
+                       args.stock_ratio, args.supplier_ratio, seed=args.seed)
+    model=os.path.join(model_dir, f'chain_{n_components}.txt')
+    gen.write(model)
+    solver_cls=MatrixPlanningSolver if args.builder == 'matrix' else PlanningSolver
+    backend=SolverBackend(time_limit=args.time_limit)
+    record={'components': n_components, 'products': n_products, 'model_bytes': os.path.getsize(model)}
+    best={}
+    for _ in range(args.repeat):
+        stmts, t_parse=timed(lambda: Parser(model).parse())
+        spch, t_verify=timed(lambda: SupplyChain(stmts))
+        solver, t_build=timed(lambda: solver_cls(spch, msg=False, backend=backend))
+        times={'parse': t_parse, 'verify': t_verify, 'build': t_build}
+        if not args.no_solve:
+            _, times['solve']=timed(solver.solve)
+            record['status']=solver.status()
+            record['objective']=solver.objective()
+        for stage, t in times.items():
+            best[stage]=min(best.get(stage, t), t)
+    record['transitions']=len(spch._transitions)
+    record['seconds']=best
+    return record
+
+if __name__ == '__main__':
+    args=parse_args()
+    results={'version': VERSION, 'python': platform.python_version(), 'machine': platform.machine(),
+             'parameters': vars(args), 'runs': []}
+    with tempfile.TemporaryDirectory() as model_dir:
+        for size in [int(s) for s in args.sizes.split(',')]:
+            record=run_size(args, size, model_dir)
+            results['runs'].append(record)
+            stages=', '.join(f'{stage} {t:.3f}s' for stage, t in record['seconds'].items())
+            print(f"{size} components, {record['transitions']} transitions: {stages}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as writer:
+            json.dump(results, writer, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
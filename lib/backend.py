@@ -0,0 +1,68 @@
+class SolverBackend:
+    """The solver backend selects the solver the problem is handed to and its
+       options. @param name is one of NAMES, @param threads the number of
+       threads, @param time_limit the time limit in seconds, @param gap the
+       relative MIP gap at which the search stops and @param log_path the file
+       the solver log is written to. Unset options keep the defaults of the
+       solver. GLPK runs a single thread, so threads are ignored for it.
+    """
+
+    NAMES=('cbc', 'highs', 'glpk')
+
+    def __init__(self, name='cbc', threads=None, time_limit=None, gap=None, log_path=None):
+        if name not in self.NAMES:
+            raise ValueError(f'Unknown solver "{name}", the solver is one of {", ".join(self.NAMES)}.')
+        self._name=name
+        self._threads=threads
+        self._time_limit=time_limit
+        self._gap=gap
+        self._log_path=log_path
+
+    def name(self):
+        """returns the name of the solver, one of NAMES"""
+        return self._name
+
+    def options(self):
+        """returns the dictionary of the options, i.e. threads, time_limit, gap
+           and log_path, None for those keeping the defaults of the solver"""
+        return {'threads': self._threads, 'time_limit': self._time_limit, 'gap': self._gap, 'log_path': self._log_path}
+
+    def replace(self, **options):
+        """returns a backend of the same solver with @param options replacing
+           the ones of this backend, e.g. replace(time_limit=10)"""
+        return SolverBackend(self._name, **dict(self.options(), **options))
+
+    def command(self, mip=True, msg=True, warm_start=False):
+        """returns the PuLP command solving the problem, ignoring integrality
+           unless @param mip is set. The log is printed if @param msg is set.
+           If @param warm_start is set, the values of the variables are passed
+           as the initial solution. It raises ValueError if the solver is not
+           installed.
+        """
+        import pulp # loaded on first use, so that checking models does not load it
+        if self._name == 'glpk':
+            options=[]
+            if self._gap is not None:
+                options+=['--mipgap', str(self._gap)]
+            if self._log_path:
+                options+=['--log', self._log_path]
+            cmd=pulp.GLPK_CMD(mip=mip, msg=msg, timeLimit=self._time_limit, options=options)
+        else:
+            cmd_cls=pulp.PULP_CBC_CMD if self._name == 'cbc' else pulp.HiGHS_CMD
+            cmd=cmd_cls(mip=mip, msg=msg, timeLimit=self._time_limit, gapRel=self._gap,
+                        threads=self._threads, logPath=self._log_path, warmStart=warm_start and mip)
+        if not cmd.available():
+            raise ValueError(f'The solver "{self._name}" is not available.')
+        return cmd
+
+    def describe(self):
+        """returns the name of the solver and its options, e.g.
+           cbc (threads=4, time limit=10s, gap=0.01)"""
+        options=[]
+        if self._threads is not None and self._name != 'glpk':
+            options.append(f'threads={self._threads}')
+        if self._time_limit is not None:
+            options.append(f'time limit={self._time_limit}s')
+        if self._gap is not None:
+            options.append(f'gap={self._gap}')
+        return f'{self._name} ({", ".join(options)})' if options else self._name
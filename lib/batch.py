@@ -0,0 +1,123 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import lib.entities as en
+import lib.solver as sl
+import lib.supply_chain as sc
+
+
+class Scenario:
+    """A scenario overrides the order sizes of some products, the stocks of
+       some components and switches off the suppliers of some entities"""
+
+    def __init__(self, name, orders=None, stocks=None, suppliers_off=None):
+        self._name=name
+        self._orders=orders or {}
+        self._stocks=stocks or {}
+        self._suppliers_off=set(suppliers_off or [])
+
+    def apply(self, supply_chain):
+        """returns a new supply chain which is @param supply_chain with the
+           overrides of the scenario. @param supply_chain is not modified.
+           It raises KeyError for undefined entities and ValueError if an
+           override is given for an entity of the wrong kind.
+        """
+        entity_dict=supply_chain._entity_dict
+        for name in list(self._orders)+list(self._stocks)+list(self._suppliers_off):
+            if name not in entity_dict:
+                raise KeyError(f'"{name}" has not been defined.')
+        for name in self._orders:
+            if entity_dict[name].get_type() != en.EntityType.PROD:
+                raise ValueError(f'"{name}" is not a product.')
+        for name in self._stocks:
+            if entity_dict[name].get_type() != en.EntityType.COMP:
+                raise ValueError(f'"{name}" is not a component.')
+        products=[en.Product(p._name, self._orders.get(p._name, p._order_size), p._priority) for p in supply_chain._products]
+        components=[en.Component(c._name, self._stocks.get(c._name, c._stock)) for c in supply_chain._components]
+        transitions=[t for t in supply_chain._transitions
+                     if t._tr_type != en.TransitionType.DIR or t._target not in self._suppliers_off]
+        return sc.SupplyChain.from_entities(products, components, transitions)
+
+
+def read_scenarios(filename):
+    """reads the scenarios from @param filename. Each non-empty line of the
+       file is a JSON object such as
+       {"name": "s1", "orders": {"p1": 20}, "stocks": {"c2": 0}, "suppliers_off": ["c1"]}
+       where only the name is mandatory. It returns the list of scenarios.
+       It raises ValueError for malformed lines.
+    """
+    scenarios=[]
+    with open(filename) as reader:
+        for n, line in enumerate(reader, 1):
+            if not line.strip():
+                continue
+            try:
+                obj=json.loads(line)
+                scenarios.append(Scenario(obj['name'], obj.get('orders'), obj.get('stocks'), obj.get('suppliers_off')))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f'Invalid scenario at line {n} of "{filename}": {e}')
+    return scenarios
+
+
+# the base chain of a worker process, set once by _init_worker
+_base_chain=None
+
+def _init_worker(supply_chain):
+    global _base_chain
+    _base_chain=supply_chain
+
+def _solve_scenario(scenario, solver_cls, presolve, backend):
+    """solves @param scenario on the base chain of the process and returns its
+       name, status, objective and the dictionary of the produced amounts"""
+    try:
+        spch=scenario.apply(_base_chain)
+        slvr=solver_cls(spch, presolve=presolve, msg=False, backend=backend)
+        slvr.solve()
+        values=slvr.values()
+        products=dict((p._name, values.get(p._name)) for p in spch._products)
+        return scenario._name, slvr.status(), slvr.objective(), products
+    except Exception as e:
+        return scenario._name, f'Error: {e.args[0] if e.args else e}', None, {}
+
+
+class BatchSolver:
+    """The batch solver plans many scenarios of one supply chain. The scenarios
+       are solved by a pool of processes, each receiving the parsed chain once
+       when it starts, so neither the model nor the solver modules are loaded
+       again per scenario.
+    """
+
+    def __init__(self, supply_chain, jobs=1, presolve=False, solver_cls=sl.PlanningSolver, backend=None):
+        """@param jobs is the number of processes, zero or None using as many
+           processes as there are CPUs. Each scenario is planned by
+           @param solver_cls with @param backend, optionally with @param presolve."""
+        self._supply_chain=supply_chain
+        self._backend=backend
+        self._jobs=jobs if jobs else os.cpu_count() or 1
+        self._presolve=presolve
+        self._solver_cls=solver_cls
+
+    def solve(self, scenarios):
+        """solves @param scenarios and returns their results in the same order,
+           see _solve_scenario(). A scenario which fails is reported with an
+           error status and does not stop the others."""
+        n=len(scenarios)
+        args=(list(scenarios), [self._solver_cls]*n, [self._presolve]*n, [self._backend]*n)
+        if self._jobs == 1 or n < 2:
+            _init_worker(self._supply_chain)
+            return list(map(_solve_scenario, *args))
+        jobs=min(self._jobs, n)
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(self._supply_chain,)) as executor:
+            return list(executor.map(_solve_scenario, *args, chunksize=max(1, n//(4*jobs))))
+
+    def write_table(self, results, writer):
+        """writes @param results as a CSV table into @param writer. There is a
+           row per scenario and a column per product holding its production."""
+        products=[p._name for p in self._supply_chain._products]
+        table=csv.writer(writer)
+        table.writerow(['scenario', 'status', 'objective']+products)
+        for name, status, objective, produced in results:
+            table.writerow([name, status, '' if objective is None else objective]+
+                           ['' if produced.get(p) is None else produced[p] for p in products])
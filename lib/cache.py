@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import pickle
+
+import lib.parser as pr
+import lib.supply_chain as sc
+from lib.version import VERSION
+
+
+class ModelCache:
+    """The model cache stores compiled supply chains on disk.
+       A compiled chain is the pickled SupplyChain object, i.e. the extracted
+       entities and the graph of the chain.
+       Entries are keyed by the hash of the model file content together with the
+       planner version and the cache format, so an entry is never used for a
+       modified model or by a planner that represents chains differently.
+    """
+
+    FORMAT=4 # bump it when the layout of the cache entries changes
+    SUFFIX='.spch'
+
+    def __init__(self, cache_dir):
+        self._cache_dir=cache_dir
+
+    def key(self, modelfile):
+        """returns the cache key of @param modelfile"""
+        digest=hashlib.sha256(f'{VERSION}:{self.FORMAT}:'.encode())
+        with open(modelfile,'rb') as reader:
+            for chunk in iter(lambda: reader.read(1<<20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self._cache_dir, key+self.SUFFIX)
+
+    def load(self, modelfile, jobs=1):
+        """returns the supply chain described in @param modelfile. It is read
+           from the cache if possible, otherwise the model is parsed with
+           @param jobs processes, verified and stored in the cache.
+        """
+        path=self._entry_path(self.key(modelfile))
+        spch=self._read(path)
+        if spch is None:
+            statements=pr.Parser(modelfile).parse(jobs)
+            if statements is None:
+                raise ValueError(f'"{modelfile}" could not be parsed.')
+            spch=sc.SupplyChain(statements)
+            self._write(path, spch)
+        return spch
+
+    def _read(self, path):
+        """returns the chain stored in @param path, or None if there is no
+           usable entry"""
+        try:
+            with open(path,'rb') as reader:
+                spch=pickle.load(reader)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return spch if isinstance(spch, sc.SupplyChain) else None
+
+    def _write(self, path, spch):
+        """stores @param spch in @param path. The entry is written to a temporary
+           file first, so concurrent runs never see a partial entry."""
+        os.makedirs(self._cache_dir, exist_ok=True)
+        tmp_path=f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path,'wb') as writer:
+            pickle.dump(spch, writer, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """removes all entries from the cache"""
+        if not os.path.isdir(self._cache_dir):
+            return
+        for fname in os.listdir(self._cache_dir):
+            if fname.endswith(self.SUFFIX):
+                os.remove(os.path.join(self._cache_dir, fname))
+
+
+def fingerprint(supply_chain):
+    """returns the canonical fingerprint of @param supply_chain, the hash of
+       its products, components and transitions in sorted order. It does not
+       depend on the order of the statements, nor on the order of the sources
+       of a transition, nor on the layout of the model file."""
+    lines=[f'P {p._name} {p._order_size} {p._priority}' for p in supply_chain._products]
+    lines.extend(f'C {c._name} {c._stock}' for c in supply_chain._components)
+    lines.extend(f'T {t._target} {t._tr_type} {",".join(sorted(t._sources or []))}' for t in supply_chain._transitions)
+    lines.sort()
+    digest=hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class CachedPlan:
+    """A cached plan answers the queries on a plan as a solver does, i.e.
+       status(), objective(), values() and backend(), from a solution cache
+       entry."""
+
+    def __init__(self, entry, backend):
+        self._entry=entry
+        self._backend=backend
+
+    def status(self):
+        return self._entry['status']
+
+    def objective(self):
+        return self._entry['objective']
+
+    def values(self):
+        return dict(self._entry['values'])
+
+    def backend(self):
+        return self._backend
+
+    def statistics(self):
+        return None
+
+    def __str__(self):
+        status=f"Status: {self.status()}\nSolver: {self._backend.describe()}"
+        obj=f"Objective={self.objective()}"
+        opt_vals='\n'.join([f"{name}={value}" for name,value in sorted(self.values().items())])
+        return f"{status}\n\n{obj}\n\n{opt_vals}"
+
+
+class SolutionCache:
+    """The solution cache stores the optimal plans of supply chains on disk,
+       so repeated requests are answered without building and solving the
+       problem. Entries are keyed by the fingerprint of the chain, see
+       fingerprint(), together with the solver settings, the planner version
+       and the cache format. An entry is a JSON file with the status, the
+       objective and the values of the plan. Plans which are not optimal, e.g.
+       stopped by a time limit, are not stored.
+       The cache keeps at most @param max_entries entries and, if it is given,
+       @param max_bytes bytes. The least recently used entries are evicted
+       first; reading an entry marks it as used.
+    """
+
+    FORMAT=1 # bump it when the layout of the cache entries changes
+    SUFFIX='.plan'
+
+    def __init__(self, cache_dir, max_entries=1000, max_bytes=None):
+        self._cache_dir=cache_dir
+        self._max_entries=max_entries
+        self._max_bytes=max_bytes
+
+    def key(self, supply_chain, settings):
+        """returns the cache key of @param supply_chain solved with
+           @param settings, a dictionary of the solver settings affecting the
+           plan"""
+        digest=hashlib.sha256(f'{VERSION}:{self.FORMAT}:{fingerprint(supply_chain)}:'.encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self._cache_dir, key+self.SUFFIX)
+
+    def get(self, key):
+        """returns the entry of @param key, a dictionary, or None if there is
+           no usable entry"""
+        path=self._entry_path(key)
+        try:
+            with open(path) as reader:
+                entry=json.load(reader)
+            os.utime(path) # marks the entry as recently used
+        except (OSError, ValueError):
+            return None
+        return entry if isinstance(entry, dict) and 'values' in entry else None
+
+    def put(self, key, status, objective, values):
+        """stores the plan given by @param status, @param objective and the
+           dictionary @param values under @param key if it is optimal, and
+           evicts entries beyond the limits"""
+        if status != 'Optimal':
+            return
+        os.makedirs(self._cache_dir, exist_ok=True)
+        path=self._entry_path(key)
+        tmp_path=f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as writer:
+            json.dump({'status': status, 'objective': objective, 'values': values}, writer)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """removes the least recently used entries beyond the limits"""
+        entries=[]
+        with os.scandir(self._cache_dir) as it:
+            for e in it:
+                if e.name.endswith(self.SUFFIX):
+                    st=e.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, e.path))
+        entries.sort()
+        total=sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if len(entries) <= self._max_entries and (self._max_bytes is None or total <= self._max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            entries=entries[1:]
+            total-=size
+
+    def plan(self, supply_chain, solver_cls=None, backend=None, **kwargs):
+        """returns the plan of @param supply_chain, a CachedPlan on a hit and
+           otherwise @param solver_cls, PlanningSolver by default, built with
+           @param backend and @param kwargs and solved. The plan of the solver
+           is stored."""
+        import lib.solver as sl # loaded on a miss only, see planner.py
+        solver_cls=solver_cls or sl.PlanningSolver
+        backend=backend or sl.SolverBackend()
+        settings=dict(kwargs, solver=backend.describe(), builder=solver_cls.__name__)
+        settings.pop('msg', None)
+        key=self.key(supply_chain, settings)
+        entry=self.get(key)
+        if entry is not None:
+            return CachedPlan(entry, backend)
+        solver=solver_cls(supply_chain, backend=backend, **kwargs)
+        solver.solve()
+        self.put(key, solver.status(), solver.objective(), solver.values())
+        return solver
+
+    def clear(self):
+        """removes all entries from the cache"""
+        if not os.path.isdir(self._cache_dir):
+            return
+        for fname in os.listdir(self._cache_dir):
+            if fname.endswith(self.SUFFIX):
+                os.remove(os.path.join(self._cache_dir, fname))
@@ -0,0 +1,334 @@
+from collections import OrderedDict
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import lib.batch as bt
+import lib.cache as ch
+import lib.entities as en
+import lib.parser as pr
+import lib.solver as sl
+import lib.supply_chain as sc
+
+
+class RequestError(Exception):
+    """An error of a request, answered with HTTP status @param code"""
+
+    def __init__(self, code, message):
+        super(RequestError, self).__init__(message)
+        self.code=code
+
+
+class ResidentModel:
+    """A resident model is a supply chain kept in memory together with the
+       problem built for it. A request which only changes order sizes and
+       stocks updates the bounds of that problem instead of building it
+       again, and the bounds are restored afterwards, so every request is
+       planned against the model as it is written in its file. Requests on
+       the same model are served one after the other.
+    """
+
+    def __init__(self, path, supply_chain, mtime):
+        self._path=path
+        self._supply_chain=supply_chain
+        self._mtime=mtime
+        self._solver=None
+        self._lock=threading.Lock()
+
+    def mtime(self):
+        return self._mtime
+
+    def plan(self, orders=None, stocks=None, suppliers_off=None, presolve=False, backend=None):
+        """plans the model with the overrides @param orders, @param stocks and
+           @param suppliers_off, as a scenario does, and returns the outcome.
+           It raises RequestError for overrides of undefined entities, of
+           entities of the wrong kind or of amounts which are not valid."""
+        with self._lock:
+            # checks the overrides before anything is changed
+            base=self._bounds(orders, stocks)
+            self._check_suppliers_off(suppliers_off)
+            if presolve or suppliers_off:
+                return self._plan_fresh(orders, stocks, suppliers_off, presolve, backend)
+            if self._solver is None:
+                self._solver=sl.PlanningSolver(self._supply_chain, msg=False, backend=backend)
+            solver=self._solver
+            solver.set_backend(backend or sl.SolverBackend())
+            try:
+                try:
+                    solver.update_bounds(orders, stocks)
+                except ValueError:
+                    # e.g. a stock for a component which had none when the problem was built
+                    return self._plan_fresh(orders, stocks, suppliers_off, presolve, backend)
+                solver.solve()
+                return _Plan(solver)
+            finally:
+                self._restore(solver, *base)
+
+    def _bounds(self, orders, stocks):
+        """returns the current order sizes and stocks of the entities given by
+           @param orders and @param stocks. It raises RequestError for
+           undefined entities, for entities of the wrong kind and for amounts
+           which are not non-negative integers."""
+        entity_dict=self._supply_chain._entity_dict
+        for overrides, kind, amount in ((orders, en.EntityType.PROD, 'order size'), (stocks, en.EntityType.COMP, 'stock')):
+            if overrides is None:
+                continue
+            if not isinstance(overrides, dict):
+                raise RequestError(400, f'The {amount}s are a JSON object mapping names into amounts.')
+            for name, value in overrides.items():
+                if name not in entity_dict:
+                    raise RequestError(400, f'"{name}" has not been defined.')
+                if entity_dict[name].get_type() != kind:
+                    raise RequestError(400, f'"{name}" is not a {"product" if kind == en.EntityType.PROD else "component"}.')
+                if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                    raise RequestError(400, f'The {amount} of "{name}" must be a non-negative integer, not {value!r}.')
+        return (dict((name, entity_dict[name]._order_size) for name in orders or {}),
+                dict((name, entity_dict[name]._stock) for name in stocks or {}))
+
+    def _check_suppliers_off(self, suppliers_off):
+        """raises RequestError unless @param suppliers_off is None or a list of
+           the names of entities"""
+        if suppliers_off is None:
+            return
+        if not isinstance(suppliers_off, list):
+            raise RequestError(400, 'The suppliers switched off are a JSON array of names.')
+        for name in suppliers_off:
+            if not isinstance(name, str) or name not in self._supply_chain._entity_dict:
+                raise RequestError(400, f'"{name}" has not been defined.')
+
+    def _restore(self, solver, orders, stocks):
+        """restores the order sizes @param orders and the stocks @param stocks
+           in the problem of @param solver, if they were changed"""
+        entity_dict=self._supply_chain._entity_dict
+        orders=dict((name, value) for name, value in orders.items() if entity_dict[name]._order_size != value)
+        stocks=dict((name, value) for name, value in stocks.items() if entity_dict[name]._stock != value)
+        if orders or stocks:
+            solver.update_bounds(orders, stocks)
+
+    def _plan_fresh(self, orders, stocks, suppliers_off, presolve, backend):
+        spch=bt.Scenario('request', orders, stocks, suppliers_off).apply(self._supply_chain)
+        solver=sl.PlanningSolver(spch, presolve=presolve, msg=False, backend=backend)
+        solver.solve()
+        return _Plan(solver)
+
+
+class _Plan:
+    """the outcome of a solver, taken while the model is locked"""
+
+    def __init__(self, solver):
+        self.status=solver.status()
+        self.objective=solver.objective()
+        self.values=solver.values()
+        self.solver=solver.backend().describe()
+
+
+class ModelRegistry:
+    """The registry holds the resident models, keyed by the real path of
+       their file. A model is loaded on its first request and again when its
+       file is modified. Only the files under the directory @param root, the
+       working directory by default, are served; relative paths are relative
+       to it. At most @param max_models models stay resident, the least
+       recently used one being dropped first. If @param cache_dir is given,
+       models are loaded through the model cache.
+    """
+
+    def __init__(self, cache_dir=None, jobs=1, root=None, max_models=16):
+        if max_models < 1:
+            raise ValueError('The registry needs room for at least one model.')
+        self._cache=ch.ModelCache(cache_dir) if cache_dir else None
+        self._jobs=jobs
+        self._root=os.path.realpath(root or os.getcwd())
+        self._max_models=max_models
+        self._models=OrderedDict() # in the order of their last use
+        self._lock=threading.Lock()
+
+    def resolve(self, modelfile):
+        """returns the real path of @param modelfile. It raises RequestError
+           if it is not under the root."""
+        if not isinstance(modelfile, str):
+            raise RequestError(400, 'The model is the path of a model file.')
+        path=os.path.realpath(os.path.join(self._root, modelfile))
+        if os.path.commonpath([self._root, path]) != self._root:
+            raise RequestError(403, f'"{modelfile}" is outside the model root.')
+        return path
+
+    def get(self, modelfile):
+        """returns the resident model of @param modelfile. It raises
+           RequestError if the file is outside the root, cannot be read or
+           does not hold a valid model."""
+        path=self.resolve(modelfile)
+        try:
+            mtime=os.stat(path).st_mtime_ns
+        except OSError as e:
+            raise RequestError(404, f'"{modelfile}" cannot be read: {e.strerror}.')
+        with self._lock:
+            model=self._models.get(path)
+            if model is None or model.mtime() != mtime:
+                try:
+                    model=ResidentModel(path, self._load(path), mtime)
+                except OSError as e:
+                    raise RequestError(404, f'"{modelfile}" cannot be read: {e.strerror}.')
+                except (KeyError, ValueError) as e:
+                    raise RequestError(400, f'"{modelfile}" is not a valid model: {e.args[0] if e.args else e}')
+                self._models[path]=model
+            self._models.move_to_end(path)
+            while len(self._models) > self._max_models:
+                self._models.popitem(last=False) # requests still planning it keep their reference
+            return model
+
+    def _load(self, path):
+        if self._cache:
+            return self._cache.load(path, self._jobs)
+        statements=pr.Parser(path).parse(self._jobs)
+        if statements is None:
+            raise ValueError(f'"{path}" could not be parsed.')
+        return sc.SupplyChain(statements)
+
+    def paths(self):
+        """returns the paths of the resident models"""
+        with self._lock:
+            return sorted(self._models)
+
+
+class PlanningDaemon:
+    """The planning daemon answers plan requests, keeping the models and their
+       problems in memory between requests. A request is a JSON object such as
+       {"model": "examples/example1.txt", "orders": {"p1": 20}, "stocks": {"c2": 0},
+        "suppliers_off": ["c1"], "presolve": false, "nonzero": true, "timeout": 10}
+       where only the model is mandatory, and is answered by the JSON object
+       {"status": ..., "objective": ..., "solver": ..., "seconds": ..., "values": {...}}.
+       At most @param max_concurrent requests are planned at a time; a request
+       waiting longer than its timeout for its turn is refused as busy. The
+       timeout, at most @param timeout seconds, also bounds the time of the
+       solver, which returns the best plan found by then. The models are
+       served from the directory @param root and at most @param max_models
+       of them stay resident, see ModelRegistry. An invalid request is
+       answered with a 4xx status, any other failure with 500.
+    """
+
+    def __init__(self, max_concurrent=4, timeout=60, cache_dir=None, jobs=1, backend=None, root=None, max_models=16):
+        if max_concurrent < 1 or timeout <= 0:
+            raise ValueError('The daemon needs a positive concurrency limit and timeout.')
+        self._registry=ModelRegistry(cache_dir, jobs, root, max_models)
+        self._slots=threading.BoundedSemaphore(max_concurrent)
+        self._timeout=timeout
+        self._backend=backend or sl.SolverBackend()
+
+    def registry(self):
+        return self._registry
+
+    def handle(self, request):
+        """answers @param request, a dictionary, and returns the HTTP status
+           code and the dictionary of the answer"""
+        try:
+            return 200, self._plan(request)
+        except RequestError as e:
+            return e.code, {'error': str(e)}
+        except Exception as e: # a failure of the daemon, not of the request
+            traceback.print_exc(file=sys.stderr)
+            return 500, {'error': f'The request failed: {e}'}
+
+    def _plan(self, request):
+        if not isinstance(request, dict) or 'model' not in request:
+            raise RequestError(400, 'A request is a JSON object with a "model" entry.')
+        timeout=request.get('timeout', self._timeout)
+        if not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or not timeout > 0:
+            raise RequestError(400, 'The timeout must be a positive number of seconds.')
+        timeout=min(timeout, self._timeout)
+        start=time.perf_counter()
+        model=self._registry.get(request['model'])
+        if not self._slots.acquire(timeout=timeout):
+            raise RequestError(503, f'The daemon is busy, no request finished within {timeout} seconds.')
+        try:
+            remaining=max(1, int(timeout-(time.perf_counter()-start)))
+            time_limit=self._backend.options()['time_limit']
+            backend=self._backend.replace(time_limit=min(time_limit or remaining, remaining))
+            plan=model.plan(request.get('orders'), request.get('stocks'), request.get('suppliers_off'),
+                            bool(request.get('presolve')), backend)
+        finally:
+            self._slots.release()
+        values=plan.values
+        if request.get('nonzero'):
+            values=dict((name, value) for name, value in values.items() if value)
+        return {'status': plan.status, 'objective': plan.objective, 'solver': plan.solver,
+                'seconds': time.perf_counter()-start, 'values': values}
+
+    def status(self):
+        """returns the dictionary answering a status request"""
+        return {'models': self._registry.paths(), 'timeout': self._timeout}
+
+    def server(self, address):
+        """returns the HTTP server of the daemon listening on @param address,
+           a (host, port) pair or the path of a Unix socket"""
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            server=_UnixHTTPServer(address, _Handler)
+        else:
+            server=_TCPHTTPServer(address, _Handler)
+        server.planning_daemon=self
+        return server
+
+    def serve(self, address):
+        """serves requests on @param address until interrupted"""
+        server=self.server(address)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if isinstance(address, str) and os.path.exists(address):
+                os.unlink(address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """answers POST /plan with a plan and GET /status with the resident models"""
+
+    timeout=30 # seconds to receive a request
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/status':
+            self._answer(404, {'error': f'Unknown path "{self.path}".'})
+        else:
+            self._answer(200, self.server.planning_daemon.status())
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/plan':
+            self._answer(404, {'error': f'Unknown path "{self.path}".'})
+            return
+        try:
+            length=int(self.headers.get('Content-Length', 0))
+            request=json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._answer(400, {'error': f'Invalid request: {e}'})
+            return
+        self._answer(*self.server.planning_daemon.handle(request))
+
+    def _answer(self, code, obj):
+        body=json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _TCPHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads=True
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads=True
+
+    def get_request(self):
+        request, _=super(_UnixHTTPServer, self).get_request()
+        return request, ('unix', 0)
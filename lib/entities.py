@@ -9,6 +9,7 @@ class ProductPriority:
 
 class Entity:
     """ An entity in supply chain"""
+    __slots__=('_entity_type',)
 
     def __init__(self, entity_type):
         self._entity_type=entity_type
@@ -18,6 +19,7 @@ class Entity:
 
 class Product(Entity):
     """The product class"""
+    __slots__=('_name', '_order_size', '_priority')
 
     def __init__(self, name, order_size, priority=ProductPriority.LOW):
         """constructs a product"""
@@ -28,6 +30,7 @@ class Product(Entity):
 
 class Component(Entity):
     """The component class"""
+    __slots__=('_name', '_stock')
 
     def __init__(self, name, stock):
         """constructs a component"""
@@ -43,6 +46,7 @@ class TransitionType:
 
 class Transition(Entity):
     """The transition class"""
+    __slots__=('_sources', '_target', '_tr_type')
 
     def __init__(self, sources, target, tr_type):
         """constructs a transition"""
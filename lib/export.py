@@ -0,0 +1,168 @@
+from array import array
+
+import lib.entities as en
+import lib.matrix as mx
+
+
+class ChainExporter:
+    """The exporter writes the planning problem of a supply chain as an LP or
+       MPS file for solving it elsewhere. Neither PuLP nor a solver is
+       involved. The MPS file is written section by section straight from the
+       graph of the chain, the rows of each column being derived from the
+       transitions around it, so the matrix is never held in memory. The LP
+       file is written row by row from the problem assembled by MatrixBuilder.
+       Both hold the same problem as MatrixBuilder, with the rows numbered
+       alike. Files whose name ends with .gz are compressed. The columns of
+       the MPS file carry the variable names.
+    """
+
+    FORMATS=('lp', 'mps')
+
+    def __init__(self, supply_chain):
+        self._supply_chain=supply_chain
+
+    @classmethod
+    def format_of(cls, filename):
+        """returns the format given by the extension of @param filename, i.e.
+           mps for .mps and .mps.gz and lp otherwise"""
+        name=filename[:-3] if filename.endswith('.gz') else filename
+        return 'mps' if name.lower().endswith('.mps') else 'lp'
+
+    def write(self, filename, fmt=None):
+        """writes the problem into @param filename in format @param fmt, which
+           is derived from the file name if it is not given. It returns the
+           numbers of variables and constraints that were written."""
+        fmt=fmt if fmt else self.format_of(filename)
+        if fmt not in self.FORMATS:
+            raise ValueError(f'Unknown format "{fmt}", the format is one of {", ".join(self.FORMATS)}.')
+        if fmt == 'mps':
+            return self._write_mps(filename)
+        model=mx.MatrixBuilder(self._supply_chain).build()
+        mx.write_lp(model, filename)
+        return model.num_columns(), model.num_rows()
+
+    def _write_mps(self, filename):
+        """writes the problem into @param filename in MPS format, in the layout
+           of write_mps(), and returns the numbers of columns and rows"""
+        g=self._supply_chain.graph()
+        nv, nt=g.num_entities(), g.num_transitions()
+        big_ms=g.big_ms()
+        inf=float('inf')
+
+        ### rows ###
+        # the rows of MatrixBuilder: the OR sums, the rows of each transition
+        # (one per source of an AND, three per branch of an OR and one for a
+        # supplier) and the leaf rows
+        or_trans=[t for t in range(nt) if g.tr_type[t] == en.TransitionType.OR]
+        senses=bytearray(b'E'*len(or_trans)) # the sense of each row, L, E or G
+        rhs=dict((r, 1.0) for r in range(len(or_trans))) # the nonzero right hand sides by row
+        row_base=array('i', bytes(4*nt)) # the first row of each transition
+        for t in range(nt):
+            row_base[t]=len(senses)
+            if g.tr_type[t] == en.TransitionType.AND:
+                senses.extend(b'E'*(g.src_ptr[t+1]-g.src_ptr[t]))
+            elif g.tr_type[t] == en.TransitionType.OR:
+                for n, (_, m_up, m_low) in enumerate(big_ms[t]):
+                    r=len(senses)
+                    senses.extend(b'LGL')
+                    if m_up:
+                        rhs[r]=float(m_up)
+                    if m_low:
+                        rhs[r+1]=-float(m_low)
+            else:
+                senses.extend(b'E')
+        leaf_row=array('i', [-1]*nv)
+        for v in range(nv):
+            if g.in_ptr[v] == g.in_ptr[v+1]:
+                leaf_row[v]=len(senses)
+                senses.extend(b'E')
+
+        def balance(v, coef):
+            """returns the entries of the outflow of entity @param v in the
+               rows balancing it, i.e. the rows of the transitions into it but
+               the selection rows of the OR branches, and its leaf row"""
+            entries=[]
+            for t in g.incoming(v):
+                base=row_base[t]
+                if g.tr_type[t] == en.TransitionType.AND:
+                    entries.extend((base+n, coef) for n in range(g.src_ptr[t+1]-g.src_ptr[t]))
+                elif g.tr_type[t] == en.TransitionType.OR:
+                    for n in range(g.src_ptr[t+1]-g.src_ptr[t]):
+                        entries.extend(((base+3*n, coef), (base+3*n+1, coef)))
+                else:
+                    entries.append((base, coef))
+            if leaf_row[v] >= 0:
+                entries.append((leaf_row[v], coef))
+            return entries
+
+        ### columns ###
+        # each column is (name, kind, index, lower bound, upper bound) in the
+        # order of MatrixBuilder; its entries are derived when it is written
+        columns=[(g.name(v), 'prod', v, 0, g.capacity[v]) for v in range(g.n_products)]
+        columns.extend((f"_i_{g.name(v)}", 'inv', v, 0, g.capacity[v]) for v in range(g.n_products, nv) if g.capacity[v] > 0)
+        columns.extend((f"_s_{g.name(g.tr_target[t])}", 'sup', t, 0, inf) for t in range(nt) if g.tr_type[t] == en.TransitionType.DIR)
+        for t in range(nt):
+            target=g.name(g.tr_target[t])
+            columns.extend((f"_{g.name(g.src[k])}_{target}", 'edge', k, 0, inf) for k in range(g.src_ptr[t], g.src_ptr[t+1]))
+        tr_of=array('i', bytes(4*len(g.src))) # the transition of each edge
+        for t in range(nt):
+            for k in range(g.src_ptr[t], g.src_ptr[t+1]):
+                tr_of[k]=t
+        for r, t in enumerate(or_trans):
+            target=g.name(g.tr_target[t])
+            columns.extend((f"_x_{g.name(g.src[k])}_{target}", 'or', (r, t, k), 0, 1) for k in range(g.src_ptr[t], g.src_ptr[t+1]))
+
+        def entries(kind, i):
+            """returns the objective coefficient and the entries of a column"""
+            if kind == 'prod':
+                return 1.0, balance(i, 1.0)
+            if kind == 'inv':
+                return 1.0, balance(i, -1.0)
+            if kind == 'sup':
+                return 0.0, [(row_base[i], -1.0)]
+            if kind == 'edge':
+                t=tr_of[i]
+                n=i-g.src_ptr[t]
+                if g.tr_type[t] == en.TransitionType.AND:
+                    own=[(row_base[t]+n, -1.0)]
+                else:
+                    r=row_base[t]+3*n
+                    own=[(r, -1.0), (r+1, -1.0), (r+2, 1.0)]
+                s=g.src[i]
+                return 0.0, own+([] if g.is_product(s) else balance(s, 1.0))
+            r, t, k=i
+            n=k-g.src_ptr[t]
+            _, m_up, m_low=big_ms[t][n]
+            base=row_base[t]+3*n
+            own=[(r, 1.0)]
+            own.extend((row, float(val)) for row, val in ((base, m_up), (base+1, -m_low), (base+2, -m_low)) if val)
+            return 0.0, own
+
+        with mx.open_text(filename) as writer:
+            writer.write('NAME          PLANNING\nROWS\n N  OBJ\n')
+            for r, sense in enumerate(senses):
+                writer.write(f' {chr(sense)}  R{r}\n')
+            writer.write('COLUMNS\n')
+            in_int=False
+            for name, kind, i, _, _ in sorted(columns, key=lambda col: col[0]):
+                if (kind == 'or') != in_int:
+                    in_int=kind == 'or'
+                    writer.write(f"    MARKER                 'MARKER'                 '{'INTORG' if in_int else 'INTEND'}'\n")
+                obj, col=entries(kind, i)
+                for row, val in sorted(col):
+                    writer.write(mx.mps_line('', name, f'R{row}', val))
+                if obj or not col: # keeps empty columns
+                    writer.write(mx.mps_line('', name, 'OBJ', obj))
+            if in_int:
+                writer.write("    MARKER                 'MARKER'                 'INTEND'\n")
+            writer.write('RHS\n')
+            for r in sorted(rhs):
+                writer.write(mx.mps_line('', 'RHS', f'R{r}', rhs[r]))
+            writer.write('BOUNDS\n')
+            for name, _, _, lb, ub in columns:
+                if lb != 0:
+                    writer.write(mx.mps_line('LO', 'BND', name, lb))
+                if ub != inf:
+                    writer.write(mx.mps_line('UP', 'BND', name, float(ub)))
+            writer.write('ENDATA\n')
+        return len(columns), len(senses)
@@ -0,0 +1,83 @@
+import random
+
+
+class ChainGenerator:
+    """The chain generator writes random valid supply chain models. The
+       components are arranged in @param depth layers, and every transition
+       takes its sources from the layer below its target, so the chain has no
+       cycles. A transition has one to @param fan_in sources and is an OR
+       transition with probability @param or_ratio if it has several. The
+       products are fed by the top layer. Each component is used by some
+       transition, so there are no dangling components. The components of the
+       bottom layer are fed by a supplier with probability @param supplier_ratio
+       and every component has a stock with probability @param stock_ratio.
+       The same @param seed generates the same model.
+    """
+
+    def __init__(self, n_products, n_components, depth=4, fan_in=3, or_ratio=0.2, stock_ratio=0.3,
+                 supplier_ratio=0.5, max_order=100, max_stock=50, seed=0):
+        if n_products < 1 or n_components < depth or depth < 1 or fan_in < 1:
+            raise ValueError('A chain needs a product, a component per layer, a layer and a source per transition.')
+        self._n_products=n_products
+        self._n_components=n_components
+        self._depth=depth
+        self._fan_in=fan_in
+        self._or_ratio=or_ratio
+        self._stock_ratio=stock_ratio
+        self._supplier_ratio=supplier_ratio
+        self._max_order=max_order
+        self._max_stock=max_stock
+        self._seed=seed
+
+    def _layers(self):
+        """returns the names of the components of each layer, the bottom one first"""
+        names=[f'c{i}' for i in range(self._n_components)]
+        bounds=[self._n_components*k//self._depth for k in range(self._depth+1)]
+        return [names[bounds[k]:bounds[k+1]] for k in range(self._depth)]
+
+    def _transitions(self, rnd, targets, layer):
+        """returns the transition statements of @param targets, taking their
+           sources from @param layer. The components of the layer are first
+           dealt to the targets in turn, so each of them is used, and the
+           targets are then topped up to a random number of sources. A target
+           may get more than fan_in sources if the layer is much larger."""
+        dealt=list(layer)
+        rnd.shuffle(dealt)
+        sources=[[] for _ in targets]
+        for k, src in enumerate(dealt):
+            sources[k%len(targets)].append(src)
+        stmts=[]
+        for target, srcs in zip(targets, sources):
+            n_sources=rnd.randint(1, min(self._fan_in, len(layer)))
+            while len(srcs) < n_sources:
+                src=rnd.choice(layer)
+                if src not in srcs:
+                    srcs.append(src)
+            op=' | ' if len(srcs) > 1 and rnd.random() < self._or_ratio else ' + '
+            stmts.append(f'{target} <- {op.join(srcs)};')
+        return stmts
+
+    def generate(self):
+        """returns the text of a random model"""
+        rnd=random.Random(self._seed)
+        layers=self._layers()
+        lines=['product '+', '.join(f'p{i}={rnd.randint(1, self._max_order)}'+(' high' if rnd.random() < 0.5 else '')
+                                    for i in range(self._n_products))+';']
+        components=[]
+        for layer in layers:
+            for name in layer:
+                stock=rnd.randint(1, self._max_stock) if rnd.random() < self._stock_ratio else 0
+                components.append(f'{name}={stock}' if stock else name)
+        lines.append('component '+', '.join(components)+';')
+        for name in layers[0]:
+            if rnd.random() < self._supplier_ratio:
+                lines.append(f'{name} <- supplier;')
+        for k in range(1, self._depth):
+            lines.extend(self._transitions(rnd, layers[k], layers[k-1]))
+        lines.extend(self._transitions(rnd, [f'p{i}' for i in range(self._n_products)], layers[-1]))
+        return '\n'.join(lines)+'\n'
+
+    def write(self, filename):
+        """writes a random model into @param filename"""
+        with open(filename, 'w') as writer:
+            writer.write(self.generate())
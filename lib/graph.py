@@ -0,0 +1,275 @@
+from array import array
+
+import lib.entities as en
+
+
+class ChainGraph:
+    """The chain graph is a compact integer-indexed representation of a supply
+       chain. Entity names are interned to integer ids, products first and then
+       components, and transitions are numbered in the order they are defined.
+       The adjacency is kept in CSR form, i.e. in flat arrays where the entries
+       of entity (or transition) v are stored at [ptr[v], ptr[v+1]):
+       - src_ptr/src: the source entities of each transition
+       - out_ptr/out_tr: the outgoing transitions of each entity, out_edge
+         holding the position of each outgoing edge in src
+       - in_ptr/in_tr: the incoming transitions of each entity
+       Building the graph verifies the chain, since interning the names detects
+       duplicate and undefined entities.
+    """
+
+    def __init__(self, products, components, transitions):
+        """constructs the graph of the chain given by @param products,
+           @param components and @param transitions. It raises the same errors
+           as SupplyChain._verify_the_chain.
+        """
+        self._intern(products, components)
+        self._build_transitions(transitions)
+        self._build_adjacency()
+
+    def _intern(self, products, components):
+        """assigns an id to each product and component"""
+        self.entities=[]
+        self.ids={}
+        ids=self.ids
+        for ent in products:
+            if ent._name in ids:
+                raise ValueError(f'"{ent._name}" was defined multiple times.')
+            ids[ent._name]=len(self.entities)
+            self.entities.append(ent)
+        self.n_products=len(self.entities)
+        for ent in components:
+            if ent._name in ids:
+                raise ValueError(f'"{ent._name}" was defined multiple times.')
+            ids[ent._name]=len(self.entities)
+            self.entities.append(ent)
+        # order size of products and stock of components
+        self.capacity=array('q', [p._order_size for p in products])
+        self.capacity.extend(c._stock for c in components)
+
+    def _build_transitions(self, transitions):
+        """stores the transitions in flat arrays and checks them"""
+        ids=self.ids
+        nv=len(self.entities)
+        self.transitions=transitions
+        self.tr_target=array('i')
+        self.tr_type=array('b')
+        self.src_ptr=array('i', [0])
+        self.src=array('i')
+        seen=set() # the (source, target) pairs encoded as (source+1)*nv+target, supplier being -1
+        for t in transitions:
+            if t._target not in ids:
+                raise KeyError(f'"{t._target}" has not been defined.')
+            target=ids[t._target]
+            if t._sources:
+                if t._target in t._sources: # a self loop
+                    raise ValueError(f'A self loop exist on "{t._target}"')
+                for s in t._sources:
+                    if s not in ids:
+                        raise KeyError(f'"{s}" has not been defined.')
+                    src=ids[s]
+                    key=(src+1)*nv+target
+                    if key in seen:
+                        raise ValueError(f'Transition from "{s}" to "{t._target}" was defined multiple times.')
+                    seen.add(key)
+                    self.src.append(src)
+            else:
+                if target in seen:
+                    raise ValueError(f'Transition from supplier to "{t._target}" was defined multiple times.')
+                seen.add(target)
+            self.tr_target.append(target)
+            self.tr_type.append(t._tr_type)
+            self.src_ptr.append(len(self.src))
+
+    def _build_adjacency(self):
+        """builds the outgoing and incoming transitions of the entities"""
+        nv=len(self.entities)
+        nt=len(self.tr_target)
+        out_deg=array('i', bytes(4*(nv+1)))
+        in_deg=array('i', bytes(4*(nv+1)))
+        for t in range(nt):
+            in_deg[self.tr_target[t]+1]+=1
+            for k in range(self.src_ptr[t], self.src_ptr[t+1]):
+                out_deg[self.src[k]+1]+=1
+        for v in range(nv):
+            out_deg[v+1]+=out_deg[v]
+            in_deg[v+1]+=in_deg[v]
+        self.out_ptr=array('i', out_deg)
+        self.in_ptr=array('i', in_deg)
+        self.out_tr=array('i', bytes(4*out_deg[nv]))
+        self.out_edge=array('i', bytes(4*out_deg[nv])) # the position of the edge in src
+        self.in_tr=array('i', bytes(4*in_deg[nv]))
+        # out_deg and in_deg are reused as the next free slot of each entity
+        for t in range(nt):
+            target=self.tr_target[t]
+            self.in_tr[in_deg[target]]=t
+            in_deg[target]+=1
+            for k in range(self.src_ptr[t], self.src_ptr[t+1]):
+                src=self.src[k]
+                self.out_tr[out_deg[src]]=t
+                self.out_edge[out_deg[src]]=k
+                out_deg[src]+=1
+
+    def num_entities(self):
+        return len(self.entities)
+
+    def num_transitions(self):
+        return len(self.tr_target)
+
+    def name(self, v):
+        """returns the name of entity @param v"""
+        return self.entities[v]._name
+
+    def is_product(self, v):
+        return v < self.n_products
+
+    def sources(self, t):
+        """returns the source entities of transition @param t"""
+        return self.src[self.src_ptr[t]:self.src_ptr[t+1]]
+
+    def outgoing(self, v):
+        """returns the outgoing transitions of entity @param v"""
+        return self.out_tr[self.out_ptr[v]:self.out_ptr[v+1]]
+
+    def incoming(self, v):
+        """returns the incoming transitions of entity @param v"""
+        return self.in_tr[self.in_ptr[v]:self.in_ptr[v+1]]
+
+    def has_supplier(self, v):
+        """checks whether entity @param v is directly fed by a supplier"""
+        return any(self.tr_type[t] == en.TransitionType.DIR for t in self.incoming(v))
+
+    def upper_bounds(self):
+        """computes upper bound on inflow into any entity.
+           The bound of a product is its order size and the bound of a component
+           is the sum of the bounds of the targets it feeds. The bounds are
+           propagated backwards from the products in reverse topological order,
+           so each transition is visited once.
+           It returns the list of bounds indexed by entity id.
+           It raises ValueError if the bound of some entity depends on a cycle.
+        """
+        src_ptr, src=self.src_ptr, self.src
+        nv=self.num_entities()
+
+        upper_bounds=[0]*nv
+        # the number of outgoing transitions whose target is not bounded yet
+        pending=[self.out_ptr[v+1]-self.out_ptr[v] for v in range(nv)]
+        worklist=[]
+        for v in range(nv):
+            if self.is_product(v):
+                upper_bounds[v]=self.capacity[v]
+                worklist.append(v)
+            elif pending[v] == 0:
+                worklist.append(v)
+        done=0
+        while worklist:
+            v=worklist.pop()
+            done+=1
+            for t in self.incoming(v):
+                for k in range(src_ptr[t], src_ptr[t+1]):
+                    s=src[k]
+                    if not self.is_product(s): # bounds of products are fixed
+                        upper_bounds[s]+=upper_bounds[v]
+                        pending[s]-=1
+                        if pending[s] == 0:
+                            worklist.append(s)
+        if done < nv:
+            self._report_unbounded([v for v in range(nv) if not self.is_product(v) and pending[v] > 0])
+        return upper_bounds
+
+    def _report_unbounded(self, unbounded):
+        """raises an error about the @param unbounded entities, i.e. those whose
+           outflow reaches a cycle. The entities on cycles are listed separately.
+        """
+        # trims the entities which are not fed by other unbounded entities, what
+        # remains lies on cycles or between them
+        remaining=set(unbounded)
+        fed=dict((v, 0) for v in unbounded)
+        for v in unbounded:
+            for t in self.outgoing(v):
+                if self.tr_target[t] in remaining:
+                    fed[self.tr_target[t]]+=1
+        worklist=[v for v in unbounded if fed[v] == 0]
+        while worklist:
+            v=worklist.pop()
+            remaining.discard(v)
+            for t in self.outgoing(v):
+                target=self.tr_target[t]
+                if target in remaining:
+                    fed[target]-=1
+                    if fed[target] == 0:
+                        worklist.append(target)
+        on_cycles=', '.join(f'"{self.name(v)}"' for v in sorted(remaining))
+        others=', '.join(f'"{self.name(v)}"' for v in unbounded if v not in remaining)
+        msg=f'The chain has cycles through {on_cycles}, so their upper bounds cannot be computed.'
+        if others:
+            msg+=f' The upper bounds of {others} depend on these cycles.'
+        raise ValueError(msg)
+
+    def supply_caps(self):
+        """computes upper bound on outflow of any entity from the supply side.
+           The cap of a component is its stock plus the smallest cap of its
+           incoming transitions, where the cap of an AND transition is the
+           smallest cap of its sources, the cap of an OR transition is the
+           largest one and a supplier is unlimited. A product is also capped by
+           its order size. The caps are propagated forwards in topological order.
+           It returns the list of caps indexed by entity id, float('inf') being
+           used for unlimited supply.
+        """
+        nv=self.num_entities()
+        inf=float('inf')
+
+        caps=[inf]*nv
+        # the number of incoming edges whose source has no cap yet. The outflow
+        # of a product is not tied to its outgoing transitions, so such edges
+        # are unlimited and never pending.
+        pending=[0]*nv
+        for t in range(self.num_transitions()):
+            pending[self.tr_target[t]]+=sum(1 for s in self.sources(t) if not self.is_product(s))
+        worklist=[v for v in range(nv) if pending[v] == 0]
+        while worklist:
+            v=worklist.pop()
+            cap=inf if self.incoming(v) else 0
+            for t in self.incoming(v):
+                if self.tr_type[t] == en.TransitionType.DIR:
+                    continue
+                src_caps=[inf if self.is_product(s) else caps[s] for s in self.sources(t)]
+                cap=min(cap, min(src_caps) if self.tr_type[t] == en.TransitionType.AND else max(src_caps))
+            caps[v]=min(self.capacity[v], cap) if self.is_product(v) else self.capacity[v]+cap
+            if not self.is_product(v):
+                for t in self.outgoing(v):
+                    target=self.tr_target[t]
+                    pending[target]-=1
+                    if pending[target] == 0:
+                        worklist.append(target)
+        return caps # entities on cycles keep an unlimited cap
+
+    def big_ms(self):
+        """computes the big-M values used to linearize the OR transitions.
+           For the branch of source s into target v, the constraint
+           outflow-inflow <= flow(s,v)+(1-x)*M must be inactive when the branch
+           is not selected. So M is bounded by the demand on v and by the supply
+           of the other branches. Likewise M of the reverse constraint is bounded
+           by the demand on v and the supply of s, and so is the flow of the
+           branch, i.e. flow(s,v) <= x*M, which keeps it zero unless the branch
+           is selected.
+           It returns a dictionary mapping the index of each OR transition into
+           the list of (demand bound, upper M, lower M) triples of its branches.
+           It raises ValueError as upper_bounds() does.
+        """
+        has_or=any(tr_type == en.TransitionType.OR for tr_type in self.tr_type)
+        upper_bounds=self.upper_bounds() if has_or else None
+        caps=self.supply_caps() if has_or else None
+        inf=float('inf')
+
+        big_ms={}
+        for t in range(self.num_transitions()):
+            if self.tr_type[t] != en.TransitionType.OR:
+                continue
+            ub=upper_bounds[self.tr_target[t]]
+            src_caps=[inf if self.is_product(s) else caps[s] for s in self.sources(t)]
+            branch_ms=[]
+            for n in range(len(src_caps)):
+                others=max(src_caps[:n]+src_caps[n+1:], default=0)
+                branch_ms.append((ub, min(ub, others), min(ub, src_caps[n])))
+            big_ms[t]=branch_ms
+        return big_ms
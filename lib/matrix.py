@@ -0,0 +1,355 @@
+from array import array
+import os
+import shutil
+import subprocess
+import gzip
+import tempfile
+
+import lib.entities as en
+
+
+class Sense:
+    """The sense of a row"""
+    LE=-1
+    EQ=0
+    GE=1
+
+class MatrixModel:
+    """The matrix model holds a linear program in flat arrays.
+       Columns have a name, bounds, an integrality flag and an objective
+       coefficient. Rows are stored in CSR form: the columns and coefficients
+       of row r are at [row_ptr[r], row_ptr[r+1]) of row_col and row_val. The
+       objective is maximized.
+    """
+
+    def __init__(self):
+        self.col_names=[]
+        self.col_lb=array('d')
+        self.col_ub=array('d')
+        self.col_int=array('b')
+        self.obj=array('d')
+        self.row_ptr=array('i', [0])
+        self.row_col=array('i')
+        self.row_val=array('d')
+        self.row_sense=array('b')
+        self.row_rhs=array('d')
+
+    def add_column(self, name, lb, ub, integer=False, obj=0.0):
+        """adds a column and returns its index"""
+        self.col_names.append(name)
+        self.col_lb.append(lb)
+        self.col_ub.append(ub)
+        self.col_int.append(integer)
+        self.obj.append(obj)
+        return len(self.col_names)-1
+
+    def add_row(self, cols, vals, sense, rhs):
+        """adds row sum(vals[k]*x[cols[k]]) @param sense @param rhs"""
+        self.row_col.extend(cols)
+        self.row_val.extend(vals)
+        self.row_ptr.append(len(self.row_col))
+        self.row_sense.append(sense)
+        self.row_rhs.append(rhs)
+
+    def num_columns(self):
+        return len(self.col_names)
+
+    def num_rows(self):
+        return len(self.row_sense)
+
+    def statistics(self):
+        """returns the numbers of columns, rows, integer columns and nonzero
+           coefficients, see PlanningSolver.statistics()"""
+        return {'variables': self.num_columns(),
+                'constraints': self.num_rows(),
+                'binaries': sum(self.col_int),
+                'nonzeros': len(self.row_col)}
+
+    def row(self, r):
+        """returns the columns and the coefficients of row @param r"""
+        start, end=self.row_ptr[r], self.row_ptr[r+1]
+        return self.row_col[start:end], self.row_val[start:end]
+
+    def repeat(self, n, name_format='{}@{}'):
+        """returns a model holding @param n copies of this model side by side,
+           i.e. with a block diagonal matrix. Column c of copy k is column
+           k*num_columns()+c and is named @param name_format.format(name, k).
+           The arrays of a copy are extended in bulk rather than column by
+           column and row by row."""
+        m=MatrixModel()
+        nc, nnz=self.num_columns(), len(self.row_col)
+        ptr=self.row_ptr[1:]
+        for k in range(n):
+            m.col_names.extend(name_format.format(name, k) for name in self.col_names)
+            m.col_lb.extend(self.col_lb)
+            m.col_ub.extend(self.col_ub)
+            m.col_int.extend(self.col_int)
+            m.obj.extend(self.obj)
+            m.row_ptr.extend(array('i', [p+k*nnz for p in ptr]))
+            m.row_col.extend(array('i', [c+k*nc for c in self.row_col]))
+            m.row_val.extend(self.row_val)
+            m.row_sense.extend(self.row_sense)
+            m.row_rhs.extend(self.row_rhs)
+        return m
+
+    def columns(self):
+        """returns the matrix in CSC form, i.e. the arrays col_ptr, col_row and
+           col_val holding the rows and coefficients of each column"""
+        nc=self.num_columns()
+        col_ptr=array('i', bytes(4*(nc+1)))
+        for c in self.row_col:
+            col_ptr[c+1]+=1
+        for c in range(nc):
+            col_ptr[c+1]+=col_ptr[c]
+        col_row=array('i', bytes(4*len(self.row_col)))
+        col_val=array('d', bytes(8*len(self.row_col)))
+        free=array('i', col_ptr)
+        for r in range(self.num_rows()):
+            for k in range(self.row_ptr[r], self.row_ptr[r+1]):
+                c=self.row_col[k]
+                col_row[free[c]]=r
+                col_val[free[c]]=self.row_val[k]
+                free[c]+=1
+        return col_ptr, col_row, col_val
+
+
+class MatrixBuilder:
+    """The matrix builder assembles the planning problem of PlanningSolver
+       directly from the graph of a supply chain, without modelling objects.
+       Columns are created in the order PlanningSolver creates its variables,
+       i.e. products, inventories, suppliers, transitions and OR branches, and
+       the rows are the same constraints. The column of the transition from a
+       source to a target is found by the position of the edge in the CSR
+       arrays of the graph, so no name is looked up.
+    """
+
+    def __init__(self, supply_chain, big_ms=None):
+        """@param big_ms are the big-M values of the OR branches, see
+           PlanningSolver._compute_big_ms(). They are computed from the graph
+           if not given."""
+        self._supply_chain=supply_chain
+        if big_ms is None:
+            big_ms=dict((t, [(m_up, m_low) for _, m_up, m_low in branch_ms])
+                        for t, branch_ms in supply_chain.graph().big_ms().items())
+        self._big_ms=big_ms
+
+    def build(self):
+        """returns the MatrixModel of the planning problem"""
+        g=self._supply_chain.graph()
+        nv, nt=g.num_entities(), g.num_transitions()
+        m=MatrixModel()
+        inf=float('inf')
+
+        ### columns ###
+        prod_col=[m.add_column(g.name(v), 0, g.capacity[v], obj=1.0) for v in range(g.n_products)]
+        inv_col=[-1]*nv
+        for v in range(g.n_products, nv):
+            if g.capacity[v] > 0:
+                inv_col[v]=m.add_column(f"_i_{g.name(v)}", 0, g.capacity[v], obj=1.0)
+        sup_col=[-1]*nv
+        for t in range(nt):
+            if g.tr_type[t] == en.TransitionType.DIR:
+                sup_col[g.tr_target[t]]=m.add_column(f"_s_{g.name(g.tr_target[t])}", 0, inf)
+        edge_base=m.num_columns() # the column of an edge is edge_base plus its position in src
+        for t in range(nt):
+            target=g.name(g.tr_target[t])
+            for s in g.sources(t):
+                m.add_column(f"_{g.name(s)}_{target}", 0, inf)
+        or_cols={} # the columns of the branches of each OR transition
+        for t in range(nt):
+            if g.tr_type[t] == en.TransitionType.OR:
+                target=g.name(g.tr_target[t])
+                or_cols[t]=[m.add_column(f"_x_{g.name(s)}_{target}", 0, 1, True) for s in g.sources(t)]
+
+        ### rows ###
+        for cols in or_cols.values():
+            m.add_row(cols, [1.0]*len(cols), Sense.EQ, 1.0)
+        def outflow(v):
+            if g.is_product(v):
+                return [prod_col[v]]
+            return [edge_base+g.out_edge[k] for k in range(g.out_ptr[v], g.out_ptr[v+1])]
+        for t in range(nt):
+            v=g.tr_target[t]
+            out_cols=outflow(v)
+            out_vals=[1.0]*len(out_cols)
+            if inv_col[v] >= 0:
+                out_cols.append(inv_col[v])
+                out_vals.append(-1.0)
+            tr_type=g.tr_type[t]
+            if tr_type == en.TransitionType.AND:
+                for k in range(g.src_ptr[t], g.src_ptr[t+1]):
+                    m.add_row(out_cols+[edge_base+k], out_vals+[-1.0], Sense.EQ, 0.0)
+            elif tr_type == en.TransitionType.OR:
+                for n, k in enumerate(range(g.src_ptr[t], g.src_ptr[t+1])):
+                    m_up, m_low=self._big_ms[t][n]
+                    x=or_cols[t][n]
+                    m.add_row(*self._with(out_cols+[edge_base+k], out_vals+[-1.0], x, m_up), Sense.LE, m_up)
+                    m.add_row(*self._with(out_cols+[edge_base+k], out_vals+[-1.0], x, -m_low), Sense.GE, -m_low)
+                    m.add_row(*self._with([edge_base+k], [1.0], x, -m_low), Sense.LE, 0.0)
+            else:
+                m.add_row(out_cols+[sup_col[v]], out_vals+[-1.0], Sense.EQ, 0.0)
+        for v in range(nv):
+            if g.in_ptr[v] == g.in_ptr[v+1]: # a leaf
+                out_cols=outflow(v)
+                out_vals=[1.0]*len(out_cols)
+                if inv_col[v] >= 0:
+                    out_cols.append(inv_col[v])
+                    out_vals.append(-1.0)
+                m.add_row(out_cols, out_vals, Sense.EQ, 0.0)
+        return m
+
+    @staticmethod
+    def _with(cols, vals, col, val):
+        """appends coefficient @param val of column @param col unless it is zero"""
+        if val:
+            return cols+[col], vals+[float(val)]
+        return cols, vals
+
+
+def mps_line(code, name, row, value):
+    """returns a data line in the fixed MPS layout"""
+    return f' {code:<2} {name:<8}  {row:<8}  {value:.12e}\n'
+
+def open_text(filename):
+    """opens @param filename for writing text, compressed if it ends with .gz"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt')
+    return open(filename, 'w')
+
+def write_mps(model, filename, names=False):
+    """writes @param model into @param filename in MPS format, compressed if
+       the name ends with .gz. The rows are named R<index>, and so are the
+       columns C<index> unless @param names is set. The columns are written in
+       the order of their names, as PuLP does, so the solver breaks ties
+       between optimal plans the same way."""
+    col_ptr, col_row, col_val=model.columns()
+    senses={Sense.LE: 'L', Sense.EQ: 'E', Sense.GE: 'G'}
+    col_name=model.col_names.__getitem__ if names else 'C{}'.format
+    with open_text(filename) as writer:
+        writer.write('NAME          PLANNING\nROWS\n N  OBJ\n')
+        for r, sense in enumerate(model.row_sense):
+            writer.write(f' {senses[sense]}  R{r}\n')
+        writer.write('COLUMNS\n')
+        in_int=False
+        for c in sorted(range(model.num_columns()), key=model.col_names.__getitem__):
+            if model.col_int[c] != in_int:
+                in_int=model.col_int[c]
+                writer.write(f"    MARKER                 'MARKER'                 '{'INTORG' if in_int else 'INTEND'}'\n")
+            for k in range(col_ptr[c], col_ptr[c+1]):
+                writer.write(mps_line('', col_name(c), f'R{col_row[k]}', col_val[k]))
+            if model.obj[c] or col_ptr[c] == col_ptr[c+1]: # keeps empty columns
+                writer.write(mps_line('', col_name(c), 'OBJ', model.obj[c]))
+        if in_int:
+            writer.write("    MARKER                 'MARKER'                 'INTEND'\n")
+        writer.write('RHS\n')
+        for r, rhs in enumerate(model.row_rhs):
+            if rhs:
+                writer.write(mps_line('', 'RHS', f'R{r}', rhs))
+        writer.write('BOUNDS\n')
+        for c in range(model.num_columns()):
+            lb, ub=model.col_lb[c], model.col_ub[c]
+            if lb != 0:
+                writer.write(mps_line('LO', 'BND', col_name(c), lb))
+            if ub != float('inf'):
+                writer.write(mps_line('UP', 'BND', col_name(c), ub))
+        writer.write('ENDATA\n')
+
+def write_lp(model, filename):
+    """writes @param model into @param filename in CPLEX LP format, compressed
+       if the name ends with .gz"""
+    senses={Sense.LE: '<=', Sense.EQ: '=', Sense.GE: '>='}
+    def terms(cols, vals):
+        return ' '.join(f"{'-' if v < 0 else '+'} {abs(v)!r} {model.col_names[c]}" for c, v in zip(cols, vals))
+    with open_text(filename) as writer:
+        writer.write('\\* Supply chain planning *\\\nMaximize\nOBJ: ')
+        writer.write(terms(*zip(*[(c, v) for c, v in enumerate(model.obj) if v])) if any(model.obj) else '0')
+        writer.write('\nSubject To\n')
+        for r in range(model.num_rows()):
+            cols, vals=model.row(r)
+            writer.write(f'R{r}: {terms(cols, vals)} {senses[model.row_sense[r]]} {model.row_rhs[r]!r}\n')
+        writer.write('Bounds\n')
+        for c, name in enumerate(model.col_names):
+            ub=model.col_ub[c]
+            writer.write(f'{model.col_lb[c]!r} <= {name} <= {ub!r}\n' if ub != float('inf') else f'{name} >= {model.col_lb[c]!r}\n')
+        ints=[name for c, name in enumerate(model.col_names) if model.col_int[c]]
+        if ints:
+            writer.write('Generals\n'+'\n'.join(ints)+'\n')
+        writer.write('End\n')
+
+# the status of the first word of the header of the solution file of CBC
+_STATUSES={'Optimal': 'Optimal', 'Infeasible': 'Infeasible', 'Integer': 'Infeasible',
+           'Unbounded': 'Unbounded', 'Stopped': 'Not Solved'}
+
+def read_solution(filename, model):
+    """reads the solution file written by CBC for @param model. It returns the
+       status and the list of column values. The status is the one PuLP
+       reports: a run stopped on a limit with an incumbent, e.g. with the
+       header "Stopped on time - objective value 12", is Optimal and its
+       values are the ones of the incumbent, which may not be optimal."""
+    values=[0.0]*model.num_columns()
+    with open(filename) as reader:
+        first=reader.readline()
+        for line in reader:
+            tokens=line.split()
+            if tokens and tokens[0] == '**': # marks infeasibilities
+                tokens=tokens[1:]
+            if len(tokens) >= 3 and tokens[1].startswith('C'):
+                values[int(tokens[1][1:])]=float(tokens[2])
+    header=first.split()
+    status=_STATUSES.get(header[0], 'Not Solved') if header else 'Not Solved'
+    if status == 'Not Solved' and len(header) >= 5 and header[4] == 'objective':
+        status='Optimal'
+    return status, values
+
+
+class CbcMatrixBackend:
+    """The backend solves a MatrixModel with the CBC executable, passing the
+       model as an MPS file. The executable bundled with PuLP is used unless
+       @param path is given. Unset @param threads, @param time_limit (in
+       seconds) and @param gap (the relative MIP gap) keep the defaults of CBC.
+       The log is printed if @param msg is set and written to @param log_path
+       if it is given.
+    """
+
+    def __init__(self, path=None, msg=True, threads=None, time_limit=None, gap=None, log_path=None):
+        self._path=path
+        self._msg=msg
+        self._threads=threads
+        self._time_limit=time_limit
+        self._gap=gap
+        self._log_path=log_path
+
+    def _executable(self):
+        if self._path:
+            return self._path
+        try:
+            import pulp
+            return pulp.PULP_CBC_CMD().path
+        except ImportError:
+            return shutil.which('cbc')
+
+    def solve(self, model, mip=True):
+        """solves @param model and returns its status and the list of column
+           values. If @param mip is not set, integrality is ignored."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mps_file=os.path.join(tmp_dir, 'model.mps')
+            sol_file=os.path.join(tmp_dir, 'model.sol')
+            write_mps(model, mps_file)
+            cmd=[self._executable(), mps_file, '-max', '-timeMode', 'elapsed']
+            if self._time_limit is not None:
+                cmd+=['-sec', str(self._time_limit)]
+            if self._gap is not None:
+                cmd+=['-ratio', str(self._gap)]
+            if self._threads is not None:
+                cmd+=['-threads', str(self._threads)]
+            cmd+=['-solve'] if mip else ['-initialSolve']
+            cmd+=['-printingOptions', 'all', '-solution', sol_file]
+            result=subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, check=False)
+            if self._msg:
+                print(result.stdout, end='')
+            if self._log_path:
+                with open(self._log_path, 'w') as writer:
+                    writer.write(result.stdout)
+            if not os.path.exists(sol_file):
+                return 'Not Solved', [0.0]*model.num_columns()
+            return read_solution(sol_file, model)
@@ -1,4 +1,8 @@
+import io
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
 import lib.entities as en
 
 class Pattern:
@@ -10,6 +14,13 @@ class Pattern:
     ID="[a-zA-Z_][a-zA-Z0-9_]*"
     PRODUCT_DEF=f"\\s{KEYWORDS['PROD_DEF']}\\s"
 
+    # the patterns below are compiled once and shared by all statements
+    FIRST_TOKEN=re.compile(f"\\s*(?P<first_token>{ID})\\s*(?P<the_rest>(?s:.*))")
+    PRODUCT=re.compile(f"^(\\s*(?P<pname>{ID})\\s*=\\s*(?P<ord_sz>[0-9]+)(\\s+(?P<priority>({KEYWORDS['PR_HIGH']})|({KEYWORDS['PR_LOW']})))?)$")
+    COMPONENT=re.compile(f"^(\\s*(?P<cname>{ID})\\s*(=\\s*(?P<stock>[0-9]+)\\s*)?)$")
+    TRANSITION=re.compile(f"\\s*(?P<target>{ID})\\s*<-(?P<sources>(?s:.*))")
+    SOURCE=re.compile(f"^(\\s*(?P<source>{ID})\\s*)$")
+
 class StatementType:
     """The type of statements are defined in this class
 
@@ -30,7 +41,7 @@ class Statement:
     @classmethod
     def factory(cls, stmt_str):
         # parse the first token
-        result=re.match(f"\s*(?P<first_token>{Pattern.ID})\s*(?P<the_rest>(?s:.*))",stmt_str)
+        result=Pattern.FIRST_TOKEN.match(stmt_str)
         if result:
             if result['first_token'] == Pattern.KEYWORDS['PROD_DEF']:
                 return ProductDef(result['the_rest'])
@@ -62,8 +73,7 @@ class ProductDef(Statement):
     def _parse(self, stmt_body):
         """parses a product definition statement"""
         prod_list=self._tokenize_def_body(stmt_body)
-        pattern=f"^(\s*(?P<pname>{Pattern.ID})\s*=\s*(?P<ord_sz>[0-9]+)(\s+(?P<priority>({Pattern.KEYWORDS['PR_HIGH']})|({Pattern.KEYWORDS['PR_LOW']})))?)$"
-        matcher=re.compile(pattern)
+        matcher=Pattern.PRODUCT
 
         self._products=[]
         for p in prod_list:
@@ -84,8 +94,7 @@ class ComponentDef(Statement):
     def _parse(self, stmt_body):
         """parses a component definition statement"""
         comp_list=self._tokenize_def_body(stmt_body)
-        pattern=f"^(\s*(?P<cname>{Pattern.ID})\s*(=\s*(?P<stock>[0-9]+)\s*)?)$"
-        matcher=re.compile(pattern)
+        matcher=Pattern.COMPONENT
 
         self._components=[]
         for p in comp_list:
@@ -113,12 +122,12 @@ class TransitionDef(Statement):
 
     def parse(self, stmt_body):
         """parses a tarnsition definition"""
-        res=re.match(f"\s*(?P<target>{Pattern.ID})\s*<-(?P<sources>(?s:.*))", stmt_body)
+        res=Pattern.TRANSITION.match(stmt_body)
 
         if res is None:
             raise ValueError('[ERR] Invalid transition.')
 
-        matcher=re.compile(f"^(\s*(?P<source>{Pattern.ID})\s*)$")
+        matcher=Pattern.SOURCE
         if res['sources'].find('|') > 0:
             tr_type=en.TransitionType.OR
             source_list=res['sources'].split('|')
@@ -143,6 +152,48 @@ class TransitionDef(Statement):
                 tr_type=en.TransitionType.AND
         self._transition=en.Transition(sources,res['target'],tr_type)
 
+def tokenize(reader, chunk_size=1<<20):
+    """splits the text read from @param reader into statement strings.
+       The input is consumed in chunks of @param chunk_size characters, so only
+       the chunk at hand and the statement being assembled are kept in memory.
+       It is a generator yielding the raw statements, including the empty ones.
+    """
+    pending=[] # the pieces of the statement which is not yet terminated
+    while True:
+        chunk=reader.read(chunk_size)
+        if not chunk:
+            break
+        pieces=chunk.split(';') # statements are delimited by ';'
+        pending.append(pieces[0])
+        for piece in pieces[1:]:
+            yield ''.join(pending)
+            pending=[piece]
+    yield ''.join(pending)
+
+def _non_empty(raw_statements):
+    """filters the empty statements out of @param raw_statements"""
+    for s in raw_statements:
+        if s and not s.isspace():
+            yield s
+
+def _parse_range(modelfile, start, end):
+    """parses the statements stored in bytes [@param start, @param end) of
+       @param modelfile. The range must start and end on statement boundaries.
+       It returns the list of statements parsed and, if an invalid statement is
+       found, a tuple with its index in the range, its text and the error
+       message. Otherwise the second value is None.
+    """
+    with open(modelfile,'rb') as reader:
+        reader.seek(start)
+        data=reader.read(end-start)
+    statements=[]
+    for s in _non_empty(tokenize(io.TextIOWrapper(io.BytesIO(data)))):
+        try:
+            statements.append(Statement.factory(s))
+        except Exception as e:
+            return statements, (len(statements), s, str(e))
+    return statements, None
+
 class Parser:
     """
        The Parser class parses and an input file describing a supply chain into
@@ -150,24 +201,94 @@ class Parser:
        of either a set of products, a set of componnents or a transition.
     """
 
+    MIN_RANGE_SIZE=1<<20 # the smallest byte range parsed by a worker process
+
     def __init__(self, modelfile):
         self._modelfile=modelfile
 
-    def parse(self):
+    def _read_statements(self):
+        """reads the model file lazily and yields its non-empty statement strings"""
+        with open(self._modelfile,"r") as reader:
+            yield from _non_empty(tokenize(reader))
+
+    def statements(self):
+        """parses the model file statement by statement. It is a generator
+           yielding the parsed statements and raises ValueError on the first
+           invalid one.
+        """
+        for s in self._read_statements():
+            yield Statement.factory(s)
+
+    def _split(self, n):
+        """splits the model file into at most @param n byte ranges of similar
+           size. Each range ends right after a ';', or at the end of file.
+           It returns the list of (start, end) pairs.
+        """
+        size=os.path.getsize(self._modelfile)
+        bounds=[0]
+        with open(self._modelfile,'rb') as reader:
+            for k in range(1, n):
+                pos=max(k*size//n, bounds[-1])
+                reader.seek(pos)
+                while True:
+                    block=reader.read(1<<16)
+                    if not block:
+                        pos=size
+                        break
+                    found=block.find(b';')
+                    if found >= 0:
+                        pos+=found+1
+                        break
+                    pos+=len(block)
+                if pos >= size:
+                    break
+                if pos > bounds[-1]:
+                    bounds.append(pos)
+        bounds.append(size)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    @staticmethod
+    def _report_error(position, stmt, error):
+        print(f'Error when parsing statement {position}: {stmt}')
+        print(f'More details:\n{error}')
+
+    def parse(self, jobs=1):
         """parses an input file describing a supply chain into a list of statements.
            It returns the list of statements.
+           If @param jobs is larger than one, the file is split into byte ranges
+           which are parsed by a pool of @param jobs processes. Zero or None
+           uses as many processes as there are CPUs.
         """
-        empty_stmt=re.compile('^(\s*)$') # matches an empty statement
-        with open(self._modelfile,"r") as reader:
-            stmt_list=reader.read().split(';') # statements are delimited by ';'
-            statements=[]
-            for s in stmt_list:
-                if empty_stmt.match(s) is None: # parses only if it is not an empty statement
-                    try:
-                        stmt=Statement.factory(s)
-                        statements.append(stmt)
-                    except Exception as e:
-                        print(f'Error when parsing statement {s}')
-                        print(f'More details:\n{e}')
-                        return None
+        if not jobs:
+            jobs=os.cpu_count() or 1
+        if jobs > 1:
+            n=min(4*jobs, os.path.getsize(self._modelfile)//self.MIN_RANGE_SIZE)
+            if n > 1: # not worth the pool for small files
+                return self._parse_parallel(self._split(n), jobs)
+        statements=[]
+        for s in self._read_statements():
+            try:
+                stmt=Statement.factory(s)
+                statements.append(stmt)
+            except Exception as e:
+                self._report_error(len(statements)+1, s, e)
+                return None
+        return statements
+
+    def _parse_parallel(self, ranges, jobs):
+        """parses the byte @param ranges of the model file with a pool of
+           @param jobs processes and merges the results in the file order.
+        """
+        statements=[]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures=[executor.submit(_parse_range, self._modelfile, start, end) for start,end in ranges]
+            for future in futures:
+                stmts, error=future.result()
+                if error is not None:
+                    index, s, e=error
+                    self._report_error(len(statements)+index+1, s, e)
+                    for f in futures:
+                        f.cancel()
+                    return None
+                statements.extend(stmts)
         return statements
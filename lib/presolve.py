@@ -0,0 +1,228 @@
+import lib.entities as en
+import lib.supply_chain as sc
+import lib.variables as vr
+
+
+class Presolver:
+    """The presolver reduces a supply chain before its planning problem is built.
+       It repeats the following steps until none of them applies:
+       - entities which cannot reach any product, or whose supply cap is zero,
+         are dropped. Their flows are zero in every plan. A transition losing an
+         AND source forces the inflow of its target to zero, so all transitions
+         into that target are dropped as well. An OR transition only loses the
+         branch, and becomes an AND transition when one branch is left.
+       - equivalent branches of an OR transition are pruned but the first one.
+         Two sources are equivalent if they are components used by this
+         transition only, with the same stock and the same incoming
+         transitions, so a plan selecting one of them is as good as a plan
+         selecting the other. An unselected branch carries no flow, see
+         ChainGraph.big_ms(), so the stock of a pruned source is not used by
+         the plans of the original chain either, and the optimum is kept.
+         Pruning breaks this symmetry, which the solver would otherwise
+         explore, and drops the binaries of the pruned branches.
+       - components without stock which pass the flow of a single AND source to
+         a single target are collapsed, i.e. the source feeds the target directly.
+       The binaries of dropped or single OR branches are fixed. postsolve() maps
+       a plan of the reduced chain back to the variables of the original one.
+    """
+
+    def __init__(self, supply_chain):
+        self._original=supply_chain
+        self._products=dict((p._name, (p._order_size, p._priority)) for p in supply_chain._products)
+        self._components=dict((c._name, c._stock) for c in supply_chain._components)
+        self._transitions=[(t._target, t._tr_type, list(t._sources) if t._sources else None) for t in supply_chain._transitions]
+        self._renames={} # variable names mapped into the names replacing them
+        self._fixed={}   # variable names mapped into their fixed values
+        self._unreachable=0
+        self._zero_supply=0
+        self._collapsed=0
+        self._pruned=0
+        self._fixed_binaries=0
+        self._reduced=None
+
+    def reduce(self):
+        """returns the reduced supply chain"""
+        while True:
+            spch=self._build()
+            g=spch.graph()
+            dead=self._find_dead(g)
+            if dead:
+                self._drop(g, dead)
+            elif not self._prune_equivalent(g) and not self._collapse(g):
+                break
+        self._reduced=spch
+        return spch
+
+    def _build(self):
+        """builds the supply chain of the current state"""
+        products=[en.Product(name, order_size, priority) for name, (order_size, priority) in self._products.items()]
+        components=[en.Component(name, stock) for name, stock in self._components.items()]
+        transitions=[en.Transition(sources, target, tr_type) for target, tr_type, sources in self._transitions]
+        return sc.SupplyChain.from_entities(products, components, transitions)
+
+    def _find_dead(self, g):
+        """returns the set of entities of graph @param g which can be dropped"""
+        useful=[g.is_product(v) for v in range(g.num_entities())]
+        worklist=list(range(g.n_products))
+        while worklist:
+            v=worklist.pop()
+            for t in g.incoming(v):
+                for s in g.sources(t):
+                    if not useful[s]:
+                        useful[s]=True
+                        worklist.append(s)
+        caps=g.supply_caps()
+        dead=set()
+        for v in range(g.num_entities()):
+            if not useful[v]:
+                dead.add(v)
+                self._unreachable+=1
+            elif caps[v] == 0:
+                dead.add(v)
+                self._zero_supply+=1
+        return dead
+
+    def _fix(self, name, value):
+        self._fixed[name]=value
+        self._fixed_binaries+=1
+
+    def _drop(self, g, dead):
+        """drops the @param dead entities of graph @param g and the transitions
+           whose flow becomes zero"""
+        forced=set() # live entities whose inflow is forced to zero
+        for t in range(g.num_transitions()):
+            target=g.tr_target[t]
+            if target in dead:
+                continue
+            is_dead=[s in dead for s in g.sources(t)]
+            if g.tr_type[t] == en.TransitionType.AND and any(is_dead):
+                forced.add(target)
+            elif g.tr_type[t] == en.TransitionType.OR and all(is_dead):
+                forced.add(target)
+        transitions=[]
+        for t, (target, tr_type, sources) in enumerate(self._transitions):
+            if g.tr_target[t] in dead or g.tr_target[t] in forced:
+                if tr_type == en.TransitionType.OR: # any branch may be selected
+                    for n, s in enumerate(sources):
+                        self._fix(f"_x_{s}_{target}", 1.0 if n == 0 else 0.0)
+                continue
+            if tr_type == en.TransitionType.OR:
+                live=[s for s in sources if g.ids[s] not in dead]
+                for s in sources:
+                    if g.ids[s] in dead:
+                        self._fix(f"_x_{s}_{target}", 0.0)
+                if len(live) == 1:
+                    self._fix(f"_x_{live[0]}_{target}", 1.0)
+                    tr_type=en.TransitionType.AND
+                sources=live
+            transitions.append((target, tr_type, sources))
+        self._transitions=transitions
+        for v in dead:
+            if g.is_product(v):
+                del self._products[g.name(v)]
+            else:
+                del self._components[g.name(v)]
+
+    @staticmethod
+    def _signature(g, v):
+        """returns the signature of entity @param v of graph @param g as the
+           source of an OR transition, equal for equivalent sources, or None if
+           @param v may not be pruned"""
+        if g.is_product(v) or len(g.outgoing(v)) != 1:
+            return None
+        incoming=sorted((g.tr_type[u], tuple(sorted(g.sources(u)))) for u in g.incoming(v))
+        return g.capacity[v], tuple(incoming)
+
+    def _prune_equivalent(self, g):
+        """prunes the equivalent branches of the OR transitions of graph
+           @param g, keeping the first of them. It returns True if any branch
+           was pruned."""
+        transitions=[]
+        pruned=self._pruned
+        for t, (target, tr_type, sources) in enumerate(self._transitions):
+            if tr_type == en.TransitionType.OR:
+                first={} # the signatures mapped into the first source having them
+                kept=[]
+                for s in sources:
+                    signature=self._signature(g, g.ids[s])
+                    if signature is not None and signature in first:
+                        self._fix(f"_x_{s}_{target}", 0.0)
+                        self._pruned+=1
+                        continue
+                    if signature is not None:
+                        first[signature]=s
+                    kept.append(s)
+                if len(kept) == 1:
+                    self._fix(f"_x_{kept[0]}_{target}", 1.0)
+                    tr_type=en.TransitionType.AND
+                sources=kept
+            transitions.append((target, tr_type, sources))
+        self._transitions=transitions
+        return self._pruned > pruned
+
+    def _collapse(self, g):
+        """collapses the pass-through components of graph @param g. The entities
+           involved in a collapse are not touched again in the same pass. It
+           returns True if any component was collapsed.
+        """
+        touched=set()
+        removed=set() # the indices of the transitions into collapsed components
+        for v in range(g.n_products, g.num_entities()):
+            if v in touched or g.capacity[v] != 0:
+                continue
+            incoming, outgoing=g.incoming(v), g.outgoing(v)
+            if len(incoming) != 1 or len(outgoing) != 1 or g.tr_type[incoming[0]] != en.TransitionType.AND:
+                continue
+            sources=g.sources(incoming[0])
+            if len(sources) != 1 or g.is_product(sources[0]) or sources[0] in touched:
+                continue
+            s, u=sources[0], outgoing[0]
+            w=g.tr_target[u]
+            if w in touched or w == s or any(s in g.sources(t) for t in g.incoming(w)):
+                continue
+            src, name, target=g.name(s), g.name(v), g.name(w)
+            self._renames[f"_{src}_{name}"]=f"_{src}_{target}"
+            self._renames[f"_{name}_{target}"]=f"_{src}_{target}"
+            if g.tr_type[u] == en.TransitionType.OR:
+                self._renames[f"_x_{name}_{target}"]=f"_x_{src}_{target}"
+            u_sources=self._transitions[u][2]
+            u_sources[u_sources.index(name)]=src
+            removed.add(incoming[0])
+            del self._components[name]
+            touched.update((s, v, w))
+            self._collapsed+=1
+        self._transitions=[tr for t, tr in enumerate(self._transitions) if t not in removed]
+        return bool(removed)
+
+    def _value(self, name, values):
+        """returns the value of variable @param name of the original chain"""
+        while True:
+            if name in self._fixed:
+                return self._fixed[name]
+            if name not in self._renames:
+                return values.get(name, 0.0)
+            name=self._renames[name]
+
+    def postsolve(self, values):
+        """maps @param values, the dictionary of the variable values of the
+           reduced chain, into the values of the variables of the original chain"""
+        return dict((name, self._value(name, values)) for name in vr.variable_names(self._original))
+
+    def report(self):
+        """returns a summary of the reductions"""
+        original, reduced=self._original, self._reduced
+        n_orig=len(original._products)+len(original._components)
+        n_red=len(reduced._products)+len(reduced._components) if reduced else n_orig
+        t_red=len(reduced._transitions) if reduced else len(original._transitions)
+        b_orig=_num_binaries(original)
+        b_red=_num_binaries(reduced) if reduced else b_orig
+        return (f"Presolve: removed {self._unreachable} unreachable and {self._zero_supply} zero-supply entities, "
+                f"collapsed {self._collapsed} pass-through components, pruned {self._pruned} equivalent OR branches, "
+                f"fixed {self._fixed_binaries} binaries\n"
+                f"Entities: {n_orig} -> {n_red}, transitions: {len(original._transitions)} -> {t_red}, "
+                f"binaries: {b_orig} -> {b_red} ({b_orig-b_red} eliminated)")
+
+
+def _num_binaries(supply_chain):
+    """returns the number of binaries of the planning problem of @param supply_chain"""
+    return sum(len(t._sources) for t in supply_chain._transitions if t._tr_type == en.TransitionType.OR)
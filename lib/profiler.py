@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+import json
+import os
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource=None
+
+
+def _children_cpu():
+    """returns the CPU time of the finished child processes, e.g. the solver"""
+    t=os.times()
+    return t.children_user+t.children_system
+
+def _children_peak_rss():
+    """returns the largest resident set size of the finished child processes
+       in bytes, or None if it is not known"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss*1024 # kilobytes on Linux
+
+
+class Profiler:
+    """The profiler records the wall time, the CPU time and the peak memory of
+       the stages of a run, together with statistics of the model. A stage is
+       timed by the with statement, e.g.
+
+           profiler=Profiler()
+           with profiler.stage('parse'):
+               stmts=Parser(modelfile).parse()
+           profiler.set_model_statistics(solver.statistics())
+           print(profiler.to_json())
+
+       The CPU time includes the child processes finished during the stage, so
+       the time spent by a solver executable is counted. The peak memory is the
+       peak of the memory allocated by Python during the stage, traced by
+       tracemalloc if @param memory is set, which slows down allocations. The
+       peak resident size of the solver process is reported separately.
+    """
+
+    def __init__(self, memory=True):
+        self._memory=memory
+        self._stages=[]
+        self._model={}
+
+    @contextmanager
+    def stage(self, name):
+        """records the stage @param name, i.e. the body of the with statement"""
+        started_tracing=False
+        if self._memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing=True
+            elif hasattr(tracemalloc, 'reset_peak'): # python 3.9 and above
+                tracemalloc.reset_peak()
+            base=tracemalloc.get_traced_memory()[0]
+        wall, cpu, child_cpu=time.perf_counter(), time.process_time(), _children_cpu()
+        try:
+            yield
+        finally:
+            record={'name': name,
+                    'wall_seconds': time.perf_counter()-wall,
+                    'cpu_seconds': time.process_time()-cpu+_children_cpu()-child_cpu}
+            if self._memory:
+                record['peak_bytes']=tracemalloc.get_traced_memory()[1]-base
+                if started_tracing:
+                    tracemalloc.stop()
+            self._stages.append(record)
+
+    def set_model_statistics(self, statistics):
+        """records @param statistics, the dictionary of the model statistics"""
+        self._model=dict(statistics or {})
+
+    def report(self):
+        """returns the records of the stages and the model statistics"""
+        return {'stages': list(self._stages),
+                'total': {'wall_seconds': sum(s['wall_seconds'] for s in self._stages),
+                          'cpu_seconds': sum(s['cpu_seconds'] for s in self._stages)},
+                'solver_peak_rss_bytes': _children_peak_rss(),
+                'model': self._model}
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2)
@@ -1,6 +1,19 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import shutil
+import tempfile
+
 import pulp
 
 import lib.entities as en
+from lib.backend import SolverBackend
+import lib.export as ex
+import lib.matrix as mx
+import lib.presolve as ps
+import lib.supply_chain as sc
+import lib.tree_solver as ts
+import lib.variables as vr
 
 class Solver:
     """The solver class solves a problem on supply chain
@@ -20,131 +33,677 @@ class Solver:
 class PlanningSolver(Solver):
     """The solver class for supply chain planning"""
 
-    def __init__(self, supply_chain):
+    def __init__(self, supply_chain, fast_path=True, presolve=False, msg=True, backend=None):
+        """constructs the solver. If @param fast_path is set, chains without OR
+           transitions are solved without the MILP machinery, see solve(). If
+           @param presolve is set, the problem is built for the chain reduced by
+           Presolver, and values() reports the plan of the original chain.
+           The problem is solved by @param backend, CBC with its defaults if it
+           is not given, and the solver log is printed if @param msg is set.
+        """
+        self._fast_path=fast_path
+        self._msg=msg
+        self._backend=backend if backend else SolverBackend()
+        self._presolver=None
+        if presolve:
+            self._presolver=ps.Presolver(supply_chain)
+            supply_chain=self._presolver.reduce()
         super(PlanningSolver, self).__init__(supply_chain)
 
     def _initialize(self):
-        self._prob=pulp.LpProblem("Supply chain planning", pulp.LpMaximize) # creating the problem
+        # the problem is built when it is first needed, see _problem(), so a
+        # chain solved by TreeSolver never builds it
+        g=self._supply_chain.graph()
+        self._or_free=all(tr_type != en.TransitionType.OR for tr_type in g.tr_type)
+        self._big_m_tightening=[] if self._or_free else None # None until computed, see _compute_big_ms()
+        self._prob=None
+        self._tree_values=None
 
-        spch=self._supply_chain # the supply chain
-        prods=spch._products    # the products in the supply chain
-        comps=spch._components  # the components in the supply chain
-        trans=spch._transitions # the transitions in the supply chain
+    def _problem(self):
+        """returns the problem, building it if it has not been built yet"""
+        if self._prob is None:
+            self._build()
+        return self._prob
+
+    def _build(self):
+        """builds the problem of the chain"""
+        self._prob, self._vars, self._or_rows=self._formulate()
+        self._warm_start=False
+
+    def _formulate(self, selected=None):
+        """returns the problem of the chain, the dictionary of its variables
+           but the OR binaries, and the big-M constraints of the OR branches,
+           see update_bounds(). If @param selected, mapping each OR transition
+           into the index of its selected branch, is given, the problem is the
+           LP with the branches fixed, which has neither binaries nor big-M
+           constraints: the flow of the selected branch is the inflow of the
+           target and the flows of the other branches are fixed to zero.
+        """
+        prob=pulp.LpProblem("Supply chain planning", pulp.LpMaximize) # creating the problem
+        or_rows=[]
+
+        # the problem is built from the integer-indexed graph of the chain: the
+        # variables are kept in lists indexed by entity, or by the position of
+        # an edge in g.src, so no name is looked up while building
+        g=self._supply_chain.graph()
+        nv, nt=g.num_entities(), g.num_transitions()
+        names=[g.name(v) for v in range(nv)]
 
         ### variable definition ###
         # a variable for each product
-        prod_vars=dict([(p._name,pulp.LpVariable(p._name,0,p._order_size)) for p in prods])
+        prod_vars=[pulp.LpVariable(names[v],0,g.capacity[v]) for v in range(g.n_products)]
         # a variable for each inventory with positive stock
-        inv_vars=dict([("_i_"+c._name,pulp.LpVariable("_i_"+c._name,0,c._stock)) for c in comps if c._stock > 0])
+        inv_vars=[None]*nv
+        for v in range(g.n_products, nv):
+            if g.capacity[v] > 0:
+                inv_vars[v]=pulp.LpVariable("_i_"+names[v],0,g.capacity[v])
         # a variable for each supplier with is connected to an entity
-        sup_vars=dict([("_s_"+t._target,pulp.LpVariable("_s_"+t._target,0)) for t in trans if t._tr_type == en.TransitionType.DIR])
-        # a variable for each transition between two entities
-        trans_var_pairs=[]
-        for t in trans:
-            if t._sources:
-                trans_var_pairs.extend([(f"_{s}_{t._target}",pulp.LpVariable(f"_{s}_{t._target}",0)) for s in t._sources])
-        trans_vars=dict(trans_var_pairs)
+        sup_vars=[None]*nv
+        for t in range(nt):
+            if g.tr_type[t] == en.TransitionType.DIR:
+                sup_vars[g.tr_target[t]]=pulp.LpVariable("_s_"+names[g.tr_target[t]],0)
+        # a variable for each transition between two entities, indexed by the position of the edge
+        edge_vars=[pulp.LpVariable(f"_{names[g.src[k]]}_{names[g.tr_target[t]]}",0)
+                   for t in range(nt) for k in range(g.src_ptr[t], g.src_ptr[t+1])]
         # a variable for each branch of or operators
-        or_var_list=dict([(t._target, [pulp.LpVariable(f"_x_{s}_{t._target}",0,1,pulp.LpInteger) for s in t._sources]) for t in trans if t._tr_type == en.TransitionType.OR])
+        or_vars=dict((t, [pulp.LpVariable(f"_x_{names[s]}_{names[g.tr_target[t]]}",0,1,pulp.LpInteger) for s in g.sources(t)])
+                     for t in range(nt) if g.tr_type[t] == en.TransitionType.OR and selected is None)
+        variables=dict((var.name, var) for var in prod_vars+[var for var in inv_vars+sup_vars if var is not None]+edge_vars)
 
         ### constraints ###
         # or variable constraints: sum of or variables must be 1
-        for _,or_vars in or_var_list.items():
-            self._prob += pulp.lpSum(or_vars) == 1
-        # computing the upper bound of inflow into entities
-        upper_bounds=self._compute_upper_bounds()
+        for _,branch_vars in or_vars.items():
+            prob += pulp.lpSum(branch_vars) == 1
+        # computing the big-M values of the OR branches from the bounds on inflow into entities
+        big_ms=self._compute_big_ms() if or_vars else {}
+        def outflow(v):
+            if g.is_product(v): # the outflow of a product goes all into the product
+                return prod_vars[v]
+            return pulp.lpSum([edge_vars[g.out_edge[k]] for k in range(g.out_ptr[v], g.out_ptr[v+1])])
         # conservation law constraints
-        for t in trans:
-            target=t._target
-            # computing outflow
-            if self.is_product(target): # if the transition target is a product, the outflow goes all into the product
-                outflow=prod_vars[target]
-            else: # otherwise the transition target is a component, so we need to find the outflow
-                outgoing_trans=spch._outgoings[target] #the outgoing transitions
-                outflow=pulp.lpSum([trans_vars[f"_{target}_{ot._target}"] for ot in outgoing_trans])
-
-            ### computing inflow and adding conservation law contraint
+        for t in range(nt):
+            target=g.tr_target[t]
+            out=outflow(target)
             # add the inventory to the inflow if its stock is positive
-            inflow=inv_vars[f"_i_{target}"] if self.has_positive_stock(target) else 0
-            if t._tr_type == en.TransitionType.AND: # if transition is an AND transition
-                if t._sources:
-                    for s in t._sources:
-                        self._prob+=outflow==trans_vars[f"_{s}_{target}"]+inflow
-            elif t._tr_type == en.TransitionType.OR: # if transition is an OR transition
-                if t._sources:
-                    for n,s in enumerate(t._sources):
-                        self._prob+=outflow-inflow <= trans_vars[f"_{s}_{target}"]+(1-or_var_list[target][n])*upper_bounds[target]
-                        self._prob+=outflow-inflow >= trans_vars[f"_{s}_{target}"]-(1-or_var_list[target][n])*upper_bounds[target]
+            inflow=inv_vars[target] if inv_vars[target] is not None else 0
+            if g.tr_type[t] == en.TransitionType.AND:
+                for k in range(g.src_ptr[t], g.src_ptr[t+1]):
+                    prob+=out==edge_vars[k]+inflow
+            elif g.tr_type[t] == en.TransitionType.OR and selected is not None:
+                for n,k in enumerate(range(g.src_ptr[t], g.src_ptr[t+1])):
+                    if n == selected[t]:
+                        prob+=out-inflow==edge_vars[k]
+                    else:
+                        edge_vars[k].upBound=0
+            elif g.tr_type[t] == en.TransitionType.OR:
+                for n,k in enumerate(range(g.src_ptr[t], g.src_ptr[t+1])):
+                    m_up, m_low=big_ms[t][n]
+                    x=or_vars[t][n]
+                    c_up=out-inflow <= edge_vars[k]+(1-x)*m_up
+                    c_low=out-inflow >= edge_vars[k]-(1-x)*m_low
+                    # an unselected branch carries no flow, so its source cannot dump stock into it
+                    c_sel=edge_vars[k] <= m_low*x
+                    self._set_coefficient(c_sel, x, -m_low)
+                    prob+=c_up
+                    prob+=c_low
+                    prob+=c_sel
+                    or_rows.append((t, n, c_up, c_low, c_sel, x))
             else: # the transition is a direct transition from supplier to an entity
-                inflow+=sup_vars[f"_s_{target}"]
-                self._prob+=outflow==inflow
+                prob+=out==inflow+sup_vars[target]
         # add leaf contrains
-        for leaf in spch._leaves:
-            # computing outflow
-            if self.is_product(leaf): # if the transition target is a product, the outflow goes all into the product
-                outflow=prod_vars[leaf]
-            else: # otherwise the transition target is a component, so we need to find the outflow
-                outgoing_trans=spch._outgoings[leaf] #the outgoing transitions
-                outflow=pulp.lpSum([trans_vars[f"_{leaf}_{ot._target}"] for ot in outgoing_trans])
-            # add the inventory to the inflow if its stock is positive
-            inflow=inv_vars[f"_i_{leaf}"] if self.has_positive_stock(leaf) else 0
-            self._prob+=outflow==inflow
+        for v in range(nv):
+            if g.in_ptr[v] == g.in_ptr[v+1]:
+                prob+=outflow(v)==(inv_vars[v] if inv_vars[v] is not None else 0)
 
         # the objective: Maximize the sum of products and the sum of inventory outflows
-        self._prob += pulp.lpSum([v for _,v in prod_vars.items()]) + pulp.lpSum([inv for _,inv in inv_vars.items()])
+        prob += pulp.lpSum(prod_vars) + pulp.lpSum([var for var in inv_vars if var is not None])
+        return prob, variables, or_rows
 
     def _compute_upper_bounds(self):
         """computes upper bound on inflow into any entity.
            It is essential for linearization of OR constraints.
            It returns a dictionary mapping an entity name into its upper bound flow.
+           See ChainGraph.upper_bounds().
         """
-        spch=self._supply_chain # the supply chain
-        prods=spch._products    # the products in the supply chain
-        trans=spch._transitions # the transitions in the supply chain
-
-        upper_bound_dict=dict([(p._name,p._order_size) for p in prods])
-
-        # keep updating the upper bound until reaching a fixed point
-        done=False
-        while not done:
-            done=True
-            for t in trans:
-                if t._target not in upper_bound_dict:
-                    ub=0
-                    updated=True
-                    for out_tr in spch._outgoings[t._target]:
-                        if out_tr._target in upper_bound_dict:
-                            ub += upper_bound_dict[out_tr._target]
-                        else:
-                            updated=False
-                            break
-                    if updated:
-                        upper_bound_dict[t._target]=ub
-                        done=False
-                    else:
-                        continue
-        return upper_bound_dict
+        g=self._supply_chain.graph() # the graph of the supply chain
+        return dict((g.name(v), ub) for v, ub in enumerate(g.upper_bounds()))
+
+    def _compute_supply_caps(self):
+        """computes upper bound on outflow of any entity from the supply side.
+           It returns the list of caps indexed by entity id, see
+           ChainGraph.supply_caps().
+        """
+        return self._supply_chain.graph().supply_caps()
+
+    def _compute_big_ms(self):
+        """computes the big-M values used to linearize the OR transitions, see
+           ChainGraph.big_ms(). It returns a dictionary mapping the index of
+           each OR transition into the list of (upper M, lower M) pairs of its
+           branches. The tightening is recorded in self._big_m_tightening, see
+           big_m_report().
+        """
+        g=self._supply_chain.graph()
+        big_ms={}
+        self._big_m_tightening=[]
+        for t, branch_ms in g.big_ms().items():
+            target=g.name(g.tr_target[t])
+            big_ms[t]=[(m_up, m_low) for _, m_up, m_low in branch_ms]
+            self._big_m_tightening.extend((target, g.name(s), ub, m_up, m_low)
+                                          for s, (ub, m_up, m_low) in zip(g.sources(t), branch_ms))
+        return big_ms
+
+    def big_m_report(self):
+        """returns a report on how much the big-M value of each OR branch was
+           tightened compared to the demand bound of its target"""
+        if self._big_m_tightening is None:
+            self._compute_big_ms()
+        tightening=self._big_m_tightening
+        loose=sum(2*ub for _,_,ub,_,_ in tightening)
+        tight=sum(m_up+m_low for _,_,_,m_up,m_low in tightening)
+        tightened=sum(1 for _,_,ub,m_up,m_low in tightening if m_up < ub or m_low < ub)
+        lines=[f"Big-M tightening: {tightened} of {len(tightening)} OR branches tightened, total M {loose} -> {tight}"]
+        lines.extend(f"{target} <- {src}: M={ub} -> upper={m_up}, lower={m_low}" for target,src,ub,m_up,m_low in tightening)
+        return '\n'.join(lines)
+
+    def bottlenecks(self):
+        """returns the bounds limiting the plan, i.e. the order sizes of the
+           products and the stocks of the components, ranked by the value of
+           one more unit of each. The values are the duals of the bounds, i.e.
+           the reduced costs, in the LP with the OR branches fixed to the ones
+           of the plan, see _formulate(), so a single solve answers the
+           question for every bound. The problem is solved first if it has
+           not been. Each entry is the tuple (name, kind, bound, used,
+           marginal value), the kind being product or inventory. The marginal
+           value holds for small changes of the bound as long as the same
+           branches are selected, and is one of several valid values if the
+           LP is degenerate; CBC does not report ranging on its command line,
+           so the range over which it holds is not given.
+           It raises ValueError for a presolved problem and if the plan is
+           not optimal.
+        """
+        if self._presolver:
+            raise ValueError('The bottlenecks of a presolved problem cannot be reported.')
+        if self.status() == pulp.LpStatus[pulp.LpStatusNotSolved]:
+            self.solve()
+        if self.status() != pulp.LpStatus[pulp.LpStatusOptimal]:
+            raise ValueError('The bottlenecks are only reported for an optimal plan.')
+        selected=dict((t, n) for t, n, _, _, _, x in (self._or_rows if self._prob else []) if round(x.varValue or 0) == 1)
+        prob, variables, _=self._formulate(selected)
+        prob.solve(self._backend.command(False, False))
+        entries=[]
+        for ent in self._supply_chain._products:
+            var=variables[ent._name]
+            entries.append((ent._name, vr.VariableKind.PRODUCT, ent._order_size, var.varValue, 0.0+(var.dj or 0)))
+        for ent in self._supply_chain._components:
+            var=variables.get(f"_i_{ent._name}")
+            if var is not None:
+                entries.append((ent._name, vr.VariableKind.INVENTORY, ent._stock, var.varValue, 0.0+(var.dj or 0)))
+        entries.sort(key=lambda entry: (-entry[4], entry[0]))
+        return entries
+
+    def bottleneck_report(self):
+        """returns a report of the bounds ranked by their marginal value, see
+           bottlenecks()"""
+        entries=self.bottlenecks()
+        binding=sum(1 for entry in entries if entry[4] > 0)
+        lines=[f"Bottlenecks: {binding} of {len(entries)} bounds limit the objective"]
+        lines.extend(f"{name} ({kind}): bound={bound}, used={used}, value of one more unit={marginal}"
+                     for name, kind, bound, used, marginal in entries)
+        return '\n'.join(lines)
 
     def solve(self):
-        self._prob.solve()
+        """solves the planning problem. Without OR transitions the problem has
+           no integer variables, so if the fast path is enabled it is either
+           solved combinatorially, when the chain is a forest (see TreeSolver),
+           or handed to the solver as a pure LP.
+        """
+        if self._fast_path and self._or_free:
+            if self._solve_tree():
+                return
+            self._solve_model(mip=False)
+        else:
+            self._solve_model(mip=True)
+
+    def _solve_model(self, mip):
+        """hands the problem to the solver, ignoring integrality unless @param mip is set"""
+        self._tree_values=None
+        self._problem().solve(self._backend.command(mip, self._msg, self._warm_start))
+
+    def _solve_tree(self):
+        """solves the problem with TreeSolver and stores the plan, see
+           _assign(), without building the problem. It returns False if the
+           chain is not a forest."""
+        values=ts.TreeSolver(self._supply_chain).solve()
+        if values is None:
+            return False
+        self._assign(values)
+        return True
+
+    def _assign(self, values):
+        """stores the optimal plan given by @param values, the dictionary of
+           variable names mapped into their values, see _raw_values()"""
+        self._tree_values=dict((name, float(values.get(name, 0))) for name in vr.variable_names(self._supply_chain))
+
+    def update_bounds(self, orders=None, stocks=None):
+        """updates the problem already built to new order sizes and stocks.
+           @param orders maps product names into their new order sizes and
+           @param stocks maps component names into their new stocks. The
+           entities and the graph of the chain are updated, and in the problem
+           only the bounds of the variables and the big-M values of the OR
+           branches, which depend on them, change. The next solve() starts from
+           the current plan.
+           It raises KeyError for an undefined entity and ValueError if a
+           component had no stock when the problem was built, or if the problem
+           was presolved, since the reductions depend on the bounds.
+        """
+        if self._presolver:
+            raise ValueError('The bounds of a presolved problem cannot be updated.')
+        self._problem() # the inventories of the problem are fixed when it is built
+        g=self._supply_chain.graph()
+        changes=[]
+        for name, order_size in (orders or {}).items():
+            v=self._entity_id(name)
+            if not g.is_product(v):
+                raise ValueError(f'"{name}" is not a product.')
+            changes.append((v, order_size))
+        for name, stock in (stocks or {}).items():
+            v=self._entity_id(name)
+            if g.is_product(v):
+                raise ValueError(f'"{name}" is not a component.')
+            if f"_i_{name}" not in self._vars:
+                raise ValueError(f'"{name}" has no inventory in the problem, since it had no stock when the problem was built.')
+            changes.append((v, stock))
+        for v, capacity in changes:
+            g.capacity[v]=capacity # fails for a non-integer before the entity is changed
+            ent=g.entities[v]
+            if g.is_product(v):
+                ent._order_size=capacity
+            else:
+                ent._stock=capacity
+        self._update_problem([v for v, _ in changes])
+
+    def _entity_id(self, name):
+        if name not in self._supply_chain.graph().ids:
+            raise KeyError(f'"{name}" has not been defined.')
+        return self._supply_chain.graph().ids[name]
+
+    def _update_problem(self, changed):
+        """updates the bounds of the variables of the @param changed entities
+           and the big-M values of the OR branches"""
+        g=self._supply_chain.graph()
+        for v in changed:
+            name=g.name(v)
+            self._vars[name if g.is_product(v) else f"_i_{name}"].upBound=g.capacity[v]
+        if self._or_rows:
+            big_ms=self._compute_big_ms()
+            for t, n, c_up, c_low, c_sel, x in self._or_rows:
+                m_up, m_low=big_ms[t][n]
+                self._set_coefficient(c_up, x, m_up)
+                c_up.changeRHS(m_up)
+                self._set_coefficient(c_low, x, -m_low)
+                c_low.changeRHS(-m_low)
+                self._set_coefficient(c_sel, x, -m_low)
+        self._warm_start=self._prob.status != pulp.LpStatusNotSolved
+
+    @staticmethod
+    def _set_coefficient(constraint, var, value):
+        """sets the coefficient of @param var in @param constraint, dropping it if zero"""
+        if value:
+            constraint.expr[var]=value
+        else:
+            constraint.expr.pop(var, None)
+
+    def statistics(self):
+        """returns the statistics of the problem, i.e. the numbers of its
+           variables, constraints, binaries and nonzero coefficients. If the
+           problem has not been built, they are counted on the same problem
+           assembled by MatrixBuilder, which is cheaper to build."""
+        if self._prob is None:
+            big_ms=self._compute_big_ms() if not self._or_free else {}
+            return mx.MatrixBuilder(self._supply_chain, big_ms).build().statistics()
+        constraints=self._prob.constraints.values()
+        return {'variables': len(self._prob.variables()),
+                'constraints': len(constraints),
+                'binaries': sum(1 for v in self._prob.variables() if v.cat == pulp.LpInteger),
+                'nonzeros': sum(len(c.expr) for c in constraints)}
+
+    def presolve_report(self):
+        """returns the summary of the presolve reductions, or None without presolve"""
+        return self._presolver.report() if self._presolver else None
+
+    def values(self):
+        """returns the dictionary mapping the variable names into their values"""
+        values=self._raw_values()
+        if self._presolver:
+            values=self._presolver.postsolve(values)
+        return values
+
+    def _raw_values(self):
+        """returns the values of the variables of the problem that was built"""
+        if self._tree_values is not None:
+            return dict(self._tree_values)
+        if self._prob is None:
+            return dict((name, None) for name in vr.variable_names(self._supply_chain))
+        return dict((v.name, v.varValue) for v in self._prob.variables())
 
     def write_lp(self, filename):
-        self._prob.writeLP(filename)
+        """writes the problem into @param filename, in MPS format if its name
+           ends with .mps and compressed if it ends with .gz, see
+           ChainExporter.format_of()"""
+        fmt=ex.ChainExporter.format_of(filename)
+        if not filename.endswith('.gz'):
+            self._write_problem(filename, fmt)
+            return
+        with tempfile.TemporaryDirectory() as tmp_dir: # PuLP writes plain files only
+            path=os.path.join(tmp_dir, f'problem.{fmt}')
+            self._write_problem(path, fmt)
+            with open(path) as reader, mx.open_text(filename) as writer:
+                shutil.copyfileobj(reader, writer)
+
+    def _write_problem(self, filename, fmt):
+        if fmt == 'mps':
+            self._problem().writeMPS(filename)
+        else:
+            self._problem().writeLP(filename)
 
     def is_product(self, name):
-        return self._supply_chain._entity_dict[name].get_type() == en.EntityType.PROD
+        g=self._supply_chain.graph()
+        return g.is_product(g.ids[name])
 
     def has_positive_stock(self, name):
-        ent=self._supply_chain._entity_dict[name]
-        return ent.get_type() == en.EntityType.COMP and ent._stock > 0
+        g=self._supply_chain.graph()
+        v=g.ids[name]
+        return not g.is_product(v) and g.capacity[v] > 0
+
+    def status(self):
+        """returns the status of the problem, e.g. Optimal"""
+        if self._tree_values is not None:
+            return pulp.LpStatus[pulp.LpStatusOptimal]
+        if self._prob is None:
+            return pulp.LpStatus[pulp.LpStatusNotSolved]
+        return pulp.LpStatus[self._prob.status]
 
     def objective(self):
         """returns the optimal value"""
+        if self._tree_values is not None: # the sum of products and inventory outflows
+            return sum(self._tree_values[name] for name, kind in vr.variable_kinds(self._supply_chain)
+                       if kind in (vr.VariableKind.PRODUCT, vr.VariableKind.INVENTORY))
+        if self._prob is None:
+            return None
         return pulp.value(self._prob.objective)
 
+    def backend(self):
+        """returns the solver backend"""
+        return self._backend
+
+    def set_backend(self, backend):
+        """sets the solver backend used by the next solve()"""
+        self._backend=backend
+
     def __str__(self):
-        prob=self._prob
-        status=f"Status: {pulp.LpStatus[prob.status]}"
+        status=f"Status: {self.status()}\nSolver: {self._backend.describe()}"
         obj=f"Objective={self.objective()}"
-        opt_vals='\n'.join([f"{v.name}={v.varValue}" for v in prob.variables()])
+        opt_vals='\n'.join([f"{name}={value}" for name,value in sorted(self.values().items())])
         return f"{status}\n\n{obj}\n\n{opt_vals}"
+
+class MatrixPlanningSolver(PlanningSolver):
+    """The solver builds the same problem as PlanningSolver, but assembles its
+       matrix directly from the graph of the chain, see MatrixBuilder, instead of
+       building PuLP expressions constraint by constraint. The matrix is handed
+       to @param backend, CbcMatrixBackend by default.
+    """
+
+    def __init__(self, supply_chain, fast_path=True, presolve=False, msg=True, backend=None):
+        super(MatrixPlanningSolver, self).__init__(supply_chain, fast_path, presolve, msg, backend)
+        if self._backend.name() != 'cbc':
+            raise ValueError('The matrix builder only supports the cbc solver.')
+        self._matrix_backend=mx.CbcMatrixBackend(msg=msg, **self._backend.options())
+
+    def _initialize(self):
+        g=self._supply_chain.graph()
+        self._or_free=all(tr_type != en.TransitionType.OR for tr_type in g.tr_type)
+        self._big_m_tightening=[]
+        big_ms=self._compute_big_ms() if not self._or_free else {}
+        self._model=mx.MatrixBuilder(self._supply_chain, big_ms).build()
+        self._vars=dict((name, c) for c, name in enumerate(self._model.col_names))
+        self._status='Not Solved'
+        self._col_values=None
+
+    def bottlenecks(self):
+        raise ValueError('The bottleneck report needs the problem built by PuLP.')
+
+    def _problem(self):
+        return self._model
+
+    def _update_problem(self, changed):
+        # the bounds and the big-M values are written in place when the matrix
+        # is assembled, which is cheaper than patching its rows
+        big_ms=self._compute_big_ms() if not self._or_free else {}
+        self._model=mx.MatrixBuilder(self._supply_chain, big_ms).build()
+
+    def _solve_model(self, mip):
+        self._status, self._col_values=self._matrix_backend.solve(self._model, mip)
+
+    def _assign(self, values):
+        self._col_values=[float(values.get(name, 0)) for name in self._model.col_names]
+        self._status='Optimal'
+
+    def _raw_values(self):
+        model=self._model
+        col_values=self._col_values if self._col_values else [None]*model.num_columns()
+        return dict(zip(model.col_names, col_values))
+
+    def write_lp(self, filename):
+        if ex.ChainExporter.format_of(filename) == 'mps':
+            mx.write_mps(self._model, filename, names=True)
+        else:
+            mx.write_lp(self._model, filename)
+
+    def statistics(self):
+        return self._model.statistics()
+
+    def status(self):
+        return self._status
+
+    def objective(self):
+        if self._col_values is None:
+            return None
+        return sum(c*v for c, v in zip(self._model.obj, self._col_values))
+
+
+class MultiPeriodPlanningSolver(MatrixPlanningSolver):
+    """The solver plans the chain over @param periods periods in one problem.
+       @param orders is the list of the order sizes of each period, a
+       dictionary mapping product names into their order sizes, which default
+       to the ones of the model. @param arrivals is the list of the stocks
+       arriving at the start of each period, a dictionary mapping component
+       names into amounts; the stocks of the model are on hand at the start of
+       the first period. Stock which is not used in a period is carried over
+       to the next one, recorded by the variable _l_{component}@{period}.
+       The problem of a single period is assembled once, see MatrixBuilder,
+       for the chain with the largest orders and all the stock of the horizon,
+       so its big-M values hold in every period. It is then copied for each
+       period in bulk, see MatrixModel.repeat(), and the copies are linked by
+       the carryover rows. The variables of period t are named {name}@{t}.
+       It raises KeyError for undefined entities and ValueError for entities
+       of the wrong kind.
+    """
+
+    def __init__(self, supply_chain, periods, orders=None, arrivals=None, msg=True, backend=None):
+        if periods < 1:
+            raise ValueError('The horizon needs at least one period.')
+        orders=list(orders or [])+[{}]*(periods-len(orders or []))
+        arrivals=list(arrivals or [])+[{}]*(periods-len(arrivals or []))
+        if len(orders) > periods or len(arrivals) > periods:
+            raise ValueError(f'The orders and arrivals are given for more than {periods} periods.')
+        entity_dict=supply_chain._entity_dict
+        for kind, per_period in ((en.EntityType.PROD, orders), (en.EntityType.COMP, arrivals)):
+            for amounts in per_period:
+                for name in amounts:
+                    if name not in entity_dict:
+                        raise KeyError(f'"{name}" has not been defined.')
+                    if entity_dict[name].get_type() != kind:
+                        raise ValueError(f'"{name}" is not a {"product" if kind == en.EntityType.PROD else "component"}.')
+        self._periods=periods
+        self._order_sizes=[dict((p._name, o.get(p._name, p._order_size)) for p in supply_chain._products) for o in orders]
+        self._arrivals=[dict((c._name, a.get(c._name, 0)+(c._stock if t == 0 else 0)) for c in supply_chain._components)
+                        for t, a in enumerate(arrivals)]
+        products=[en.Product(p._name, max(o[p._name] for o in self._order_sizes), p._priority) for p in supply_chain._products]
+        components=[en.Component(c._name, sum(a[c._name] for a in self._arrivals)) for c in supply_chain._components]
+        horizon=sc.SupplyChain.from_entities(products, components, supply_chain._transitions)
+        super(MultiPeriodPlanningSolver, self).__init__(horizon, fast_path=False, msg=msg, backend=backend)
+
+    def _initialize(self):
+        super(MultiPeriodPlanningSolver, self)._initialize()
+        block, block_vars=self._model, self._vars
+        nc=block.num_columns()
+        m=block.repeat(self._periods)
+        for t, order_sizes in enumerate(self._order_sizes):
+            for name, order_size in order_sizes.items():
+                m.col_ub[t*nc+block_vars[name]]=order_size
+        inf=float('inf')
+        for c in self._supply_chain._components:
+            inv=block_vars.get(f"_i_{c._name}")
+            if inv is None: # no stock over the whole horizon
+                continue
+            level=None
+            for t in range(self._periods):
+                # stock left = stock left before + arrivals - stock used
+                cols, vals=[m.add_column(f"_l_{c._name}@{t}", 0, inf), t*nc+inv], [1.0, 1.0]
+                if level is not None:
+                    cols.append(level)
+                    vals.append(-1.0)
+                m.add_row(cols, vals, mx.Sense.EQ, self._arrivals[t][c._name])
+                level=cols[0]
+        self._model=m
+        self._vars=dict((name, c) for c, name in enumerate(m.col_names))
+
+    def update_bounds(self, orders=None, stocks=None):
+        """raises ValueError, since the bounds of a multi-period problem are
+           given per period when it is built"""
+        raise ValueError('The bounds of a multi-period problem are given per period.')
+
+    def periods(self):
+        return self._periods
+
+    def period_values(self, t):
+        """returns the dictionary mapping the variable names of period @param t,
+           without the period suffix, into their values"""
+        suffix=f"@{t}"
+        return dict((name[:-len(suffix)], value) for name, value in self.values().items() if name.endswith(suffix))
+
+
+def read_periods(filename):
+    """reads the periods of a multi-period plan from @param filename. Each
+       non-empty line of the file is a JSON object such as
+       {"orders": {"p1": 20}, "arrivals": {"c2": 5}}
+       giving the order sizes and the stock arrivals of a period, see
+       MultiPeriodPlanningSolver; both are optional. It returns the list of
+       orders and the list of arrivals. It raises ValueError for malformed
+       lines and for other keys, e.g. the stocks of a scenario.
+    """
+    orders, arrivals=[], []
+    with open(filename) as reader:
+        for n, line in enumerate(reader, 1):
+            if not line.strip():
+                continue
+            try:
+                obj=json.loads(line)
+                unknown=sorted(set(obj)-{'orders', 'arrivals'})
+                if unknown:
+                    raise ValueError(f'unknown keys {", ".join(unknown)}, a period has orders and arrivals')
+                orders.append(dict(obj.get('orders') or {}))
+                arrivals.append(dict(obj.get('arrivals') or {}))
+            except (ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f'Invalid period at line {n} of "{filename}": {e}')
+    return orders, arrivals
+
+
+def _solve_part(part, solver_cls, fast_path, msg, backend):
+    """solves the sub-chain @param part and returns its status, objective,
+       variable values, big-M tightening and statistics"""
+    slvr=solver_cls(part, fast_path=fast_path, msg=msg, backend=backend)
+    slvr.solve()
+    return slvr.status(), slvr.objective(), slvr.values(), slvr._big_m_tightening, slvr.statistics()
+
+class DecomposedPlanningSolver(PlanningSolver):
+    """The solver splits the chain into the sub-chains which share no entities,
+       see SupplyChain.sub_chains(), and solves a problem per sub-chain with
+       @param solver_cls. The sub-problems are solved by a pool of @param jobs
+       processes, zero or None using as many processes as there are CPUs. The
+       objectives and the plans of the sub-chains are merged, so the result is
+       the same as the one of the whole problem. The solver log of sub-chain k
+       is written to the log file of @param backend suffixed by .{k}.
+    """
+
+    def __init__(self, supply_chain, fast_path=True, presolve=False, msg=True, backend=None, jobs=1, solver_cls=PlanningSolver):
+        self._jobs=jobs if jobs else os.cpu_count() or 1
+        self._solver_cls=solver_cls
+        super(DecomposedPlanningSolver, self).__init__(supply_chain, fast_path, presolve, msg, backend)
+
+    def _initialize(self):
+        self._parts=self._supply_chain.sub_chains()
+        self._big_m_tightening=[]
+        self._results=None
+
+    def num_parts(self):
+        """returns the number of sub-chains"""
+        return len(self._parts)
+
+    def _part_backend(self, k):
+        """returns the backend of the sub-chain @param k, which writes its log,
+           if any, to the log file of the backend suffixed by .{k}"""
+        log_path=self._backend.options()['log_path']
+        return self._backend.replace(log_path=f'{log_path}.{k}') if log_path else self._backend
+
+    def solve(self):
+        n=len(self._parts)
+        backends=[self._part_backend(k) for k in range(n)]
+        args=(self._parts, [self._solver_cls]*n, [self._fast_path]*n, [self._msg]*n, backends)
+        if self._jobs == 1 or len(self._parts) == 1:
+            self._results=list(map(_solve_part, *args))
+        else:
+            with ProcessPoolExecutor(min(self._jobs, len(self._parts))) as executor:
+                self._results=list(executor.map(_solve_part, *args))
+        self._big_m_tightening=[entry for result in self._results for entry in result[3]]
+
+    def update_bounds(self, orders=None, stocks=None):
+        raise ValueError('The bounds of a decomposed problem cannot be updated.')
+
+    def bottlenecks(self):
+        raise ValueError('The bottlenecks of a decomposed problem cannot be reported.')
+
+    def statistics(self):
+        """returns the statistics summed over the sub-problems and their
+           number, or None before the problem is solved"""
+        if self._results is None:
+            return None
+        stats={'parts': len(self._results)}
+        for result in self._results:
+            for key, value in result[4].items():
+                stats[key]=stats.get(key, 0)+value
+        return stats
+
+    def _raw_values(self):
+        if self._results is None:
+            return dict((name, None) for name in vr.variable_names(self._supply_chain))
+        values={}
+        for result in self._results:
+            values.update(result[2])
+        return values
+
+    def write_lp(self, filename):
+        """writes the problem of the whole chain"""
+        self._solver_cls(self._supply_chain, fast_path=self._fast_path, msg=self._msg, backend=self._backend).write_lp(filename)
+
+    def status(self):
+        """returns the status of the first sub-problem which is not optimal,
+           i.e. Optimal if all sub-problems are"""
+        if self._results is None:
+            return pulp.LpStatus[pulp.LpStatusNotSolved]
+        return next((status for status, *_ in self._results if status != 'Optimal'), 'Optimal')
+
+    def objective(self):
+        if self._results is None or any(obj is None for _, obj, *_ in self._results):
+            return None
+        return sum(obj for _, obj, *_ in self._results)
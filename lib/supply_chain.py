@@ -1,90 +1,268 @@
+import lib.entities as en
+import lib.graph as gr
 import lib.parser as pr
 
 
 class SupplyChain:
-    """Supply chain class represents a supply chain
+    """Supply chain class represents a supply chain. Besides its entities and
+       transitions, the chain keeps its integer-indexed graph, see graph(),
+       from which the problems are built. The views keyed by name, i.e. the
+       entity dictionary, the incoming and outgoing transitions and the
+       leaves, are only built when they are first used, e.g. by an edit.
+       The entities are kept in dictionaries keyed by name and the transitions
+       in a dictionary keyed by their identity, so that an edit adds or removes
+       them in constant time while keeping their order. The lists
+       _products, _components and _transitions are built from them on demand.
+       An edit does not patch the graph: it is dropped and built again, in
+       time linear in the size of the chain, when it is next asked for, so a
+       batch of edits costs a single rebuild.
     """
 
+    _VIEWS=('_entity_dict', '_outgoings', '_incomings', '_leaves')
+
     def __init__(self, statements):
         """constructs a supply chain from the statements parsed from a supply chain
            description.
         """
         self._extract_entities(statements)
         self._verify_the_chain()
+
+    def __getattr__(self, name):
+        """builds the views keyed by name when one of them is first used, see
+           _build_outgoings()"""
+        if name not in SupplyChain._VIEWS:
+            raise AttributeError(name)
         self._build_outgoings()
+        return self.__dict__[name]
+
+    @classmethod
+    def from_entities(cls, products, components, transitions):
+        """constructs a supply chain directly from lists of @param products,
+           @param components and @param transitions"""
+        spch=cls.__new__(cls)
+        spch._store(list(products), list(components), list(transitions))
+        spch._verify_the_chain()
+        return spch
 
     def _extract_entities(self, statements):
         """extracts different entities (products, components and transitions) from
            @param statements
         """
-        self._products=[]
-        self._components=[]
-        self._transitions=[]
+        products=[]
+        components=[]
+        transitions=[]
 
         for stmt in statements:
             stmt_type=stmt.get_type()
             if stmt_type==pr.StatementType.PROD_DEF:
-                self._products.extend(stmt._products)
+                products.extend(stmt._products)
             elif stmt_type==pr.StatementType.COMP_DEF:
-                self._components.extend(stmt._components)
+                components.extend(stmt._components)
             else:
-                self._transitions.append(stmt._transition)
+                transitions.append(stmt._transition)
+        self._store(products, components, transitions)
+
+    def _store(self, products, components, transitions):
+        """keeps @param products, @param components and @param transitions in
+           the dictionaries the edits work on, and the lists as the current
+           ones. Entities defined twice are kept in the lists, so that
+           _verify_the_chain reports them."""
+        self._product_dict=dict((p._name, p) for p in products)
+        self._component_dict=dict((c._name, c) for c in components)
+        self._transition_dict=dict((id(t), t) for t in transitions)
+        self._lists=(products, components, transitions)
+
+    def _entity_lists(self):
+        """returns the lists of the products, the components and the
+           transitions, building them again after an edit"""
+        if self._lists is None:
+            self._lists=(list(self._product_dict.values()), list(self._component_dict.values()),
+                         list(self._transition_dict.values()))
+        return self._lists
+
+    @property
+    def _products(self):
+        return self._entity_lists()[0]
+
+    @property
+    def _components(self):
+        return self._entity_lists()[1]
+
+    @property
+    def _transitions(self):
+        return self._entity_lists()[2]
+
+    def _edited(self):
+        """drops the lists and the graph, which are built again on demand"""
+        self._lists=None
+        self._graph=None
 
     def _verify_the_chain(self):
         """verifies in the chain that
            - products and components are only once defined
            - there is no undefined product or component in any transition
            - there in no self loop on any product or transition
+           The checks are done while building the integer-indexed graph of the
+           chain, see ChainGraph.
         """
-        # checking product duplicates
-        self._entity_dict={}
-        seen=self._entity_dict
-        for p in self._products:
-            if p._name not in seen:
-                seen[p._name]=p
-            else:
-                raise ValueError(f'"{p._name}" was defined multiple times.')
-        # checking component duplicates
-        for c in self._components:
-            if c._name not in seen:
-                seen[c._name]=c
-            else:
-                raise ValueError(f'"{c._name}" was defined multiple times.')
-        # checking transition duplicates
-        tseen=set()
-        for t in self._transitions:
-            if t._target not in seen:
-                raise KeyError(f'"{t._target}" has not been defined.')
-            if t._sources:
-                if t._target in t._sources: # a self loop
-                    raise ValueError(f'A self loop exist on "{t._target}"')
-                for s in t._sources:
-                    if s not in seen:
-                        raise KeyError(f'"{s}" has not been defined.')
-                    if (s, t._target) not in tseen:
-                        tseen.add((s,t._target))
-                    else:
-                        raise ValueError(f'Transition from "{s}" to "{t._target}" was defined multiple times.')
-            else:
-                if (None, t._target) not in tseen:
-                    tseen.add((None,t._target))
-                else:
-                    raise ValueError(f'Transition from supplier to "{t._target}" was defined multiple times.')
+        self._graph=gr.ChainGraph(self._products, self._components, self._transitions)
+
+    def graph(self):
+        """returns the integer-indexed graph of the chain. After an edit the
+           whole graph is built again, once, when it is next asked for."""
+        if self._graph is None:
+            self._graph=gr.ChainGraph(self._products, self._components, self._transitions)
+        return self._graph
+
+    def add_product(self, product):
+        """adds @param product to the chain. It raises ValueError if an entity
+           of the same name exists."""
+        self._add_entity(product, self._product_dict)
+
+    def add_component(self, component):
+        """adds @param component to the chain. It raises ValueError if an
+           entity of the same name exists."""
+        self._add_entity(component, self._component_dict)
+
+    def _add_entity(self, entity, entities):
+        if entity._name in self._entity_dict:
+            raise ValueError(f'"{entity._name}" was defined multiple times.')
+        entities[entity._name]=entity
+        self._entity_dict[entity._name]=entity
+        self._leaves.add(entity._name)
+        self._edited()
+
+    def add_transition(self, transition):
+        """adds @param transition to the chain. Only the target and the
+           sources of the transition are checked, the same way as
+           _verify_the_chain checks the whole chain, and the outgoing
+           transitions and the leaves are updated in place. It raises KeyError
+           for an undefined entity and ValueError for a self loop or a
+           transition between two entities which exists already.
+        """
+        target=transition._target
+        if target not in self._entity_dict:
+            raise KeyError(f'"{target}" has not been defined.')
+        incoming=self._incomings.get(target, [])
+        if transition._sources:
+            if target in transition._sources:
+                raise ValueError(f'A self loop exist on "{target}"')
+            for s in transition._sources:
+                if s not in self._entity_dict:
+                    raise KeyError(f'"{s}" has not been defined.')
+            existing=set(s for tr in incoming if tr._sources for s in tr._sources)
+            for s in transition._sources:
+                if s in existing:
+                    raise ValueError(f'Transition from "{s}" to "{target}" was defined multiple times.')
+                existing.add(s)
+        elif any(not tr._sources for tr in incoming):
+            raise ValueError(f'Transition from supplier to "{target}" was defined multiple times.')
+        self._transition_dict[id(transition)]=transition
+        self._index_transition(transition)
+        self._edited()
+
+    def remove_transition(self, transition):
+        """removes @param transition, a transition of the chain, and updates
+           the outgoing transitions and the leaves in place. It raises
+           ValueError if the transition is not in the chain."""
+        if self._transition_dict.get(id(transition)) is not transition:
+            raise ValueError(f'The transition into "{transition._target}" is not in the chain.')
+        del self._transition_dict[id(transition)]
+        incoming=self._incomings[transition._target]
+        _remove_item(incoming, transition)
+        if not incoming:
+            del self._incomings[transition._target]
+            self._leaves.add(transition._target)
+        for src in transition._sources or []:
+            outgoing=self._outgoings[src]
+            _remove_item(outgoing, transition)
+            if not outgoing:
+                del self._outgoings[src]
+        self._edited()
+
+    def remove_entity(self, name, cascade=False):
+        """removes the product or component @param name. The transitions into
+           and out of the entity are removed too if @param cascade is set.
+           It raises KeyError if the entity has not been defined and ValueError
+           if a transition uses it and @param cascade is not set."""
+        if name not in self._entity_dict:
+            raise KeyError(f'"{name}" has not been defined.')
+        used=list(self._incomings.get(name, []))+list(self._outgoings.get(name, []))
+        if used and not cascade:
+            raise ValueError(f'"{name}" is used by {len(used)} transitions.')
+        for tr in used:
+            if id(tr) in self._transition_dict: # not removed yet
+                self.remove_transition(tr)
+        entity=self._entity_dict.pop(name)
+        entities=self._product_dict if entity.get_type() == en.EntityType.PROD else self._component_dict
+        del entities[name]
+        self._leaves.discard(name)
+        self._edited()
+
+    def sub_chains(self):
+        """splits the chain into the sub-chains which share no entities, i.e.
+           the weakly connected components of the chain. An entity without
+           transitions is a sub-chain on its own. The sub-chains are ordered by
+           their first entity and keep the order of the entities and transitions.
+           It returns the list of sub-chains.
+        """
+        g=self.graph()
+        parent=list(range(g.num_entities()))
+        def find(v):
+            while parent[v] != v:
+                parent[v]=parent[parent[v]] # path halving
+                v=parent[v]
+            return v
+        for t in range(g.num_transitions()):
+            root=find(g.tr_target[t])
+            for s in g.sources(t):
+                other=find(s)
+                if other != root:
+                    parent[max(root, other)]=min(root, other)
+                    root=min(root, other)
+        parts={} # the root of each sub-chain mapped into its products, components and transitions
+        for v in range(g.num_entities()):
+            part=parts.setdefault(find(v), ([], [], []))
+            part[0 if g.is_product(v) else 1].append(g.entities[v])
+        for t in range(g.num_transitions()):
+            parts[find(g.tr_target[t])][2].append(g.transitions[t])
+        if len(parts) == 1:
+            return [self]
+        return [SupplyChain.from_entities(*part) for part in parts.values()]
 
     def _build_outgoings(self):
         """builds the dictionary of each entity name mapped into the list of its outgoing transitions.
-           The dictionary is used when formulating planning LP.
-           It creates dictionary self._outgoings.
+           It creates dictionary self._outgoings, self._incomings holding the
+           incoming transitions of the entities, self._entity_dict mapping the
+           names into the entities and the set of leaves self._leaves. The
+           problems are built from the graph, so the views are only built on
+           first use, see __getattr__().
         """
+        self._entity_dict=dict((ent._name, ent) for ent in self._products+self._components)
         self._outgoings={}
+        self._incomings={}
         self._leaves=set(self._entity_dict.keys())
         for tr in self._transitions:
-            self._leaves.discard(tr._target)
-            if tr._sources:
-                for src in tr._sources:
-                    if src in self._outgoings:
-                        self._outgoings[src].append(tr)
-                    else:
-                        self._outgoings[src]=[tr]
-
-        
+            self._index_transition(tr)
+
+    def _index_transition(self, tr):
+        """adds transition @param tr to the outgoing and incoming transitions
+           and the leaves"""
+        self._leaves.discard(tr._target)
+        self._incomings.setdefault(tr._target, []).append(tr)
+        if tr._sources:
+            for src in tr._sources:
+                if src in self._outgoings:
+                    self._outgoings[src].append(tr)
+                else:
+                    self._outgoings[src]=[tr]
+
+
+def _remove_item(items, item):
+    """removes @param item from the list @param items, comparing by identity.
+       The lists are the transitions into or out of an entity, so the time is
+       bounded by its degree."""
+    for k, other in enumerate(items):
+        if other is item:
+            del items[k]
+            return
@@ -0,0 +1,182 @@
+import lib.entities as en
+
+
+def _pl_sum(funcs, domain):
+    """returns the sum of concave piecewise linear functions @param funcs on
+       [0, @param domain]. A function is the list of its (slope, length)
+       segments with positive slope, sorted by decreasing slope. It is zero at
+       0 and constant after its segments.
+    """
+    events=[]
+    slope=0
+    for segments in funcs:
+        if not segments:
+            continue
+        slope+=segments[0][0]
+        pos=0
+        for k, (s, length) in enumerate(segments):
+            pos+=length
+            next_slope=segments[k+1][0] if k+1 < len(segments) else 0
+            events.append((pos, s-next_slope))
+    events.sort()
+    result=[]
+    pos=0
+    for at, drop in events:
+        if slope <= 0 or pos >= domain:
+            break
+        end=min(at, domain)
+        if end > pos:
+            _append(result, slope, end-pos)
+            pos=end
+        slope-=drop
+    if slope > 0 and pos < domain:
+        _append(result, slope, domain-pos)
+    return result
+
+def _append(segments, slope, length):
+    """appends a segment, merging it into the last one if slopes are equal"""
+    if segments and segments[-1][0] == slope:
+        segments[-1]=(slope, segments[-1][1]+length)
+    else:
+        segments.append((slope, length))
+
+def _clip(segments, domain):
+    """restricts a function given by its @param segments to [0, @param domain]"""
+    result=[]
+    pos=0
+    for slope, length in segments:
+        if pos >= domain:
+            break
+        _append(result, slope, min(length, domain-pos))
+        pos+=length
+    return result
+
+
+class TreeSolver:
+    """The tree solver plans chains without OR transitions in which every
+       component feeds at most one transition and products feed none. In such a
+       chain the sub-chains of the products are disjoint trees, so the planning
+       LP decomposes and is solved by dynamic programming instead of a solver.
+       For an entity v, let h_v(f) be the largest number of items taken from
+       the inventories in the tree of v when v delivers f items. h_v is concave
+       and piecewise linear:
+       - the sources of all transitions into v deliver the same amount x, so the
+         function of the inflow is T_v(x)=sum of h_s(x) over the sources s
+       - a component takes f-x items from its stock, so h_v is the sup-convolution
+         of T_v with the stock, i.e. their segments merged by decreasing slope
+       The objective of a product p is f+h_p(f), which is increasing, so each
+       product is produced as much as its tree allows. The plan is then unfolded
+       from the products towards the leaves. All breakpoints are integers, so the
+       plan is integral.
+    """
+
+    def __init__(self, supply_chain):
+        self._supply_chain=supply_chain
+
+    def is_applicable(self):
+        """checks whether the chain has the tree structure the solver needs"""
+        g=self._supply_chain.graph()
+        for v in range(g.num_entities()):
+            degree=g.out_ptr[v+1]-g.out_ptr[v]
+            if degree > (0 if g.is_product(v) else 1):
+                return False
+        return all(tr_type != en.TransitionType.OR for tr_type in g.tr_type)
+
+    def solve(self):
+        """solves the planning problem. It returns the dictionary mapping the
+           names of the LP variables into their optimal values, or None if the
+           chain is not a forest of trees.
+        """
+        if not self.is_applicable():
+            return None
+        order=self._topological_order()
+        if order is None:
+            return None
+        domains, big_lens=self._build_functions(order)
+        return self._unfold(order, domains, big_lens)
+
+    def _topological_order(self):
+        """returns the entities ordered from the leaves to the products, or None
+           if the chain has a cycle"""
+        g=self._supply_chain.graph()
+        nv=g.num_entities()
+        pending=[0]*nv
+        for t in range(g.num_transitions()):
+            pending[g.tr_target[t]]+=len(g.sources(t))
+        worklist=[v for v in range(nv) if pending[v] == 0]
+        order=[]
+        while worklist:
+            v=worklist.pop()
+            order.append(v)
+            for t in g.outgoing(v):
+                target=g.tr_target[t]
+                pending[target]-=1
+                if pending[target] == 0:
+                    worklist.append(target)
+        return order if len(order) == nv else None
+
+    def _build_functions(self, order):
+        """computes h_v of every entity following @param order. The function of
+           an entity is dropped once its target has used it. It returns the
+           largest outflow of each entity and the length of the part of T_v whose
+           slope is larger than one. Up to that length the inflow is worth more
+           than the stock of v.
+        """
+        g=self._supply_chain.graph()
+        inf=float('inf')
+        funcs=[None]*g.num_entities()
+        domains=[0]*g.num_entities()
+        big_lens=[0]*g.num_entities()
+        for v in order:
+            incoming=g.incoming(v)
+            domain=inf if incoming else 0 # the inflow of a leaf is zero
+            sources=[]
+            for t in incoming:
+                for s in g.sources(t):
+                    domain=min(domain, domains[s])
+                    sources.append(s)
+            inflow=_pl_sum([funcs[s] for s in sources], domain)
+            for s in sources:
+                funcs[s]=None
+            big_lens[v]=sum(length for slope, length in inflow if slope > 1)
+            if g.is_product(v):
+                domains[v]=min(g.capacity[v], domain)
+                funcs[v]=_clip(inflow, domains[v])
+            else:
+                stock=g.capacity[v]
+                domains[v]=stock+domain
+                merged=[seg for seg in inflow if seg[0] > 1]
+                if stock > 0:
+                    _append(merged, 1, stock)
+                for seg in inflow:
+                    if seg[0] <= 1:
+                        _append(merged, *seg)
+                funcs[v]=merged
+        return domains, big_lens
+
+    def _unfold(self, order, domains, big_lens):
+        """computes the flows from the products towards the leaves and returns
+           the values of the LP variables"""
+        g=self._supply_chain.graph()
+        outflows=[0]*g.num_entities()
+        values={}
+        for v in reversed(order):
+            name=g.name(v)
+            if g.is_product(v):
+                outflow=domains[v]
+                values[name]=outflow
+                inflow=outflow
+            else:
+                outflow=outflows[v]
+                stock=g.capacity[v]
+                inv=min(stock, max(0, outflow-big_lens[v]))
+                if stock > 0:
+                    values[f"_i_{name}"]=inv
+                inflow=outflow-inv
+            for t in g.incoming(v):
+                if g.tr_type[t] == en.TransitionType.DIR:
+                    values[f"_s_{name}"]=inflow
+                for s in g.sources(t):
+                    values[f"_{g.name(s)}_{name}"]=inflow
+                    outflows[s]=inflow
+        return values
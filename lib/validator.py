@@ -0,0 +1,161 @@
+import lib.parser as pr
+
+
+class Issue:
+    """An issue is an error found in a model, with the line it is found at"""
+
+    def __init__(self, line, message):
+        self.line=line
+        self.message=message
+
+    def __str__(self):
+        return f'line {self.line}: {self.message}'
+
+
+def statements_with_lines(reader):
+    """splits the text read from @param reader into statement strings, see
+       tokenize(). It is a generator yielding the non-empty statements and the
+       line each of them starts at, i.e. the line of its first non-blank
+       character, counted from 1."""
+    line=1
+    for s in pr.tokenize(reader):
+        if s and not s.isspace():
+            start=len(s)-len(s.lstrip())
+            yield line+s.count('\n', 0, start), s
+        line+=s.count('\n')
+
+def _item_lines(stmt, line):
+    """returns the lines of the comma separated items of definition
+       @param stmt, which starts at @param line"""
+    lines=[]
+    for item in stmt.split(','):
+        start=len(item)-len(item.lstrip())
+        lines.append(line+item.count('\n', 0, start))
+        line+=item.count('\n')
+    return lines
+
+def strongly_connected_components(n, adjacency):
+    """returns the strongly connected components of the graph of @param n
+       vertices whose successors are given by the lists @param adjacency.
+       It is Tarjan's algorithm with an explicit stack, so it takes linear time
+       and does not recurse."""
+    index=[-1]*n
+    low=[0]*n
+    on_stack=[False]*n
+    stack=[]
+    components=[]
+    counter=0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root]=low[root]=counter
+        counter+=1
+        stack.append(root)
+        on_stack[root]=True
+        work=[(root, 0)] # the vertices being visited and their next successor
+        while work:
+            v, k=work[-1]
+            if k < len(adjacency[v]):
+                work[-1]=(v, k+1)
+                w=adjacency[v][k]
+                if index[w] < 0:
+                    index[w]=low[w]=counter
+                    counter+=1
+                    stack.append(w)
+                    on_stack[w]=True
+                    work.append((w, 0))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v]=index[w]
+                continue
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]]=low[v]
+            if low[v] == index[v]:
+                component=[]
+                while True:
+                    w=stack.pop()
+                    on_stack[w]=False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+    return components
+
+
+class Validator:
+    """The validator checks a model file and reports every error it finds
+       instead of stopping at the first one, as Parser and SupplyChain do. The
+       errors are invalid statements, entities defined multiple times,
+       undefined entities used by transitions, self loops, transitions defined
+       multiple times and cycles of any length. Each error is reported with
+       its line. The checks take linear time: the definitions and transitions
+       are indexed by name and the cycles are found as the strongly connected
+       components of the chain.
+    """
+
+    def __init__(self, modelfile):
+        self._modelfile=modelfile
+
+    def validate(self):
+        """returns the list of issues of the model, ordered by line. The model
+           is valid if the list is empty. It raises OSError if the file cannot
+           be read."""
+        issues=[]
+        defined={} # the name of each entity mapped into the line of its definition
+        transitions=[] # the lines and the transitions
+        with open(self._modelfile) as reader:
+            for line, s in statements_with_lines(reader):
+                try:
+                    stmt=pr.Statement.factory(s)
+                except Exception as e:
+                    issues.append(Issue(line, f'Invalid statement "{s.strip()}": {e}'))
+                    continue
+                stmt_type=stmt.get_type()
+                if stmt_type == pr.StatementType.TRAN_DEF:
+                    transitions.append((line, stmt._transition))
+                    continue
+                entities=stmt._products if stmt_type == pr.StatementType.PROD_DEF else stmt._components
+                for ent, ent_line in zip(entities, _item_lines(s.lstrip(), line)):
+                    if ent._name in defined:
+                        issues.append(Issue(ent_line, f'"{ent._name}" was defined multiple times, first at line {defined[ent._name]}.'))
+                    else:
+                        defined[ent._name]=ent_line
+        issues.extend(self._check_transitions(defined, transitions))
+        issues.sort(key=lambda issue: issue.line)
+        return issues
+
+    def _check_transitions(self, defined, transitions):
+        """yields the issues of @param transitions and of the cycles they form"""
+        ids=dict((name, v) for v, name in enumerate(defined))
+        adjacency=[[] for _ in ids]
+        seen={} # the (source, target) pairs mapped into their lines, the source of a supplier being None
+        for line, t in transitions:
+            if t._target not in ids:
+                yield Issue(line, f'"{t._target}" has not been defined.')
+            for s in t._sources or [None]:
+                if s is not None and s not in ids:
+                    yield Issue(line, f'"{s}" has not been defined.')
+                elif s == t._target:
+                    yield Issue(line, f'A self loop exist on "{t._target}".')
+                elif (s, t._target) in seen:
+                    source='supplier' if s is None else f'"{s}"'
+                    yield Issue(line, f'Transition from {source} to "{t._target}" was defined multiple times, first at line {seen[(s, t._target)]}.')
+                else:
+                    seen[(s, t._target)]=line
+                    if s is not None and t._target in ids:
+                        adjacency[ids[s]].append(ids[t._target])
+        names=list(defined)
+        cycles=[c for c in strongly_connected_components(len(names), adjacency) if len(c) > 1]
+        cycle_of=[-1]*len(names)
+        for k, component in enumerate(cycles):
+            for v in component:
+                cycle_of[v]=k
+        first_lines=[None]*len(cycles) # the first line of a transition inside each cycle
+        for (s, target), line in seen.items():
+            if s is not None and target in ids:
+                k=cycle_of[ids[target]]
+                if k >= 0 and cycle_of[ids[s]] == k and (first_lines[k] is None or line < first_lines[k]):
+                    first_lines[k]=line
+        for component, line in zip(cycles, first_lines):
+            cycle=', '.join(f'"{names[v]}"' for v in sorted(component))
+            yield Issue(line, f'The entities {cycle} form a cycle.')
@@ -0,0 +1,33 @@
+import lib.entities as en
+
+
+class VariableKind:
+    """The kind of a variable of the planning problem"""
+    PRODUCT='product'
+    INVENTORY='inventory'
+    SUPPLIER='supplier'
+    TRANSITION='transition'
+    CHOICE='choice' # the binary selecting a branch of an OR transition
+
+def variable_kinds(supply_chain):
+    """yields the name and the kind of each variable of the planning problem
+       of @param supply_chain, see PlanningSolver"""
+    for p in supply_chain._products:
+        yield p._name, VariableKind.PRODUCT
+    for c in supply_chain._components:
+        if c._stock > 0:
+            yield f"_i_{c._name}", VariableKind.INVENTORY
+    for t in supply_chain._transitions:
+        if t._tr_type == en.TransitionType.DIR:
+            yield f"_s_{t._target}", VariableKind.SUPPLIER
+        else:
+            for s in t._sources:
+                yield f"_{s}_{t._target}", VariableKind.TRANSITION
+            if t._tr_type == en.TransitionType.OR:
+                for s in t._sources:
+                    yield f"_x_{s}_{t._target}", VariableKind.CHOICE
+
+def variable_names(supply_chain):
+    """returns the names of the variables of the planning problem of
+       @param supply_chain, see PlanningSolver"""
+    return [name for name, _ in variable_kinds(supply_chain)]
@@ -0,0 +1,4 @@
+"""The version of the planner. It is part of the key of every on-disk cache, so
+   it must be bumped whenever the in-memory representation of a model changes.
+"""
+VERSION='0.3.0'
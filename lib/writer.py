@@ -0,0 +1,98 @@
+import csv
+import json
+import struct
+
+import lib.variables as vr
+
+
+class ResultWriter:
+    """The result writer streams the values of the variables of a plan, one
+       row at a time, instead of building the whole output in memory. The rows
+       follow the order of the variables of the chain. The formats are:
+       - csv: a header and the rows variable,kind,value
+       - jsonl: a JSON object {"variable": ..., "kind": ..., "value": ...} per line
+       - binary: MAGIC followed by a record per variable, see read_binary()
+       If @param nonzero is set, only the variables with a non-zero value are
+       written. If @param kinds is given, only the variables of these kinds
+       are written, see VariableKind.
+    """
+
+    FORMATS=('csv', 'jsonl', 'binary')
+    MAGIC=b'SCPV\x01' # the format name and version of the binary format
+    KINDS=(vr.VariableKind.PRODUCT, vr.VariableKind.INVENTORY, vr.VariableKind.SUPPLIER,
+           vr.VariableKind.TRANSITION, vr.VariableKind.CHOICE)
+    _RECORD=struct.Struct('<BHd') # kind, length of the name and value; the name follows
+
+    def __init__(self, supply_chain, fmt='csv', nonzero=False, kinds=None):
+        """@param supply_chain is the chain the plan belongs to, i.e. the
+           original one if the problem was presolved"""
+        if fmt not in self.FORMATS:
+            raise ValueError(f'Unknown format "{fmt}", the format is one of {", ".join(self.FORMATS)}.')
+        for kind in kinds or []:
+            if kind not in self.KINDS:
+                raise ValueError(f'Unknown variable kind "{kind}", the kind is one of {", ".join(self.KINDS)}.')
+        self._supply_chain=supply_chain
+        self._fmt=fmt
+        self._nonzero=nonzero
+        self._kinds=set(kinds) if kinds else None
+
+    def is_binary(self):
+        """checks whether the output must be written to a binary stream"""
+        return self._fmt == 'binary'
+
+    def rows(self, values):
+        """yields the name, the kind and the value of the variables given by
+           @param values, the dictionary of variable names mapped into their
+           values, which pass the filters"""
+        for name, kind in vr.variable_kinds(self._supply_chain):
+            if self._kinds is not None and kind not in self._kinds:
+                continue
+            value=values.get(name)
+            if self._nonzero and not value:
+                continue
+            yield name, kind, value
+
+    def write(self, values, stream):
+        """writes the variables given by @param values into @param stream, a
+           binary stream for the binary format and a text stream otherwise.
+           It returns the number of rows written."""
+        count=0
+        if self._fmt == 'csv':
+            table=csv.writer(stream)
+            table.writerow(['variable', 'kind', 'value'])
+            for name, kind, value in self.rows(values):
+                table.writerow([name, kind, '' if value is None else value])
+                count+=1
+        elif self._fmt == 'jsonl':
+            for name, kind, value in self.rows(values):
+                stream.write(json.dumps({'variable': name, 'kind': kind, 'value': value})+'\n')
+                count+=1
+        else:
+            stream.write(self.MAGIC)
+            for name, kind, value in self.rows(values):
+                encoded=name.encode()
+                stream.write(self._RECORD.pack(self.KINDS.index(kind), len(encoded), float('nan') if value is None else value))
+                stream.write(encoded)
+                count+=1
+        return count
+
+
+def read_binary(reader):
+    """yields the name, the kind and the value of the records written by
+       ResultWriter in the binary format into binary stream @param reader. An
+       unknown value is read as NaN. It raises ValueError if the stream does
+       not start with ResultWriter.MAGIC or is truncated."""
+    if reader.read(len(ResultWriter.MAGIC)) != ResultWriter.MAGIC:
+        raise ValueError('The stream does not hold a plan in the binary format.')
+    record=ResultWriter._RECORD
+    while True:
+        header=reader.read(record.size)
+        if not header:
+            return
+        if len(header) < record.size:
+            raise ValueError('The plan is truncated.')
+        kind, length, value=record.unpack(header)
+        name=reader.read(length)
+        if len(name) < length:
+            raise ValueError('The plan is truncated.')
+        yield name.decode(), ResultWriter.KINDS[kind], value
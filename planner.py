@@ -1,27 +1,227 @@
-import sys, traceback
+import argparse, sys, traceback
 
 from lib.parser import Parser
 from lib.supply_chain import SupplyChain
-from lib.solver import PlanningSolver
+from lib.backend import SolverBackend
+from lib.cache import ModelCache, SolutionCache
+from lib.profiler import Profiler
+from lib.writer import ResultWriter
+from lib.validator import Validator
+
+# The modules building and solving problems load PuLP, so they are imported by
+# the functions using them, which keeps --check and the start of a run fast.
+
+def parse_args():
+    parser=argparse.ArgumentParser(description='Plans the production of a supply chain.')
+    parser.add_argument('model', nargs='?', help='contains the supply chain description; optional with --serve, which then loads models on request')
+    parser.add_argument('lp_file', nargs='?', help='if given, stores the LP, or the MPS if its name ends with .mps, compressed if it ends with .gz')
+    parser.add_argument('--cache-dir', help='keeps the compiled model in this directory, so later runs on the same model skip parsing and verification')
+    parser.add_argument('--solution-cache', metavar='DIR', help='keeps the optimal plans in this directory, so a later run on the same chain with the same solver settings prints the stored plan')
+    parser.add_argument('--solution-cache-size', type=int, default=1000, help='the number of plans kept in the solution cache, the least recently used being evicted first (default: 1000)')
+    parser.add_argument('--jobs', type=int, default=1, help='parses large models and solves scenarios or sub-chains with this many processes (0 uses all CPUs)')
+    parser.add_argument('--big-m-report', action='store_true', help='prints how much the big-M value of each OR branch was tightened')
+    parser.add_argument('--bottlenecks', action='store_true', help='prints the order sizes and stocks limiting the plan, ranked by the value of one more unit')
+    parser.add_argument('--presolve', action='store_true', help='reduces the chain before building the problem and prints a summary of the reductions')
+    parser.add_argument('--builder', choices=['pulp', 'matrix'], default='pulp', help='builds the problem with PuLP or assembles its matrix directly (default: pulp)')
+    parser.add_argument('--decompose', action='store_true', help='solves the sub-chains sharing no entities separately, with --jobs processes')
+    parser.add_argument('--solver', choices=SolverBackend.NAMES, default='cbc', help='the solver the problem is handed to (default: cbc)')
+    parser.add_argument('--threads', type=int, help='the number of threads of the solver')
+    parser.add_argument('--time-limit', type=float, help='stops the solver after this many seconds with the best plan found')
+    parser.add_argument('--gap', type=float, help='stops the solver once the plan is within this relative gap of the optimum, e.g. 0.01')
+    parser.add_argument('--solver-log', help='writes the solver log into this file')
+    parser.add_argument('--export-only', action='store_true', help='only writes the problem into lp_file, without building it with PuLP or solving it')
+    parser.add_argument('--scenarios', help='solves the scenarios given in this file, one JSON object per line, and prints a result table')
+    parser.add_argument('--output', help='writes the result table of the scenarios into this file instead of the standard output')
+    parser.add_argument('--format', choices=ResultWriter.FORMATS, help='streams the plan in this format instead of printing it as text')
+    parser.add_argument('--values-output', help='writes the streamed plan into this file instead of the standard output')
+    parser.add_argument('--nonzero', action='store_true', help='streams only the variables with a non-zero value')
+    parser.add_argument('--only', help='streams only the variables of these comma separated kinds: '+', '.join(ResultWriter.KINDS))
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE', help='records the time and memory of each stage and the model statistics, and writes them as JSON into FILE or the standard error')
+    parser.add_argument('--periods', help='plans over the periods given in this file, one JSON object with the orders and stock arrivals of a period per line')
+    parser.add_argument('--check', nargs='+', metavar='MODEL', help='only validates these models, reporting every error with its line, without loading the solver modules')
+    parser.add_argument('--serve', metavar='ADDRESS', help='runs as a daemon answering plan requests over HTTP on ADDRESS, i.e. [HOST:]PORT or the path of a Unix socket')
+    parser.add_argument('--max-concurrent', type=int, default=4, help='the number of requests the daemon plans at a time (default: 4)')
+    parser.add_argument('--request-timeout', type=float, default=60, help='the longest time in seconds the daemon spends on a request (default: 60)')
+    parser.add_argument('--model-root', help='the directory the daemon serves model files from (default: the working directory)')
+    parser.add_argument('--max-models', type=int, default=16, help='the number of models the daemon keeps in memory (default: 16)')
+    args=parser.parse_args()
+    if not args.model and not args.serve and not args.check:
+        parser.error('the model argument is required')
+    return args
+
+def load_supply_chain(args, profiler):
+    """returns the supply chain given by the command line arguments"""
+    if args.cache_dir:
+        with profiler.stage('load'):
+            return ModelCache(args.cache_dir).load(args.model, args.jobs)
+    with profiler.stage('parse'):
+        par=Parser(args.model)
+        stmts=par.parse(args.jobs)
+    with profiler.stage('verify'):
+        return SupplyChain(stmts)
+
+def check_models(models):
+    """validates @param models and prints every error of each, see Validator.
+       It returns the number of invalid models."""
+    failed=0
+    for model in models:
+        try:
+            issues=Validator(model).validate()
+        except OSError as e:
+            print(f"[ERR] {model}: {e}")
+            failed+=1
+            continue
+        for issue in issues:
+            print(f"[ERR] {model}:{issue.line}: {issue.message}")
+        if issues:
+            failed+=1
+        else:
+            print(f"[OK] {model}")
+    return failed
+
+def summary_stream(args):
+    """returns the stream of the summary and the reports, i.e. the standard
+       error if the plan is streamed to the standard output, which keeps the
+       stream clean, and the standard output otherwise"""
+    return sys.stderr if args.format and not args.values_output else sys.stdout
+
+def write_plan(solver, supp_chain, args):
+    """prints the status and the objective, and streams the plan as the
+       command line arguments ask for. The summary goes to summary_stream()."""
+    writer=ResultWriter(supp_chain, args.format, args.nonzero, args.only.split(',') if args.only else None)
+    summary=summary_stream(args)
+    print(f"Status: {solver.status()}\nSolver: {solver.backend().describe()}\n\nObjective={solver.objective()}", file=summary)
+    if args.values_output:
+        with open(args.values_output, 'wb' if writer.is_binary() else 'w', newline=None if writer.is_binary() else '') as stream:
+            writer.write(solver.values(), stream)
+    else:
+        writer.write(solver.values(), sys.stdout.buffer if writer.is_binary() else sys.stdout)
+        sys.stdout.flush()
+
+def export_chain(supp_chain, args):
+    """writes the problem of the chain, or of the presolved chain, into the file
+       given by the command line arguments"""
+    from lib.export import ChainExporter
+    from lib.presolve import Presolver
+    if args.presolve:
+        presolver=Presolver(supp_chain)
+        supp_chain=presolver.reduce()
+        print(presolver.report())
+    num_columns, num_rows=ChainExporter(supp_chain).write(args.lp_file)
+    print(f"Exported {num_columns} variables and {num_rows} constraints into {args.lp_file}")
+
+def write_profile(profiler, args):
+    """writes the profile where the command line arguments ask for it"""
+    if args.profile == '-':
+        print(profiler.to_json(), file=sys.stderr)
+    else:
+        with open(args.profile, 'w') as writer:
+            writer.write(profiler.to_json())
+
+def server_address(address):
+    """returns the (host, port) pair of @param address if it is [HOST:]PORT,
+       and @param address, the path of a Unix socket, otherwise"""
+    host, _, port=address.rpartition(':')
+    if port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return address
+
+def serve(backend, args):
+    """runs the planning daemon as the command line arguments ask for"""
+    from lib.daemon import PlanningDaemon
+    daemon=PlanningDaemon(args.max_concurrent, args.request_timeout, args.cache_dir, args.jobs, backend,
+                          args.model_root, args.max_models)
+    if args.model:
+        daemon.registry().get(args.model)
+    address=server_address(args.serve)
+    print(f"Serving plan requests on {address}", file=sys.stderr)
+    daemon.serve(address)
+
+def solver_class(args):
+    """returns the solver class of the builder the command line arguments ask for"""
+    from lib.solver import PlanningSolver, MatrixPlanningSolver
+    return MatrixPlanningSolver if args.builder == 'matrix' else PlanningSolver
+
+def build_solver(supp_chain, solver_cls, backend, msg, args):
+    """returns the solver of the chain the command line arguments ask for"""
+    from lib.solver import PlanningSolver, DecomposedPlanningSolver, MultiPeriodPlanningSolver, read_periods
+    if args.bottlenecks and (args.decompose or args.presolve or args.periods or solver_cls is not PlanningSolver):
+        raise ValueError('--bottlenecks needs the pulp builder and cannot be combined with --decompose, --presolve or --periods.')
+    if args.periods:
+        if args.format or args.presolve or args.decompose:
+            raise ValueError('--periods cannot be combined with --format, --presolve or --decompose.')
+        orders, arrivals=read_periods(args.periods)
+        return MultiPeriodPlanningSolver(supp_chain, len(orders), orders, arrivals, msg=msg, backend=backend)
+    if args.decompose:
+        return DecomposedPlanningSolver(supp_chain, presolve=args.presolve, msg=msg, backend=backend, jobs=args.jobs, solver_cls=solver_cls)
+    return solver_cls(supp_chain, presolve=args.presolve, msg=msg, backend=backend)
+
+def uses_solution_cache(args):
+    """checks whether the plan may come from the solution cache, i.e. the
+       cache is given and nothing but the plan is asked for"""
+    return bool(args.solution_cache) and not (args.lp_file or args.presolve or args.big_m_report or args.bottlenecks
+                                              or args.decompose or args.periods)
+
+def run_scenarios(supp_chain, solver_cls, backend, args):
+    """solves the scenarios given by the command line arguments and writes the result table"""
+    from lib.batch import BatchSolver, read_scenarios
+    batch=BatchSolver(supp_chain, args.jobs, args.presolve, solver_cls, backend)
+    results=batch.solve(read_scenarios(args.scenarios))
+    if args.output:
+        with open(args.output, 'w', newline='') as writer:
+            batch.write_table(results, writer)
+    else:
+        batch.write_table(results, sys.stdout)
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2 and len(sys.argv) != 3:
-        print("[ERR] Invalid usage.")
-        print("\n\nUsage: PROG <model> [<lp_file>]")
-        print("\t<model> contains the supply chain description")
-        print("\t<lp_file> if given, stores the LP")
-        exit(1)
-    model_fname=sys.argv[1]
-    lp_file=sys.argv[2] if len(sys.argv)==3 else None
+    args=parse_args()
+    profiler=Profiler(memory=bool(args.profile))
+    if args.check:
+        exit(1 if check_models(args.check) else 0)
     try:
-        par=Parser(model_fname)
-        stmts=par.parse()
-        supp_chain=SupplyChain(stmts)
-        solver=PlanningSolver(supp_chain)
-        solver.solve()
-        print(solver)
-        if lp_file:
-            solver.write_lp(lp_file)
+        backend=SolverBackend(args.solver, args.threads, args.time_limit, args.gap, args.solver_log)
+        if args.serve:
+            serve(backend, args)
+            exit(0)
+        supp_chain=load_supply_chain(args, profiler)
+        if args.export_only:
+            if not args.lp_file:
+                raise ValueError('--export-only needs the lp_file argument.')
+            with profiler.stage('export'):
+                export_chain(supp_chain, args)
+        elif args.scenarios:
+            with profiler.stage('scenarios'):
+                run_scenarios(supp_chain, solver_class(args), backend, args)
+        else:
+            solver_cls=solver_class(args)
+            msg=not (args.format and not args.values_output) # keeps the streamed plan clean
+            if uses_solution_cache(args):
+                with profiler.stage('solve'):
+                    cache=SolutionCache(args.solution_cache, args.solution_cache_size)
+                    solver=cache.plan(supp_chain, solver_cls, backend, msg=msg)
+            else:
+                with profiler.stage('build'):
+                    solver=build_solver(supp_chain, solver_cls, backend, msg, args)
+                with profiler.stage('solve'):
+                    solver.solve()
+            with profiler.stage('output'):
+                if args.format:
+                    write_plan(solver, supp_chain, args)
+                else:
+                    print(solver)
+                reports=summary_stream(args)
+                if args.presolve:
+                    print(f"\n{solver.presolve_report()}", file=reports)
+                if args.big_m_report:
+                    print(f"\n{solver.big_m_report()}", file=reports)
+                if args.bottlenecks:
+                    print(f"\n{solver.bottleneck_report()}", file=reports)
+                if args.lp_file:
+                    solver.write_lp(args.lp_file)
+            if args.profile:
+                profiler.set_model_statistics(solver.statistics())
+        if args.profile:
+            write_profile(profiler, args)
     except Exception as e:
         print(f"[ERR] Planning failed.\nReason:\n")
         print("="*100)
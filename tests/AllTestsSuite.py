@@ -4,6 +4,18 @@ import Statement_test
 import Parser_test
 import SupplyChain_test
 import PlanningSolver_test
+import ModelCache_test
+import ChainGraph_test
+import TreeSolver_test
+import Presolve_test
+import Matrix_test
+import Batch_test
+import Generator_test
+import Profiler_test
+import Writer_test
+import Export_test
+import Daemon_test
+import Validator_test
 
 
 loader=unittest.TestLoader()
@@ -13,6 +25,18 @@ suite.addTest(loader.loadTestsFromModule(Statement_test))
 suite.addTest(loader.loadTestsFromModule(Parser_test))
 suite.addTest(loader.loadTestsFromModule(SupplyChain_test))
 suite.addTest(loader.loadTestsFromModule(PlanningSolver_test))
+suite.addTest(loader.loadTestsFromModule(ModelCache_test))
+suite.addTest(loader.loadTestsFromModule(ChainGraph_test))
+suite.addTest(loader.loadTestsFromModule(TreeSolver_test))
+suite.addTest(loader.loadTestsFromModule(Presolve_test))
+suite.addTest(loader.loadTestsFromModule(Matrix_test))
+suite.addTest(loader.loadTestsFromModule(Batch_test))
+suite.addTest(loader.loadTestsFromModule(Generator_test))
+suite.addTest(loader.loadTestsFromModule(Profiler_test))
+suite.addTest(loader.loadTestsFromModule(Writer_test))
+suite.addTest(loader.loadTestsFromModule(Export_test))
+suite.addTest(loader.loadTestsFromModule(Daemon_test))
+suite.addTest(loader.loadTestsFromModule(Validator_test))
 
 runner=unittest.TextTestRunner(verbosity=3)
 result=runner.run(suite)
@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import batch as bt
+
+class BatchTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(BatchTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def _get_supply_chain(self):
+        return sc.SupplyChain(pr.Parser(os.path.join(self._examples_dir, 'example1.txt')).parse())
+
+    def _get_scenarios(self):
+        return bt.read_scenarios(os.path.join(self._test_model_dir, 'scenarios.jsonl'))
+
+    def test_read_scenarios(self):
+        scenarios=self._get_scenarios()
+        self.assertEqual([s._name for s in scenarios], ['base', 'more_p1', 'no_c1', 'bad', 'empty_c2'])
+        self.assertEqual(scenarios[1]._orders, {'p1': 30})
+        self.assertEqual(scenarios[2]._suppliers_off, {'c1'})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname=os.path.join(tmp_dir, 'bad.jsonl')
+            with open(fname, 'w') as writer:
+                writer.write('{"name": "a"}\n{"orders": {}}\n')
+            with self.assertRaises(ValueError) as ctx:
+                bt.read_scenarios(fname)
+            self.assertTrue('line 2' in str(ctx.exception))
+
+    def test_apply(self):
+        spch=self._get_supply_chain()
+        changed=bt.Scenario('s', orders={'p1': 3}, stocks={'c2': 4}, suppliers_off=['c1']).apply(spch)
+        self.assertEqual(changed._entity_dict['p1']._order_size, 3)
+        self.assertEqual(changed._entity_dict['c2']._stock, 4)
+        self.assertEqual(len(changed._transitions), len(spch._transitions)-1)
+        self.assertEqual(spch._entity_dict['p1']._order_size, 10) # the base chain is kept
+        with self.assertRaises(ValueError):
+            bt.Scenario('s', orders={'c1': 3}).apply(spch)
+
+    def test_solve(self):
+        spch=self._get_supply_chain()
+        scenarios=self._get_scenarios()
+        results=bt.BatchSolver(spch).solve(scenarios)
+        self.assertEqual(results, bt.BatchSolver(spch, jobs=2).solve(scenarios))
+        self.assertEqual(results[0], ('base', 'Optimal', 30.0, {'p1': 10.0, 'p2': 10.0}))
+        self.assertEqual(results[1][2], 50.0)
+        self.assertEqual(results[2][3], {'p1': 10.0, 'p2': 0.0})
+        self.assertEqual(results[3][1], 'Error: "zz" has not been defined.')
+        self.assertEqual(results[4][2], 10.0)
+
+    def test_write_table(self):
+        spch=self._get_supply_chain()
+        batch=bt.BatchSolver(spch)
+        out=io.StringIO()
+        batch.write_table(batch.solve(self._get_scenarios()[:2]), out)
+        self.assertEqual(out.getvalue().splitlines(), ['scenario,status,objective,p1,p2', 'base,Optimal,30.0,10.0,10.0', 'more_p1,Optimal,50.0,30.0,10.0'])
@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import entities as en
+
+class ChainGraphTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(ChainGraphTest, self).__init__(*args, **kwargs)
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def _run_a_test_model(self, model_fname):
+        p=pr.Parser(os.path.join(self._test_model_dir, model_fname))
+        return sc.SupplyChain(p.parse())
+
+    def test_interning(self):
+        g=self._run_a_test_model('build_outgoings.txt').graph()
+        self.assertEqual(g.num_entities(), 8)
+        self.assertEqual(g.num_transitions(), 6)
+        self.assertEqual([g.name(v) for v in range(g.num_entities())], ['p1','p2','p3','p4','c1','c2','c3','c4'])
+        self.assertTrue(g.is_product(3))
+        self.assertFalse(g.is_product(4))
+        self.assertEqual(list(g.capacity), [10,400,60,30,0,40,30,0])
+
+    def test_adjacency(self):
+        spch=self._run_a_test_model('build_outgoings.txt')
+        g=spch.graph()
+        for v in range(g.num_entities()):
+            name=g.name(v)
+            outgoings=[spch._transitions[t] for t in g.outgoing(v)]
+            self.assertEqual(outgoings, spch._outgoings.get(name, []))
+            for t in g.incoming(v):
+                self.assertEqual(spch._transitions[t]._target, name)
+            for k in range(g.out_ptr[v], g.out_ptr[v+1]):
+                self.assertEqual(g.src[g.out_edge[k]], v)
+        self.assertEqual([g.name(s) for s in g.sources(2)], ['c1','c3','c4'])
+        self.assertEqual(len(g.sources(4)), 0)
+        self.assertEqual(g.tr_type[4], en.TransitionType.DIR)
+        self.assertTrue(g.has_supplier(g.ids['c1']))
+        self.assertFalse(g.has_supplier(g.ids['c2']))
+
+    def test_slots(self):
+        spch=self._run_a_test_model('build_outgoings.txt')
+        for ent in spch._products+spch._components+spch._transitions:
+            self.assertFalse(hasattr(ent, '__dict__'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import contextlib
+import http.client
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import batch as bt
+from context import daemon as dm
+
+class DaemonTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(DaemonTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+        self._model=os.path.join(self._examples_dir, 'example1.txt')
+
+    def _expected(self, scenario):
+        spch=scenario.apply(sc.SupplyChain(pr.Parser(self._model).parse()))
+        slvr=sl.PlanningSolver(spch, msg=False)
+        slvr.solve()
+        return slvr.objective(), slvr.values()
+
+    def test_handle(self):
+        daemon=dm.PlanningDaemon(max_concurrent=2, timeout=30, root=self._examples_dir)
+        requests=[({'model': self._model}, bt.Scenario('base')),
+                  ({'model': self._model, 'orders': {'p1': 30}}, bt.Scenario('s', orders={'p1': 30})),
+                  ({'model': self._model, 'stocks': {'c2': 0}}, bt.Scenario('s', stocks={'c2': 0})),
+                  ({'model': self._model, 'suppliers_off': ['c1']}, bt.Scenario('s', suppliers_off=['c1'])),
+                  ({'model': self._model}, bt.Scenario('base'))]
+        for request, scenario in requests:
+            code, answer=daemon.handle(request)
+            self.assertEqual(code, 200)
+            objective, values=self._expected(scenario)
+            self.assertEqual(answer['status'], 'Optimal')
+            self.assertAlmostEqual(answer['objective'], objective)
+            # a stock set to zero keeps its inventory variable in the resident problem
+            self.assertEqual(dict((k, answer['values'][k]) for k in values), values)
+            self.assertFalse(any(v for k, v in answer['values'].items() if k not in values))
+        self.assertEqual(daemon.status()['models'], [os.path.realpath(self._model)])
+        code, answer=daemon.handle({'model': self._model, 'nonzero': True})
+        self.assertTrue(all(answer['values'].values()))
+
+    def test_handle_errors(self):
+        daemon=dm.PlanningDaemon(timeout=30, root=self._examples_dir)
+        self.assertEqual(daemon.handle({'orders': {}})[0], 400)
+        self.assertEqual(daemon.handle({'model': self._model, 'stocks': {'zz': 3}})[0], 400)
+        self.assertEqual(daemon.handle({'model': self._model, 'orders': {'c1': 3}})[0], 400)
+        self.assertEqual(daemon.handle({'model': self._model, 'timeout': 0})[0], 400)
+        self.assertEqual(daemon.handle({'model': os.path.join(self._examples_dir, 'missing.txt')})[0], 404)
+        self.assertEqual(daemon.handle({'model': 'missing.txt'})[0], 404) # relative to the root
+        self.assertEqual(daemon.handle({'model': os.path.join(self._examples_dir, '..', 'README.md')})[0], 403)
+        self.assertEqual(daemon.handle({'model': self._model, 'timeout': 'soon'})[0], 400)
+        self.assertEqual(daemon.handle({'model': self._model, 'suppliers_off': 'c1'})[0], 400)
+        self.assertEqual(daemon.handle({'model': self._model, 'suppliers_off': ['zz']})[0], 400)
+        for orders, stocks in [({'p1': 'abc'}, None), ({'p1': 2.5}, None), ({'p1': -3}, None), ({'p1': True}, None),
+                               (None, {'p1': 3}), (None, {'c2': -1}), (['p1'], None)]:
+            code, answer=daemon.handle({'model': self._model, 'orders': orders, 'stocks': stocks})
+            self.assertEqual(code, 400)
+            self.assertFalse('attribute' in answer['error'])
+        spch=daemon.registry().get(self._model)._supply_chain
+        self.assertEqual(spch._entity_dict['p1']._order_size, sc.SupplyChain(pr.Parser(self._model).parse())._entity_dict['p1']._order_size)
+        self.assertEqual(daemon.handle({'model': self._model, 'suppliers_off': ['c1']})[0], 200)
+        # the failed requests leave the resident model unchanged
+        code, answer=daemon.handle({'model': self._model})
+        self.assertAlmostEqual(answer['objective'], self._expected(bt.Scenario('base'))[0])
+
+    def test_internal_error(self):
+        daemon=dm.PlanningDaemon(timeout=30, root=self._examples_dir)
+        def fail(path):
+            raise TypeError('a bug')
+        daemon.registry()._load=fail
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            code, answer=daemon.handle({'model': self._model})
+        self.assertEqual(code, 500)
+        self.assertTrue('a bug' in answer['error'] and 'TypeError' in err.getvalue())
+
+    def test_registry(self):
+        registry=dm.ModelRegistry(root=self._examples_dir, max_models=2)
+        models=[registry.get(f'example{k}.txt') for k in range(3)]
+        self.assertEqual(registry.paths(), [os.path.realpath(os.path.join(self._examples_dir, f'example{k}.txt')) for k in [1, 2]])
+        self.assertIs(registry.get('example1.txt'), models[1]) # kept, and now the most recently used
+        registry.get('example0.txt')
+        self.assertEqual(len(registry.paths()), 2)
+        self.assertIs(registry.get('example1.txt'), models[1])
+        with self.assertRaises(dm.RequestError) as ctx:
+            registry.get('../README.md')
+        self.assertEqual(ctx.exception.code, 403)
+
+    def test_busy(self):
+        daemon=dm.PlanningDaemon(max_concurrent=1, timeout=30, root=self._examples_dir)
+        daemon._slots.acquire()
+        code, answer=daemon.handle({'model': self._model, 'timeout': 0.1})
+        self.assertEqual(code, 503)
+        daemon._slots.release()
+
+    def _request(self, path, method, url, body=None):
+        conn=http.client.HTTPConnection('localhost')
+        conn.sock=socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.sock.connect(path)
+        try:
+            conn.request(method, url, body)
+            response=conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def test_unix_socket(self):
+        daemon=dm.PlanningDaemon(timeout=30, root=self._examples_dir)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path=os.path.join(tmp_dir, 'planner.sock')
+            server=daemon.server(path)
+            thread=threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                code, answer=self._request(path, 'POST', '/plan', json.dumps({'model': self._model, 'orders': {'p1': 30}}))
+                self.assertEqual(code, 200)
+                self.assertAlmostEqual(answer['objective'], self._expected(bt.Scenario('s', orders={'p1': 30}))[0])
+                code, answer=self._request(path, 'GET', '/status')
+                self.assertEqual(answer['models'], [os.path.realpath(self._model)])
+                self.assertEqual(self._request(path, 'POST', '/plan', 'not json')[0], 400)
+                self.assertEqual(self._request(path, 'GET', '/other')[0], 404)
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
@@ -0,0 +1,83 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import pulp
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import export as ex
+from context import matrix as mx
+from context import solver as sl
+
+class ExportTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(ExportTest, self).__init__(*args, **kwargs)
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def _get_supply_chain(self, model_fname):
+        return sc.SupplyChain(pr.Parser(os.path.join(self._test_model_dir, model_fname)).parse())
+
+    def test_format_of(self):
+        self.assertEqual(ex.ChainExporter.format_of('a.mps'), 'mps')
+        self.assertEqual(ex.ChainExporter.format_of('a.MPS.gz'), 'mps')
+        self.assertEqual(ex.ChainExporter.format_of('a.lp.gz'), 'lp')
+        self.assertEqual(ex.ChainExporter.format_of('a'), 'lp')
+
+    def test_mps(self):
+        exporter=ex.ChainExporter(self._get_supply_chain('upper_bound.txt'))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname=os.path.join(tmp_dir, 'model.mps')
+            model=mx.MatrixBuilder(exporter._supply_chain).build()
+            self.assertEqual(exporter.write(fname), (model.num_columns(), model.num_rows()))
+            _, prob=pulp.LpProblem.fromMPS(fname, sense=pulp.LpMaximize)
+            self.assertEqual(sorted(v.name for v in prob.variables()), sorted(model.col_names))
+            prob.solve(pulp.PULP_CBC_CMD(msg=False))
+            self.assertEqual(pulp.value(prob.objective), 20)
+            # the file streamed from the chain is the one of the assembled matrix
+            for model_fname in ['big_m.txt', 'decompose.txt', 'upper_bound.txt']:
+                spch=self._get_supply_chain(model_fname)
+                mx.write_mps(mx.MatrixBuilder(spch).build(), fname+'.matrix', names=True)
+                ex.ChainExporter(spch).write(fname)
+                with open(fname) as reader, open(fname+'.matrix') as matrix_reader:
+                    self.assertEqual(reader.read(), matrix_reader.read(), model_fname)
+
+    def test_gzip(self):
+        exporter=ex.ChainExporter(self._get_supply_chain('big_m.txt'))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fmt in ex.ChainExporter.FORMATS:
+                plain=os.path.join(tmp_dir, f'model.{fmt}')
+                exporter.write(plain)
+                exporter.write(plain+'.gz')
+                with open(plain) as reader, gzip.open(plain+'.gz', 'rt') as gz_reader:
+                    self.assertEqual(reader.read(), gz_reader.read())
+            with open(os.path.join(tmp_dir, 'model.lp')) as reader:
+                content=reader.read()
+            self.assertTrue(content.startswith('\\* Supply chain planning *\\'))
+            self.assertTrue('_x_a_p' in content.split('Generals')[1])
+            with self.assertRaises(ValueError):
+                exporter.write(os.path.join(tmp_dir, 'model.txt'), 'xml')
+
+    def test_solver_formats(self):
+        spch=self._get_supply_chain('upper_bound.txt')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for solver_cls in [sl.PlanningSolver, sl.MatrixPlanningSolver]:
+                slvr=solver_cls(spch, msg=False)
+                for fname in ['model.mps', 'model.mps.gz', 'model.lp.gz']:
+                    path=os.path.join(tmp_dir, fname)
+                    slvr.write_lp(path)
+                    if fname.endswith('.gz'):
+                        with open(path, 'rb') as reader:
+                            self.assertEqual(reader.read(2), b'\x1f\x8b')
+                        with gzip.open(path, 'rt') as reader, open(path[:-3], 'w') as writer:
+                            writer.write(reader.read())
+                        path=path[:-3]
+                    if path.endswith('.mps'):
+                        _, prob=pulp.LpProblem.fromMPS(path, sense=pulp.LpMaximize)
+                        prob.solve(pulp.PULP_CBC_CMD(msg=False))
+                        self.assertEqual(pulp.value(prob.objective), 20)
+                    else:
+                        with open(path) as reader:
+                            self.assertTrue('Subject To' in reader.read())
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import generator as gn
+from context import entities as en
+
+class GeneratorTest(unittest.TestCase):
+
+    def _generate(self, gen):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname=os.path.join(tmp_dir, 'chain.txt')
+            gen.write(fname)
+            return sc.SupplyChain(pr.Parser(fname).parse())
+
+    def test_valid_chain(self):
+        spch=self._generate(gn.ChainGenerator(20, 200, depth=5, fan_in=4, or_ratio=0.5, seed=3))
+        g=spch.graph()
+        self.assertEqual(len(spch._products), 20)
+        self.assertEqual(len(spch._components), 200)
+        for c in spch._components: # every component feeds some transition
+            self.assertTrue(spch._outgoings.get(c._name))
+        self.assertEqual(len(g.upper_bounds()), 220) # no cycles
+        types=set(g.tr_type)
+        self.assertTrue(en.TransitionType.OR in types and en.TransitionType.DIR in types)
+
+    def test_seed(self):
+        gen=gn.ChainGenerator(5, 40, seed=7)
+        self.assertEqual(gen.generate(), gn.ChainGenerator(5, 40, seed=7).generate())
+        self.assertNotEqual(gen.generate(), gn.ChainGenerator(5, 40, seed=8).generate())
+        with self.assertRaises(ValueError):
+            gn.ChainGenerator(1, 2, depth=3)
+
+    def test_solve(self):
+        spch=self._generate(gn.ChainGenerator(5, 50, seed=1))
+        slvr=sl.PlanningSolver(spch, msg=False)
+        slvr.solve()
+        self.assertEqual(slvr.status(), 'Optimal')
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import matrix as mx
+
+class MatrixTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(MatrixTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def _get_supply_chain(self, path_to_model):
+        return sc.SupplyChain(pr.Parser(path_to_model).parse())
+
+    def _models(self):
+        models=[os.path.join(self._examples_dir, f) for f in sorted(os.listdir(self._examples_dir))]
+        models+=[os.path.join(self._test_model_dir, f) for f in ['big_m.txt', 'build_outgoings.txt', 'tree.txt', 'upper_bound.txt']]
+        return models
+
+    @staticmethod
+    def _pulp_rows(prob):
+        """returns the constraints of a PuLP problem as sorted row tuples"""
+        rows=[]
+        for c in prob.constraints.values():
+            coefs=tuple(sorted((var.name, float(val)) for var, val in c.items() if val))
+            rows.append((coefs, c.sense, float(-c.constant)))
+        return sorted(rows)
+
+    @staticmethod
+    def _matrix_rows(model):
+        """returns the rows of a matrix model as sorted row tuples"""
+        rows=[]
+        for r in range(model.num_rows()):
+            cols, vals=model.row(r)
+            coefs=tuple(sorted((model.col_names[c], v) for c, v in zip(cols, vals)))
+            rows.append((coefs, model.row_sense[r], model.row_rhs[r]))
+        return sorted(rows)
+
+    def test_same_formulation(self):
+        for model_file in self._models():
+            spch=self._get_supply_chain(model_file)
+            prob=sl.PlanningSolver(spch, msg=False)._problem()
+            model=sl.MatrixPlanningSolver(spch, msg=False)._model
+            self.assertEqual(self._matrix_rows(model), self._pulp_rows(prob), model_file)
+            variables=dict((v.name, v) for v in prob.variables())
+            self.assertEqual(sorted(model.col_names), sorted(variables))
+            for c, name in enumerate(model.col_names):
+                var=variables[name]
+                self.assertEqual(model.col_lb[c], var.lowBound)
+                self.assertEqual(model.col_ub[c], float('inf') if var.upBound is None else var.upBound)
+                self.assertEqual(bool(model.col_int[c]), var.cat == 'Integer')
+                self.assertEqual(model.obj[c], prob.objective.get(var, 0))
+
+    def test_same_plan(self):
+        for model_file in self._models():
+            spch=self._get_supply_chain(model_file)
+            pulp_solver=sl.PlanningSolver(spch, fast_path=False, msg=False)
+            pulp_solver.solve()
+            matrix_solver=sl.MatrixPlanningSolver(spch, fast_path=False, msg=False)
+            matrix_solver.solve()
+            self.assertEqual(matrix_solver.status(), 'Optimal')
+            self.assertEqual(str(matrix_solver), str(pulp_solver), model_file)
+
+    def test_columns(self):
+        model=mx.MatrixModel()
+        x=model.add_column('x', 0, 4, obj=1.0)
+        y=model.add_column('y', 0, float('inf'))
+        model.add_row([x, y], [1.0, -1.0], mx.Sense.LE, 0.0)
+        model.add_row([y], [2.0], mx.Sense.GE, 1.0)
+        col_ptr, col_row, col_val=model.columns()
+        self.assertEqual(list(col_ptr), [0, 1, 3])
+        self.assertEqual(list(col_row), [0, 0, 1])
+        self.assertEqual(list(col_val), [1.0, -1.0, 2.0])
+
+    def test_repeat(self):
+        model=mx.MatrixModel()
+        x=model.add_column('x', 0, 4, obj=1.0)
+        y=model.add_column('y', 0, float('inf'))
+        model.add_row([x, y], [1.0, -1.0], mx.Sense.LE, 0.0)
+        model.add_row([y], [2.0], mx.Sense.GE, 1.0)
+        copies=model.repeat(3)
+        self.assertEqual(copies.col_names, ['x@0', 'y@0', 'x@1', 'y@1', 'x@2', 'y@2'])
+        self.assertEqual(list(copies.obj), [1.0, 0.0]*3)
+        self.assertEqual(copies.num_rows(), 6)
+        self.assertEqual([list(c) for c in copies.row(4)], [[4, 5], [1.0, -1.0]])
+        self.assertEqual([list(c) for c in copies.row(5)], [[5], [2.0]])
+        self.assertEqual(list(copies.row_sense), [mx.Sense.LE, mx.Sense.GE]*3)
+
+    def test_read_solution(self):
+        model=mx.MatrixModel()
+        model.add_column('x', 0, 4, obj=1.0)
+        model.add_column('y', 0, 4, integer=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sol_file=os.path.join(tmp_dir, 'model.sol')
+            for header, status, values in [('Optimal - objective value 4.00000000', 'Optimal', [4.0, 1.0]),
+                                           ('Stopped on time - objective value 3.00000000', 'Optimal', [4.0, 1.0]),
+                                           ('Stopped on gap - objective value 3.00000000', 'Optimal', [4.0, 1.0]),
+                                           ('Stopped on time (no integer solution - continuing)', 'Not Solved', [4.0, 1.0]),
+                                           ('Integer infeasible - objective value 0.00000000', 'Infeasible', [4.0, 1.0]),
+                                           ('Unbounded - objective value 0.00000000', 'Unbounded', [4.0, 1.0])]:
+                with open(sol_file, 'w') as writer:
+                    writer.write(f'{header}\n      0 C0                     4                       1\n'
+                                 '      1 C1                     1                       0\n')
+                self.assertEqual(mx.read_solution(sol_file, model), (status, values), header)
+
+    def test_write_lp(self):
+        spch=self._get_supply_chain(os.path.join(self._examples_dir, 'example0.txt'))
+        slvr=sl.MatrixPlanningSolver(spch, msg=False)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            lp_file=os.path.join(tmp_dir, 'model.lp')
+            slvr.write_lp(lp_file)
+            with open(lp_file) as reader:
+                content=reader.read()
+        self.assertIn('Maximize', content)
+        self.assertIn('_x_c1_p', content.split('Generals')[1])
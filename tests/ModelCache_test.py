@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from context import cache as ch
+from context import supply_chain as sc
+from context import parser as pr
+from context import solver as sl
+
+class ModelCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir=tempfile.mkdtemp()
+        self._cache_dir=os.path.join(self._tmp_dir, 'cache')
+        self._model=os.path.join(self._tmp_dir, 'model.txt')
+        shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'examples', 'example1.txt'), self._model)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_load(self):
+        cache=ch.ModelCache(self._cache_dir)
+        spch=cache.load(self._model)
+        self.assertTrue(isinstance(spch, sc.SupplyChain))
+        self.assertEqual(len(os.listdir(self._cache_dir)), 1)
+        # the second load is served from the cache
+        cached=cache.load(self._model)
+        self.assertFalse(cached is spch)
+        self.assertEqual(sorted(cached._entity_dict), sorted(spch._entity_dict))
+        self.assertEqual(cached._leaves, spch._leaves)
+        self.assertTrue(cached._outgoings['c2'][0] is cached._transitions[1])
+
+    def test_invalidation(self):
+        cache=ch.ModelCache(self._cache_dir)
+        key=cache.key(self._model)
+        cache.load(self._model)
+        with open(self._model,'a') as writer:
+            writer.write('\nproduct p3=5;')
+        self.assertNotEqual(cache.key(self._model), key)
+        spch=cache.load(self._model)
+        self.assertTrue('p3' in spch._entity_dict)
+        self.assertEqual(len(os.listdir(self._cache_dir)), 2)
+        cache.clear()
+        self.assertEqual(os.listdir(self._cache_dir), [])
+
+    def test_corrupted_entry(self):
+        cache=ch.ModelCache(self._cache_dir)
+        os.makedirs(self._cache_dir)
+        with open(os.path.join(self._cache_dir, cache.key(self._model)+cache.SUFFIX),'wb') as writer:
+            writer.write(b'garbage')
+        spch=cache.load(self._model)
+        self.assertTrue('p1' in spch._entity_dict)
+
+class SolutionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir=tempfile.mkdtemp()
+        self._cache_dir=os.path.join(self._tmp_dir, 'plans')
+        self._model=os.path.join(os.path.dirname(__file__), '..', 'examples', 'example1.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _chain(self, text=None):
+        if text is None:
+            return sc.SupplyChain(pr.Parser(self._model).parse())
+        path=os.path.join(self._tmp_dir, 'model.txt')
+        with open(path, 'w') as writer:
+            writer.write(text)
+        return sc.SupplyChain(pr.Parser(path).parse())
+
+    def test_fingerprint(self):
+        reordered=self._chain('p2 <- c2;\n  p1 <- c2 | c1; c1<-supplier;\ncomponent c2=10, c1;\nproduct p2=10 low, p1=10 high;')
+        self.assertEqual(ch.fingerprint(reordered), ch.fingerprint(self._chain()))
+        changed=self._chain('p2 <- c2; p1 <- c2 | c1; c1<-supplier; component c2=9, c1; product p2=10 low, p1=10 high;')
+        self.assertNotEqual(ch.fingerprint(changed), ch.fingerprint(self._chain()))
+
+    def test_plan(self):
+        cache=ch.SolutionCache(self._cache_dir)
+        solver=cache.plan(self._chain(), msg=False)
+        self.assertTrue(isinstance(solver, sl.PlanningSolver))
+        cached=cache.plan(self._chain(), msg=False)
+        self.assertTrue(isinstance(cached, ch.CachedPlan))
+        self.assertEqual(str(cached), str(solver))
+        self.assertEqual(cached.values(), solver.values())
+        # other settings miss the cache
+        self.assertFalse(isinstance(cache.plan(self._chain(), backend=sl.SolverBackend(gap=0.1), msg=False), ch.CachedPlan))
+        self.assertFalse(isinstance(cache.plan(self._chain(), sl.MatrixPlanningSolver, msg=False), ch.CachedPlan))
+        self.assertEqual(len(os.listdir(self._cache_dir)), 3)
+        cache.clear()
+        self.assertEqual(os.listdir(self._cache_dir), [])
+
+    def test_eviction(self):
+        cache=ch.SolutionCache(self._cache_dir, max_entries=2)
+        for k in range(3):
+            cache.put(str(k), 'Optimal', k, {'p': k})
+            os.utime(os.path.join(self._cache_dir, f'{k}{cache.SUFFIX}'), ns=(k, k)) # distinct ages
+        self.assertEqual(sorted(os.listdir(self._cache_dir)), ['1.plan', '2.plan'])
+        self.assertEqual(cache.get('1')['objective'], 1) # marks 1 as recently used
+        cache.put('3', 'Optimal', 3, {'p': 3})
+        self.assertEqual(sorted(os.listdir(self._cache_dir)), ['1.plan', '3.plan'])
+        cache.put('4', 'Not Solved', None, {})
+        self.assertEqual(cache.get('4'), None)
+        small=ch.SolutionCache(self._cache_dir, max_bytes=1)
+        small.put('5', 'Optimal', 5, {'p': 5})
+        self.assertEqual(os.listdir(self._cache_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()
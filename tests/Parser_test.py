@@ -1,4 +1,7 @@
+import contextlib
+import io
 import os
+import tempfile
 import unittest
 
 from context import parser as pr
@@ -126,5 +129,58 @@ class ParserTest(unittest.TestCase):
         self.assertTrue(stmts[6]._transition._sources is None)
         self.assertEqual(stmts[6]._transition._tr_type, en.TransitionType.DIR)
 
+    def test_tokenize(self):
+        text="product p1=10 high, p2;\ncomponent c1;;\np1 <- c1 + c2;\n"
+        expected=text.split(';')
+        for chunk_size in (1, 2, 7, 1<<20):
+            self.assertEqual(list(pr.tokenize(io.StringIO(text), chunk_size)), expected)
+        self.assertEqual(list(pr.tokenize(io.StringIO(''))), [''])
+
+    def test_statements(self):
+        p=pr.Parser(os.path.join(self._examples_dir, 'example2.txt'))
+        stmts=list(p.statements())
+        self.assertEqual([s.get_type() for s in stmts], [s.get_type() for s in p.parse()])
+        self.assertEqual(stmts[4]._transition._sources, ['c3', 'c4'])
+
+    def _write_model(self, text):
+        fd, path=tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd,'w') as writer:
+            writer.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_split(self):
+        text=''.join(f'component c{n}={n};\n' for n in range(50))
+        p=pr.Parser(self._write_model(text))
+        ranges=p._split(7)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(text))
+        for (_,end),(start,_) in zip(ranges[:-1], ranges[1:]):
+            self.assertEqual(start, end)
+            self.assertEqual(text[end-1], ';')
+
+    def test_parallel_parse(self):
+        text='product p=20;\n'+''.join(f'component c{n}={n};\nc{n} <- supplier;\n' for n in range(200))
+        p=pr.Parser(self._write_model(text))
+        p.MIN_RANGE_SIZE=1
+        serial=p.parse()
+        parallel=p.parse(jobs=3)
+        self.assertEqual(len(parallel), len(serial))
+        for s1, s2 in zip(serial, parallel):
+            self.assertEqual(s1.get_type(), s2.get_type())
+        self.assertEqual(parallel[-2]._components[0]._name, 'c199')
+        self.assertEqual(parallel[-1]._transition._target, 'c199')
+
+    def test_parallel_parse_error(self):
+        stmts=[f'component c{n}' for n in range(100)]
+        stmts[73]='c1 <- 2c'
+        p=pr.Parser(self._write_model(';\n'.join(stmts)))
+        p.MIN_RANGE_SIZE=1
+        for jobs in (1, 4):
+            out=io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertTrue(p.parse(jobs=jobs) is None)
+            self.assertTrue(out.getvalue().startswith('Error when parsing statement 74:'))
+
 if __name__ == '__main__':
     unittest.main()
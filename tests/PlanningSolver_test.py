@@ -1,4 +1,7 @@
 import os
+import subprocess
+import sys
+import tempfile
 import unittest
 
 from context import parser as pr
@@ -16,7 +19,7 @@ class PlanningSolverTest(unittest.TestCase):
         par=pr.Parser(path_to_model)
         stmts=par.parse()
         spch=sc.SupplyChain(stmts)
-        return sl.PlanningSolver(spch)
+        return sl.PlanningSolver(spch, msg=False)
 
     def _get_solver_example(self, model_fname):
         return self._get_solver(os.path.join(self._examples_dir,model_fname))
@@ -36,5 +39,160 @@ class PlanningSolverTest(unittest.TestCase):
         self.assertEqual(uppper_bound_dict['c5'],14)
 
 
+    def test_compute_upper_bounds_cycle(self):
+        slvr=self._get_solver_testmodel('cycle.txt')
+        with self.assertRaises(ValueError) as ctx: # raised when the problem is built
+            slvr.solve()
+        msg=str(ctx.exception)
+        self.assertTrue('cycles through "a", "b"' in msg)
+        self.assertTrue('bounds of "c" depend' in msg)
+
+    def test_compute_supply_caps(self):
+        slvr=self._get_solver_testmodel('big_m.txt')
+        g=slvr._supply_chain.graph()
+        caps=slvr._compute_supply_caps()
+        self.assertEqual(dict((g.name(v), c) for v,c in enumerate(caps)), {'p': 5, 'a': 5, 'b': 3, 'c': 3})
+        caps=self._get_solver_testmodel('upper_bound.txt')._compute_supply_caps()
+        self.assertTrue(all(c == float('inf') for c in caps[2:]))
+
+    def test_compute_big_ms(self):
+        slvr=self._get_solver_testmodel('big_m.txt')
+        self.assertEqual(slvr._compute_big_ms(), {0: [(3, 5), (5, 3), (5, 3)]})
+        report=slvr.big_m_report().split('\n')
+        self.assertEqual(report[0], 'Big-M tightening: 3 of 3 OR branches tightened, total M 600 -> 24')
+        self.assertEqual(report[1], 'p <- a: M=100 -> upper=3, lower=5')
+        slvr.solve()
+        self.assertEqual(slvr.objective(), 10) # b cannot dump its stock into the unselected branch
+
+    def test_update_bounds(self):
+        for builder in [sl.PlanningSolver, sl.MatrixPlanningSolver]:
+            for model_fname, orders, stocks in [('big_m.txt', {'p': 4}, {'a': 1}), ('upper_bound.txt', {'p1': 1, 'p2': 20}, {'c5': 2})]:
+                spch=sc.SupplyChain(pr.Parser(os.path.join(self._test_model_dir, model_fname)).parse())
+                slvr=builder(spch, msg=False)
+                slvr.solve()
+                slvr.update_bounds(orders, stocks)
+                slvr.solve()
+                self.assertEqual(spch._entity_dict[list(orders)[0]]._order_size, list(orders.values())[0])
+                fresh=sl.PlanningSolver(spch, msg=False)
+                fresh.solve()
+                self.assertEqual(slvr.status(), 'Optimal')
+                self.assertEqual(slvr.objective(), fresh.objective())
+                if builder is sl.PlanningSolver:
+                    self.assertEqual(slvr._compute_big_ms(), fresh._compute_big_ms())
+        slvr=self._get_solver_testmodel('big_m.txt')
+        with self.assertRaises(KeyError):
+            slvr.update_bounds(orders={'q': 1})
+        with self.assertRaises(ValueError):
+            slvr.update_bounds(orders={'a': 1})
+        with self.assertRaises(ValueError): # c has no inventory
+            slvr.update_bounds(stocks={'c': 1})
+
+    def test_bottlenecks(self):
+        slvr=self._get_solver_testmodel('big_m.txt')
+        slvr.solve()
+        slvr._vars['_b_c'].varValue=0.5 # a marker the LP does not reproduce
+        plan=slvr.values()
+        entries=slvr.bottlenecks()
+        self.assertEqual(slvr.values(), plan) # the plan is not overwritten by the LP
+        self.assertEqual(slvr.status(), 'Optimal')
+        self.assertEqual([(name, kind, marginal) for name, kind, _, _, marginal in entries],
+                         [('a', 'inventory', 2.0), ('b', 'inventory', 0.0), ('p', 'product', 0.0)])
+        self.assertEqual(entries[0][2:4], (5, 5.0))
+        self.assertEqual(slvr.objective(), 10)
+        binaries=[v for v in slvr._prob.variables() if v.cat == 'Integer']
+        self.assertTrue(binaries and all(v.upBound == 1 for v in binaries)) # the binaries are left free
+        self.assertTrue(slvr.bottleneck_report().startswith('Bottlenecks: 1 of 3 bounds'))
+        # one more unit of a, or of the order size of p, adds its marginal value
+        for orders, stocks, objective in [(None, {'a': 6}, 12), ({'p': 101}, None, 10)]:
+            slvr=self._get_solver_testmodel('big_m.txt')
+            slvr.update_bounds(orders, stocks)
+            slvr.solve()
+            self.assertEqual(slvr.objective(), objective)
+        with self.assertRaises(ValueError):
+            sl.MatrixPlanningSolver(slvr._supply_chain, msg=False).bottlenecks()
+
+    def test_multi_period(self):
+        for fname in sorted(os.listdir(self._examples_dir)):
+            spch=sc.SupplyChain(pr.Parser(os.path.join(self._examples_dir, fname)).parse())
+            single=sl.PlanningSolver(spch, msg=False)
+            single.solve()
+            slvr=sl.MultiPeriodPlanningSolver(spch, 1, msg=False)
+            slvr.solve()
+            self.assertEqual(slvr.objective(), single.objective())
+        spch=sc.SupplyChain(pr.Parser(os.path.join(self._test_model_dir, 'multi_period.txt')).parse())
+        orders, arrivals=sl.read_periods(os.path.join(self._test_model_dir, 'periods.jsonl'))
+        slvr=sl.MultiPeriodPlanningSolver(spch, 3, orders, arrivals, msg=False)
+        slvr.solve()
+        # 4 items in stock and 5 arriving in the second period, of which 9 can be used by then
+        self.assertEqual(slvr.objective(), 18)
+        self.assertEqual(slvr.period_values(2)['p1'], 0)
+        self.assertEqual(slvr.period_values(2)['_l_c1'], 1)
+        self.assertTrue(slvr.period_values(0)['p1'] <= 2)
+        self.assertEqual(slvr.statistics()['variables'], 12)
+        with self.assertRaises(ValueError):
+            slvr.update_bounds(orders={'p1': 1})
+        with self.assertRaises(ValueError):
+            sl.MultiPeriodPlanningSolver(spch, 2, arrivals=[{'p1': 1}], msg=False)
+        with self.assertRaises(KeyError):
+            sl.MultiPeriodPlanningSolver(spch, 2, orders=[{'p9': 1}], msg=False)
+        with self.assertRaises(ValueError):
+            sl.MultiPeriodPlanningSolver(spch, 1, orders=[{}, {}], msg=False)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname=os.path.join(tmp_dir, 'periods.jsonl')
+            with open(fname, 'w') as writer:
+                writer.write('{"orders": {"p1": 2}}\n{"stocks": {"c1": 5}}\n')
+            with self.assertRaises(ValueError): # the key of a scenario is not an arrival
+                sl.read_periods(fname)
+
+    def test_decomposed(self):
+        spch=sc.SupplyChain(pr.Parser(os.path.join(self._test_model_dir, 'decompose.txt')).parse())
+        whole=sl.PlanningSolver(spch, msg=False)
+        whole.solve()
+        for jobs in [1, 2]:
+            for presolve in [False, True]:
+                slvr=sl.DecomposedPlanningSolver(spch, presolve=presolve, msg=False, jobs=jobs)
+                self.assertEqual(slvr.num_parts(), 3 if presolve else 4)
+                slvr.solve()
+                self.assertEqual(str(slvr), str(whole))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_path=os.path.join(tmp_dir, 'cbc.log')
+            slvr=sl.DecomposedPlanningSolver(spch, fast_path=False, msg=False, backend=sl.SolverBackend(log_path=log_path), jobs=2)
+            slvr.solve()
+            self.assertEqual(sorted(os.listdir(tmp_dir)), [f'cbc.log.{k}' for k in range(4)]) # a log per sub-chain
+
+    def test_backend(self):
+        backend=sl.SolverBackend('cbc', threads=2, time_limit=30, gap=0.01)
+        self.assertEqual(backend.describe(), 'cbc (threads=2, time limit=30s, gap=0.01)')
+        self.assertEqual(sl.SolverBackend('glpk', threads=2).describe(), 'glpk')
+        limited=backend.replace(time_limit=5)
+        self.assertEqual((limited.name(), limited.options()), ('cbc', {'threads': 2, 'time_limit': 5, 'gap': 0.01, 'log_path': None}))
+        self.assertEqual(backend.options()['time_limit'], 30)
+        with self.assertRaises(ValueError):
+            sl.SolverBackend('lpsolve')
+        spch=sc.SupplyChain(pr.Parser(os.path.join(self._test_model_dir, 'upper_bound.txt')).parse())
+        for solver_cls in [sl.PlanningSolver, sl.MatrixPlanningSolver]:
+            slvr=solver_cls(spch, msg=False, backend=backend)
+            slvr.solve()
+            self.assertEqual(slvr.objective(), 20)
+            self.assertTrue('Solver: cbc (threads=2' in str(slvr))
+        with self.assertRaises(ValueError):
+            sl.MatrixPlanningSolver(spch, msg=False, backend=sl.SolverBackend('glpk'))
+
+    def test_check_without_pulp(self):
+        root=os.path.join(os.path.dirname(__file__), '..')
+        code='import sys, planner; planner.check_models(sys.argv[1:]); print("pulp" in sys.modules)'
+        out=subprocess.run([sys.executable, '-c', code, os.path.join(self._examples_dir, 'example1.txt')],
+                           cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split('\n')[-2:], ['False', ''])
+        self.assertTrue(out.startswith('[OK] '))
+        # exporting a problem does not load PuLP either
+        code='import runpy, sys\ntry:\n    runpy.run_path("planner.py", run_name="__main__")\nexcept SystemExit:\n    print("pulp" in sys.modules)'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out=subprocess.run([sys.executable, '-c', code, os.path.join(self._examples_dir, 'example1.txt'),
+                                os.path.join(tmp_dir, 'model.mps'), '--export-only'],
+                               cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split('\n')[-2:], ['False', ''])
+        self.assertTrue(out.startswith('Exported '))
+
 if __name__=='__main__':
     unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import presolve as ps
+from context import entities as en
+from context import generator as gn
+from context import variables as vr
+
+class PresolveTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(PresolveTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def _get_chain(self, path_to_model):
+        return sc.SupplyChain(pr.Parser(path_to_model).parse())
+
+    def test_reduce(self):
+        presolver=ps.Presolver(self._get_chain(os.path.join(self._test_model_dir, 'presolve.txt')))
+        reduced=presolver.reduce()
+        self.assertEqual([p._name for p in reduced._products], ['p1'])
+        self.assertEqual([c._name for c in reduced._components], ['a', 'd'])
+        self.assertEqual(len(reduced._transitions), 2)
+        # f is dropped from the OR transition and b <- c <- d collapses into d
+        self.assertEqual(reduced._transitions[0]._target, 'p1')
+        self.assertEqual(reduced._transitions[0]._sources, ['a', 'd'])
+        self.assertEqual(reduced._transitions[1]._tr_type, en.TransitionType.DIR)
+        self.assertEqual(presolver.report().split('\n'), [
+            'Presolve: removed 2 unreachable and 4 zero-supply entities, collapsed 2 pass-through components, pruned 0 equivalent OR branches, fixed 1 binaries',
+            'Entities: 11 -> 3, transitions: 6 -> 2, binaries: 3 -> 2 (1 eliminated)'])
+
+    def test_postsolve(self):
+        spch=self._get_chain(os.path.join(self._test_model_dir, 'presolve.txt'))
+        slvr=sl.PlanningSolver(spch, presolve=True, msg=False)
+        slvr.solve()
+        values=slvr.values()
+        self.assertEqual(sorted(values), sorted(vr.variable_names(spch)))
+        self.assertEqual(values['p1'], 10)
+        self.assertEqual(values['_x_b_p1'], 1)
+        self.assertEqual(values['_x_f_p1'], 0)
+        self.assertEqual(values['_b_p1'], 10)
+        self.assertEqual(values['_c_b'], 10)
+        self.assertEqual(values['_d_c'], 10)
+        self.assertEqual(values['_s_d'], 10)
+        self.assertEqual(values['_i_h'], 0)
+        self.assertEqual(values['p2'], 0)
+
+    def test_equivalent_or(self):
+        spch=self._get_chain(os.path.join(self._test_model_dir, 'equivalent_or.txt'))
+        presolver=ps.Presolver(spch)
+        reduced=presolver.reduce()
+        # c2 duplicates c1, and e2 duplicates e1; d1 and d2 differ by their stock
+        ors=dict((t._target, t._sources) for t in reduced._transitions if t._tr_type == en.TransitionType.OR)
+        self.assertEqual(ors, {'p': ['c1', 'c3'], 'q': ['a', 'd2', 'e1']})
+        self.assertEqual(presolver.report().split('\n')[1], 'Entities: 11 -> 8, transitions: 9 -> 6, binaries: 7 -> 5 (2 eliminated)')
+        plain=sl.PlanningSolver(spch, msg=False)
+        plain.solve()
+        presolved=sl.PlanningSolver(spch, presolve=True, msg=False)
+        presolved.solve()
+        self.assertEqual(plain.objective(), presolved.objective())
+        values=presolved.values()
+        self.assertEqual(sorted(values), sorted(plain.values()))
+        self.assertEqual(values['_x_c2_p'], 0)
+        self.assertEqual(values['_x_e2_q'], 0)
+
+    def _assert_same_objective(self, generators):
+        """checks that presolve keeps the optimum of the chains written by @param generators"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname=os.path.join(tmp_dir, 'chain.txt')
+            for gen in generators:
+                gen.write(fname)
+                spch=self._get_chain(fname)
+                plain=sl.PlanningSolver(spch, msg=False)
+                plain.solve()
+                presolved=sl.PlanningSolver(spch, presolve=True, msg=False)
+                presolved.solve()
+                self.assertEqual(plain.objective(), presolved.objective(), f'seed {gen._seed}')
+
+    def test_generated(self):
+        # unselected OR branches used to absorb stock, which the reduced chains could not
+        self._assert_same_objective(gn.ChainGenerator(3, 12, depth=3, or_ratio=0.5, seed=seed) for seed in range(40))
+
+    def test_equivalent_stock(self):
+        # c5 and c6 have the same stock, so only one of them can feed p0
+        spch=self._get_chain(os.path.join(self._test_model_dir, 'equivalent_stock.txt'))
+        presolved=sl.PlanningSolver(spch, presolve=True, msg=False)
+        presolved.solve()
+        self.assertEqual(presolved.objective(), 10)
+        values=presolved.values()
+        self.assertEqual((values['_x_c6_p0'], values['_c6_p0']), (0, 0))
+        plain=sl.PlanningSolver(spch, msg=False)
+        plain.solve()
+        self.assertEqual(plain.objective(), 10)
+        self.assertEqual(plain.values()['_c6_p0']*plain.values()['_c5_p0'], 0)
+
+    def test_generated_or(self):
+        # wide OR transitions over leaves with small stocks have many equivalent branches
+        self._assert_same_objective(gn.ChainGenerator(2, 18, depth=1, fan_in=9, or_ratio=1.0, stock_ratio=0.7, supplier_ratio=0.3,
+                                                      max_order=10, max_stock=3, seed=seed) for seed in range(30))
+
+    def test_examples(self):
+        for model in sorted(os.listdir(self._examples_dir)):
+            spch=self._get_chain(os.path.join(self._examples_dir, model))
+            plain=sl.PlanningSolver(spch, msg=False)
+            plain.solve()
+            presolved=sl.PlanningSolver(spch, presolve=True, msg=False)
+            presolved.solve()
+            self.assertEqual(plain.objective(), presolved.objective())
+            self.assertEqual(sorted(plain.values()), sorted(presolved.values()))
+
+if __name__ == '__main__':
+    unittest.main()
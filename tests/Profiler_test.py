@@ -0,0 +1,42 @@
+import json
+import os
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import profiler as pf
+
+class ProfilerTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(ProfilerTest, self).__init__(*args, **kwargs)
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def test_stages(self):
+        profiler=pf.Profiler()
+        with profiler.stage('allocate'):
+            data=bytearray(1<<20)
+        with self.assertRaises(KeyError):
+            with profiler.stage('fail'):
+                raise KeyError('x')
+        report=profiler.report()
+        self.assertEqual([s['name'] for s in report['stages']], ['allocate', 'fail'])
+        self.assertTrue(report['stages'][0]['peak_bytes'] >= len(data))
+        self.assertTrue(all(s['wall_seconds'] >= 0 and s['cpu_seconds'] >= 0 for s in report['stages']))
+        self.assertEqual(report['total']['wall_seconds'], sum(s['wall_seconds'] for s in report['stages']))
+        untraced=pf.Profiler(memory=False)
+        with untraced.stage('allocate'):
+            data=bytearray(1<<20)
+        stage=untraced.report()['stages'][0]
+        self.assertEqual(stage['name'], 'allocate')
+        self.assertFalse('peak_bytes' in stage)
+
+    def test_model_statistics(self):
+        spch=sc.SupplyChain(pr.Parser(os.path.join(self._test_model_dir, 'upper_bound.txt')).parse())
+        expected={'variables': 29, 'constraints': 37, 'binaries': 8, 'nonzeros': 110}
+        self.assertEqual(sl.PlanningSolver(spch, msg=False).statistics(), expected)
+        self.assertEqual(sl.MatrixPlanningSolver(spch, msg=False).statistics(), expected)
+        profiler=pf.Profiler(memory=False)
+        profiler.set_model_statistics(expected)
+        self.assertEqual(json.loads(profiler.to_json())['model'], expected)
@@ -129,6 +129,15 @@ class SupplyChainTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             self._run_a_test_model('self_loop.txt')
 
+    def test_lazy_views(self):
+        spch=self._run_a_test_model('build_outgoings.txt')
+        spch.graph()
+        self.assertFalse(any(view in spch.__dict__ for view in sc.SupplyChain._VIEWS)) # only the graph is built
+        self.assertEqual(len(spch._outgoings['c1']), 3)
+        self.assertTrue(all(view in spch.__dict__ for view in sc.SupplyChain._VIEWS))
+        with self.assertRaises(AttributeError):
+            spch._missing
+
     def test_build_outgoings(self):
         spch=self._run_a_test_model('build_outgoings.txt')
         for p in spch._products:
@@ -149,5 +158,77 @@ class SupplyChainTest(unittest.TestCase):
         self.assertTrue('c2' in spch._leaves)
         self.assertTrue('c3' in spch._leaves)
 
+    def test_sub_chains(self):
+        spch=self._run_a_test_model('decompose.txt')
+        parts=spch.sub_chains()
+        self.assertEqual([[p._name for p in part._products] for part in parts], [['p1'], ['p2'], ['p3'], ['p4']])
+        self.assertEqual([[c._name for c in part._components] for part in parts], [['a','b'], ['c','d'], ['e'], []])
+        self.assertEqual([len(part._transitions) for part in parts], [2, 2, 1, 0])
+        self.assertTrue(parts[0]._transitions[0] is spch._transitions[0])
+        spch=self._run_a_test_model('build_outgoings.txt')
+        self.assertEqual(spch.sub_chains(), [spch])
+
+    def test_edit(self):
+        spch=self._run_an_example('example1.txt')
+        whole=self._run_an_example('example1.txt')
+        # removing every transition and adding them again gives the same chain
+        transitions=list(spch._transitions)
+        for tr in transitions:
+            spch.remove_transition(tr)
+        self.assertEqual(spch._outgoings, {})
+        self.assertEqual(spch._leaves, {'p1', 'p2', 'c1', 'c2'})
+        for tr in transitions:
+            spch.add_transition(tr)
+        self.assertEqual(spch._leaves, whole._leaves)
+        self.assertEqual(list(spch.graph().src), list(whole.graph().src))
+        with self.assertRaises(ValueError):
+            spch.add_transition(en.Transition(['c2'], 'p1', en.TransitionType.AND))
+        with self.assertRaises(ValueError):
+            spch.add_transition(en.Transition(None, 'c1', en.TransitionType.DIR))
+        with self.assertRaises(ValueError):
+            spch.add_transition(en.Transition(['c1'], 'c1', en.TransitionType.AND))
+        with self.assertRaises(KeyError):
+            spch.add_transition(en.Transition(['c3'], 'p2', en.TransitionType.AND))
+        with self.assertRaises(ValueError):
+            spch.add_component(en.Component('p1', 2))
+        with self.assertRaises(ValueError):
+            spch.remove_transition(en.Transition(['c2'], 'p2', en.TransitionType.AND))
+        # adding and removing entities
+        spch.add_component(en.Component('c3', 5))
+        spch.add_product(en.Product('p3', 4))
+        spch.add_transition(en.Transition(['c3'], 'p3', en.TransitionType.AND))
+        self.assertTrue('c3' in spch._leaves and 'p3' not in spch._leaves)
+        self.assertEqual(spch.graph().num_entities(), 6)
+        self.assertEqual(len(spch.sub_chains()), 2)
+        with self.assertRaises(ValueError):
+            spch.remove_entity('c3')
+        spch.remove_entity('c3', cascade=True)
+        self.assertFalse('c3' in spch._entity_dict or 'c3' in spch._outgoings)
+        self.assertTrue('p3' in spch._leaves)
+        spch.remove_entity('p3')
+        self.assertEqual([p._name for p in spch._products], ['p1', 'p2'])
+        self.assertEqual(spch.graph().num_transitions(), 3)
+        spch.remove_entity('c2', cascade=True)
+        self.assertEqual(len(spch._transitions), 1)
+        self.assertFalse('c1' in spch._outgoings)
+        self.assertEqual(spch._leaves, {'p1', 'p2'})
+        with self.assertRaises(KeyError):
+            spch.remove_entity('c2')
+
+    def test_edit_order(self):
+        spch=self._run_a_test_model('decompose.txt')
+        transitions=list(spch._transitions)
+        graph=spch.graph()
+        # a batch of edits keeps the order of the rest and rebuilds the graph once
+        spch.remove_transition(transitions[1])
+        spch.remove_transition(transitions[3])
+        spch.add_transition(transitions[1])
+        self.assertEqual(spch._transitions, [transitions[k] for k in [0, 2, 4, 1]])
+        self.assertIsNot(spch.graph(), graph)
+        self.assertIs(spch.graph(), spch.graph())
+        self.assertEqual([spch.graph().transitions[t] for t in range(4)], spch._transitions)
+        with self.assertRaises(ValueError): # removed already
+            spch.remove_transition(transitions[3])
+
 if __name__ == '__main__':
     unittest.main()
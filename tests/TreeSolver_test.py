@@ -0,0 +1,73 @@
+import os
+import random
+import tempfile
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import tree_solver as ts
+
+class TreeSolverTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(TreeSolverTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def _get_chain(self, path_to_model):
+        return sc.SupplyChain(pr.Parser(path_to_model).parse())
+
+    def _random_tree(self, rnd, n):
+        """writes a random forest of AND/supplier transitions into a temporary
+           file and returns its path"""
+        lines=['product p0=%d, p1=%d;' % (rnd.randint(0, 30), rnd.randint(0, 30))]
+        names=['p0', 'p1']
+        comps=[]
+        open_targets=['p0', 'p1']
+        for k in range(n):
+            name=f'c{k}'
+            comps.append(f'{name}={rnd.choice([0, 0, rnd.randint(1, 20)])}')
+            target=rnd.choice(open_targets)
+            lines.append(f'{target} <- {name};' if rnd.random() < 0.5 else None)
+            if lines[-1] is None:
+                lines[-1]=f'{target} <- {name} + c{n+k};'
+                comps.append(f'c{n+k}={rnd.randint(0, 20)}')
+            open_targets.append(name)
+            if rnd.random() < 0.3:
+                lines.append(f'{name} <- supplier;')
+        lines.insert(1, 'component %s;' % ', '.join(comps))
+        fd, path=tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd,'w') as writer:
+            writer.write('\n'.join(lines))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_is_applicable(self):
+        self.assertTrue(ts.TreeSolver(self._get_chain(os.path.join(self._test_model_dir, 'tree.txt'))).is_applicable())
+        # an OR transition
+        self.assertFalse(ts.TreeSolver(self._get_chain(os.path.join(self._examples_dir, 'example1.txt'))).is_applicable())
+        # c4 feeds two transitions
+        self.assertFalse(ts.TreeSolver(self._get_chain(os.path.join(self._examples_dir, 'example2.txt'))).is_applicable())
+
+    def test_solve(self):
+        values=ts.TreeSolver(self._get_chain(os.path.join(self._test_model_dir, 'tree.txt'))).solve()
+        # c and d are worth more than the stock of b as they are used together
+        self.assertEqual(values, {'p1': 8, '_a_p1': 8, '_i_a': 4, '_s_a': 4, '_b_p1': 8, '_i_b': 5, '_s_b': 3,
+                                  '_c_b': 3, '_d_b': 3, '_i_c': 3, '_i_d': 3, 'p2': 0, '_e_p2': 0})
+
+    def test_against_lp(self):
+        rnd=random.Random(7)
+        for _ in range(15):
+            spch=self._get_chain(self._random_tree(rnd, rnd.randint(1, 12)))
+            fast=sl.PlanningSolver(spch, msg=False)
+            self.assertTrue(fast._solve_tree())
+            lp=sl.PlanningSolver(spch, fast_path=False, msg=False)
+            lp.solve()
+            self.assertAlmostEqual(fast.objective(), lp.objective())
+            self.assertIsNone(fast._prob) # the problem is not built
+            for value in fast.values().values():
+                self.assertEqual(value, int(value))
+
+if __name__ == '__main__':
+    unittest.main()
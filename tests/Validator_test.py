@@ -0,0 +1,42 @@
+import io
+import os
+import unittest
+
+from context import validator as vl
+
+class ValidatorTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(ValidatorTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+        self._test_model_dir=os.path.join(os.path.dirname(__file__), 'test_models')
+
+    def test_statements_with_lines(self):
+        text='product p1=1;\n\ncomponent c1,\n  c2;  \n\n  p1 <- c1\n + c2;\n'
+        stmts=list(vl.statements_with_lines(io.StringIO(text)))
+        self.assertEqual([line for line, _ in stmts], [1, 3, 6])
+        self.assertEqual(vl._item_lines(stmts[1][1].lstrip(), 3), [3, 4])
+
+    def test_strongly_connected_components(self):
+        adjacency=[[1], [2], [0, 3], [4], [3], []]
+        components=sorted(sorted(c) for c in vl.strongly_connected_components(6, adjacency))
+        self.assertEqual(components, [[0, 1, 2], [3, 4], [5]])
+        # a long path does not hit the recursion limit
+        n=100000
+        chain=[[v+1] for v in range(n-1)]+[[0]]
+        self.assertEqual(len(vl.strongly_connected_components(n, chain)), 1)
+
+    def test_valid(self):
+        for fname in ['example0.txt', 'example1.txt', 'example2.txt', 'example3.txt']:
+            self.assertEqual(vl.Validator(os.path.join(self._examples_dir, fname)).validate(), [])
+
+    def test_invalid(self):
+        issues=vl.Validator(os.path.join(self._test_model_dir, 'invalid.txt')).validate()
+        self.assertEqual([issue.line for issue in issues], [2, 7, 9, 10, 13, 14, 15, 16, 16])
+        self.assertEqual(issues[0].message, '"p1" was defined multiple times, first at line 1.')
+        self.assertEqual(issues[3].message, 'The entities "c2", "c3", "c4" form a cycle.')
+        self.assertEqual(str(issues[2]), 'line 9: "c5" has not been defined.')
+        self.assertTrue('Invalid statement' in issues[6].message)
+
+if __name__ == '__main__':
+    unittest.main()
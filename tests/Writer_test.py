@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from context import parser as pr
+from context import supply_chain as sc
+from context import solver as sl
+from context import writer as wr
+
+class WriterTest(unittest.TestCase):
+
+    def __init__(self, *args, **kwargs):
+        super(WriterTest, self).__init__(*args, **kwargs)
+        self._examples_dir=os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+    def _solve(self):
+        spch=sc.SupplyChain(pr.Parser(os.path.join(self._examples_dir, 'example1.txt')).parse())
+        slvr=sl.PlanningSolver(spch, msg=False)
+        slvr.solve()
+        return spch, slvr.values()
+
+    def test_csv(self):
+        spch, values=self._solve()
+        out=io.StringIO()
+        self.assertEqual(wr.ResultWriter(spch).write(values, out), len(values))
+        lines=out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'variable,kind,value')
+        self.assertEqual(sorted(line.split(',')[0] for line in lines[1:]), sorted(values))
+        self.assertTrue('_x_c1_p1,choice,1.0' in lines)
+
+    def test_filters(self):
+        spch, values=self._solve()
+        out=io.StringIO()
+        wr.ResultWriter(spch, 'jsonl', nonzero=True, kinds=['product', 'inventory']).write(values, out)
+        rows=[json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows, [{'variable': 'p1', 'kind': 'product', 'value': 10.0},
+                                {'variable': 'p2', 'kind': 'product', 'value': 10.0},
+                                {'variable': '_i_c2', 'kind': 'inventory', 'value': 10.0}])
+        rows=list(wr.ResultWriter(spch, nonzero=True).rows(values))
+        self.assertEqual(len(rows), sum(1 for v in values.values() if v))
+        with self.assertRaises(ValueError):
+            wr.ResultWriter(spch, kinds=['flow'])
+        with self.assertRaises(ValueError):
+            wr.ResultWriter(spch, 'xml')
+
+    def test_binary(self):
+        spch, values=self._solve()
+        out=io.BytesIO()
+        writer=wr.ResultWriter(spch, 'binary')
+        self.assertTrue(writer.is_binary())
+        writer.write(values, out)
+        rows=list(wr.read_binary(io.BytesIO(out.getvalue())))
+        self.assertEqual(rows, list(writer.rows(values)))
+        with self.assertRaises(ValueError):
+            list(wr.read_binary(io.BytesIO(out.getvalue()[:-1])))
+        with self.assertRaises(ValueError):
+            list(wr.read_binary(io.BytesIO(b'plan')))
+
+    def test_planner_stream(self):
+        # the status and the reports go to the standard error, so the streamed plan stays clean
+        root=os.path.join(os.path.dirname(__file__), '..')
+        out=subprocess.run([sys.executable, 'planner.py', os.path.join(self._examples_dir, 'example1.txt'), '--format', 'csv',
+                            '--presolve', '--big-m-report'], cwd=root, capture_output=True, text=True)
+        lines=out.stdout.splitlines()
+        self.assertEqual(lines[0], 'variable,kind,value')
+        self.assertTrue(len(lines) > 1 and all(len(line.split(',')) == 3 for line in lines))
+        self.assertTrue('Presolve: ' in out.stderr and 'Big-M tightening: ' in out.stderr)
@@ -6,3 +6,16 @@ import lib.entities as entities
 import lib.parser as parser
 import lib.supply_chain as supply_chain
 import lib.solver as solver
+import lib.cache as cache
+import lib.graph as graph
+import lib.tree_solver as tree_solver
+import lib.presolve as presolve
+import lib.matrix as matrix
+import lib.batch as batch
+import lib.generator as generator
+import lib.profiler as profiler
+import lib.writer as writer
+import lib.export as export
+import lib.daemon as daemon
+import lib.validator as validator
+import lib.variables as variables